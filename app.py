@@ -1,4 +1,4 @@
-from fastapi import FastAPI, File, UploadFile, Request
+from fastapi import FastAPI, File, UploadFile, Request, Form, Depends
 from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -7,18 +7,50 @@ from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from fastapi.responses import JSONResponse, StreamingResponse
 
-import shutil
-import os
 import io
 
 import base64
 import sys
-
-from src.pipeline.bg_prediction_pipeline import process_remove_bg, process_add_bg, process_inpaint
-from src.pipeline.run_meme_generator_pipeline import run_pipeline, fetch_image_templates
+import time
+import json
+import zipfile
+from pathlib import Path
+from typing import List, Optional
+from contextlib import asynccontextmanager
+
+from src.pipeline.bg_prediction_pipeline import (
+    process_remove_bg,
+    process_remove_bg_batch,
+    process_add_bg,
+    process_add_bg_batch,
+    process_inpaint,
+    process_replace_bg,
+    remove_bg_cache_key,
+    add_bg_cache_key,
+    replace_bg_cache_key,
+)
+from src.pipeline.run_meme_generator_pipeline import run_pipeline_async, fetch_image_templates
+from src.pipeline.service_container import ServiceContainer
 from src.exceptions import CustomException
+from src.logger import logging
+from src.utils.result_cache import result_cache
+from src.utils.executor import execution_layer, QueueFullError
+from src.utils.background_registry import background_registry
+from src.utils.job_queue import inpaint_job_queue
+from src.utils.capabilities import capability_loader, CapabilityDisabledError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Components, pools and models are built once here and shared by every request
+    services = ServiceContainer()
+    services.start()
+    app.state.services = services
+    yield
+    services.shutdown()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,86 +65,400 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 
+def get_services(request: Request) -> ServiceContainer:
+    return request.app.state.services
+
+
+def requires(capability: str):
+    """Route dependency that answers 503 when this worker does not serve `capability`."""
+    def _check():
+        capability_loader.require(capability)
+    return Depends(_check)
+
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError):
+    return JSONResponse(status_code=503, content={"error": str(exc)})
+
+
+@app.exception_handler(CapabilityDisabledError)
+async def capability_disabled_handler(request: Request, exc: CapabilityDisabledError):
+    return JSONResponse(status_code=503, content={"error": str(exc)})
+
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
-@app.post("/remove-background/")
-async def remove_background(file: UploadFile = File(...)):
+async def _cached_result(cache_key: str):
+    """Look `cache_key` up in the result cache; only the in-memory tier is read on the event loop."""
+    image_bytes = result_cache.get_memory(cache_key)
+    if image_bytes is None:
+        image_bytes = await execution_layer.run_blocking(result_cache.get_disk, cache_key)
+    return image_bytes
+
+
+async def _cache_result(cache_key: str, image_bytes: bytes):
+    result_cache.put_memory(cache_key, image_bytes)
+    await execution_layer.run_blocking(result_cache.put_disk, cache_key, image_bytes)
+
+
+@app.post("/remove-background/", dependencies=[requires("remove-bg")])
+async def remove_background(
+    file: UploadFile = File(...),
+    model_name: str = Form(None),
+    quality: str = Form(None),
+    services: ServiceContainer = Depends(get_services)
+):
     try:
-        temp_input_path = f"temp_{file.filename}"
-        with open(temp_input_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        image_data = await file.read()
+        cache_key = remove_bg_cache_key(image_data, model_name=model_name, quality=quality)
+        image_bytes = await _cached_result(cache_key)
+        if image_bytes is not None:
+            return StreamingResponse(io.BytesIO(image_bytes), media_type="image/png", headers={"X-Cache": "hit"})
+
+        image_bytes = await execution_layer.run_inference(
+            process_remove_bg,
+            image_data,
+            model_name=model_name,
+            quality=quality,
+            filename=file.filename,
+            remove_bg_obj=services.remove_bg
+        )
+
+        await _cache_result(cache_key, image_bytes)
+        return StreamingResponse(io.BytesIO(image_bytes), media_type="image/png", headers={"X-Cache": "miss"})
+
+    except QueueFullError:
+        raise
+    except CustomException as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Unexpected error: {str(e)}"}
 
-        output_path = process_remove_bg(temp_input_path)
 
-        with open(output_path, "rb") as image_file:
-            image_bytes = image_file.read()
+BATCH_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tiff"}
 
-        os.remove(temp_input_path)
-        return StreamingResponse(io.BytesIO(image_bytes), media_type="image/png")
 
+async def _read_batch_uploads(files: List[UploadFile]) -> List[tuple]:
+    """Read uploaded images (and images inside uploaded zips) into (unique name, bytes) pairs."""
+    images = []
+
+    def _add(name: str, data: bytes):
+        images.append((f"{len(images):05d}_{Path(name).name}", data))
+
+    for file in files:
+        data = await file.read()
+        if file.filename.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for member in archive.infolist():
+                    if member.is_dir() or Path(member.filename).suffix.lower() not in BATCH_IMAGE_EXTENSIONS:
+                        continue
+                    _add(member.filename, archive.read(member))
+        else:
+            _add(file.filename, data)
+
+    return images
+
+
+def _zip_results(results) -> io.BytesIO:
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_STORED) as archive:
+        for name, image_bytes in results:
+            archive.writestr(name, image_bytes)
+    zip_buffer.seek(0)
+    return zip_buffer
+
+
+@app.post("/remove-background/batch", dependencies=[requires("remove-bg")])
+async def remove_background_batch(
+    files: List[UploadFile] = File(...),
+    model_name: str = Form(None),
+    quality: str = Form(None),
+    response_format: str = Form("zip"),
+    services: ServiceContainer = Depends(get_services)
+):
+    try:
+        if response_format not in ("zip", "ndjson"):
+            raise HTTPException(status_code=400, detail="response_format must be 'zip' or 'ndjson'")
+
+        images = await _read_batch_uploads(files)
+        if not images:
+            raise HTTPException(status_code=400, detail="No images found in the upload")
+
+        outputs, batch_size = await execution_layer.run_inference(
+            process_remove_bg_batch, images, model_name=model_name, quality=quality, remove_bg_obj=services.remove_bg
+        )
+
+        results = [(f"{Path(name).stem}.png", image_bytes) for (name, _), image_bytes in zip(images, outputs)]
+        # Inputs per model run; 1 means the model could not be batched
+        batch_headers = {"X-Batch-Size": str(batch_size)}
+
+        if response_format == "ndjson":
+            def _ndjson_lines():
+                for name, image_bytes in results:
+                    image_base64 = base64.b64encode(image_bytes).decode()
+                    yield json.dumps({"filename": name, "image_base64": image_base64}) + "\n"
+
+            return StreamingResponse(_ndjson_lines(), media_type="application/x-ndjson", headers=batch_headers)
+
+        zip_buffer = await execution_layer.run_blocking(_zip_results, results)
+
+        return StreamingResponse(
+            zip_buffer,
+            media_type="application/zip",
+            headers={"Content-Disposition": "attachment; filename=removed_backgrounds.zip", **batch_headers}
+        )
+
+    except (HTTPException, QueueFullError):
+        raise
     except CustomException as e:
         return {"error": str(e)}
     except Exception as e:
         return {"error": f"Unexpected error: {str(e)}"}
 
 
-@app.post("/add-background/")
+async def _resolve_background_id(background: UploadFile, background_id: str) -> str:
+    """Register an uploaded background, or check that a referenced background id exists."""
+    if background is not None:
+        background_data = await background.read()
+        return await execution_layer.run_blocking(background_registry.register, background_data)
+    if background_id:
+        if not background_registry.exists(background_id):
+            raise HTTPException(status_code=404, detail=f"Unknown background_id '{background_id}'")
+        return background_id
+    raise HTTPException(status_code=400, detail="Provide either a background upload or a background_id")
+
+
+@app.post("/backgrounds/", summary="Register a reusable background and return its id", dependencies=[requires("add-bg")])
+async def register_background(background: UploadFile = File(...)):
+    try:
+        background_id = await _resolve_background_id(background, None)
+        return JSONResponse(content=background_registry.metadata(background_id))
+    except (HTTPException, QueueFullError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/backgrounds/", summary="List registered backgrounds", dependencies=[requires("add-bg")])
+def list_backgrounds():
+    return JSONResponse(content={"backgrounds": background_registry.list()})
+
+
+@app.delete("/backgrounds/{background_id}", summary="Remove a registered background", dependencies=[requires("add-bg")])
+def delete_background(background_id: str):
+    try:
+        if not background_registry.exists(background_id):
+            raise HTTPException(status_code=404, detail=f"Unknown background_id '{background_id}'")
+        background_registry.delete(background_id)
+        return {"status": "deleted", "background_id": background_id}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/add-background/", dependencies=[requires("add-bg")])
 async def add_background(
     foreground: UploadFile = File(...),
-    background: UploadFile = File(...)
+    background: UploadFile = File(None),
+    background_id: str = Form(None),
+    fit: str = Form("stretch"),
+    services: ServiceContainer = Depends(get_services)
+):
+    try:
+        background_id = await _resolve_background_id(background, background_id)
+        foreground_data = await foreground.read()
+        cache_key = add_bg_cache_key(foreground_data, background_id, fit=fit)
+        image_bytes = await _cached_result(cache_key)
+        cache_status = "hit"
+        if image_bytes is None:
+            cache_status = "miss"
+            image_bytes = await execution_layer.run_blocking(
+                process_add_bg,
+                foreground_data,
+                background_id,
+                fit=fit,
+                filename=foreground.filename,
+                add_bg_obj=services.add_bg
+            )
+            await _cache_result(cache_key, image_bytes)
+
+        return StreamingResponse(
+            io.BytesIO(image_bytes),
+            media_type="image/png",
+            headers={"X-Cache": cache_status, "X-Background-Id": background_id}
+        )
+
+    except (HTTPException, QueueFullError):
+        raise
+    except CustomException as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Unexpected error: {str(e)}"}
+
+
+@app.post("/add-background/batch", dependencies=[requires("add-bg")])
+async def add_background_batch(
+    foregrounds: List[UploadFile] = File(...),
+    background: UploadFile = File(None),
+    background_id: str = Form(None),
+    fit: str = Form("stretch"),
+    placements: str = Form(None),
+    canvas_width: int = Form(None),
+    canvas_height: int = Form(None),
+    response_format: str = Form("zip"),
+    services: ServiceContainer = Depends(get_services)
 ):
     try:
-        temp_foreground_path = f"temp_foreground_{foreground.filename}"
-        with open(temp_foreground_path, "wb") as buffer:
-            shutil.copyfileobj(foreground.file, buffer)
+        if response_format not in ("zip", "ndjson"):
+            raise HTTPException(status_code=400, detail="response_format must be 'zip' or 'ndjson'")
+
+        background_id = await _resolve_background_id(background, background_id)
+        images = await _read_batch_uploads(foregrounds)
+        if not images:
+            raise HTTPException(status_code=400, detail="No images found in the upload")
+
+        # One placement object applies to every foreground; a list gives one per foreground
+        placement_list = None
+        if placements:
+            try:
+                placement_list = json.loads(placements)
+            except json.JSONDecodeError:
+                raise HTTPException(status_code=400, detail="placements must be valid JSON")
+            if isinstance(placement_list, dict):
+                placement_list = [placement_list] * len(images)
+            if not isinstance(placement_list, list) or len(placement_list) != len(images):
+                raise HTTPException(status_code=400, detail="placements must be one object or one per foreground")
+        canvas_size = (canvas_width, canvas_height) if canvas_width and canvas_height else None
+
+        outputs = await execution_layer.run_blocking(
+            process_add_bg_batch,
+            images,
+            background_id,
+            fit=fit,
+            placements=placement_list,
+            canvas_size=canvas_size,
+            add_bg_obj=services.add_bg
+        )
 
-        temp_background_path = f"temp_background_{background.filename}"
-        with open(temp_background_path, "wb") as buffer:
-            shutil.copyfileobj(background.file, buffer)
+        results = [(f"{Path(name).stem}.png", image_bytes) for (name, _), image_bytes in zip(images, outputs)]
 
-        output_path = process_add_bg(temp_foreground_path, temp_background_path)
+        if response_format == "ndjson":
+            def _ndjson_lines():
+                for name, image_bytes in results:
+                    image_base64 = base64.b64encode(image_bytes).decode()
+                    yield json.dumps({"filename": name, "image_base64": image_base64}) + "\n"
 
-        with open(output_path, "rb") as image_file:
-            image_bytes = image_file.read()
+            return StreamingResponse(
+                _ndjson_lines(), media_type="application/x-ndjson", headers={"X-Background-Id": background_id}
+            )
 
-        os.remove(temp_foreground_path)
-        os.remove(temp_background_path)
+        zip_buffer = await execution_layer.run_blocking(_zip_results, results)
 
-        return StreamingResponse(io.BytesIO(image_bytes), media_type="image/png")
+        return StreamingResponse(
+            zip_buffer,
+            media_type="application/zip",
+            headers={
+                "Content-Disposition": "attachment; filename=added_backgrounds.zip",
+                "X-Background-Id": background_id
+            }
+        )
 
+    except (HTTPException, QueueFullError):
+        raise
     except CustomException as e:
         return {"error": str(e)}
     except Exception as e:
         return {"error": f"Unexpected error: {str(e)}"}
 
 
-@app.post("/inpaint/")
-async def inpaint_image(
-    input_image: UploadFile = File(...),
-    mask_image: UploadFile = File(...)
+@app.post("/replace-background/", dependencies=[requires("remove-bg"), requires("add-bg")])
+async def replace_background(
+    file: UploadFile = File(...),
+    background: UploadFile = File(None),
+    background_id: str = Form(None),
+    fit: str = Form("stretch"),
+    model_name: str = Form(None),
+    quality: str = Form(None),
+    services: ServiceContainer = Depends(get_services)
 ):
     try:
-        temp_input_path = f"temp_input_{input_image.filename}"
-        with open(temp_input_path, "wb") as buffer:
-            shutil.copyfileobj(input_image.file, buffer)
+        background_id = await _resolve_background_id(background, background_id)
+        image_data = await file.read()
+        cache_key = replace_bg_cache_key(image_data, background_id, fit=fit, model_name=model_name, quality=quality)
+        image_bytes = await _cached_result(cache_key)
+        cache_status = "hit"
+        if image_bytes is None:
+            cache_status = "miss"
+            image_bytes = await execution_layer.run_inference(
+                process_replace_bg,
+                image_data,
+                background_id,
+                fit=fit,
+                model_name=model_name,
+                quality=quality,
+                filename=file.filename,
+                remove_bg_obj=services.remove_bg,
+                add_bg_obj=services.add_bg
+            )
+            await _cache_result(cache_key, image_bytes)
 
-        temp_mask_path = f"temp_mask_{mask_image.filename}"
-        with open(temp_mask_path, "wb") as buffer:
-            shutil.copyfileobj(mask_image.file, buffer)
+        return StreamingResponse(
+            io.BytesIO(image_bytes),
+            media_type="image/png",
+            headers={"X-Cache": cache_status, "X-Background-Id": background_id}
+        )
 
-        output_path = process_inpaint(mask_img_path=temp_mask_path, input_img_path=temp_input_path)
+    except (HTTPException, QueueFullError):
+        raise
+    except CustomException as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Unexpected error: {str(e)}"}
+
+
+@app.get("/cache/stats", summary="Hit/miss counters and sizes of the result cache")
+def cache_stats_api():
+    return JSONResponse(content=result_cache.stats())
 
-        with open(output_path, "rb") as image_file:
-            image_bytes = image_file.read()
 
-        os.remove(temp_input_path)
-        os.remove(temp_mask_path)
+@app.get("/startup-report", summary="Enabled capabilities, their import time and RSS growth")
+def startup_report_api():
+    return JSONResponse(content=capability_loader.report())
+
+
+@app.post("/inpaint/", dependencies=[requires("inpaint")])
+async def inpaint_image(
+    input_image: UploadFile = File(...),
+    mask_image: UploadFile = File(...),
+    mode: str = Form(None),
+    engine: str = Form(None),
+    profile: str = Form(None),
+    services: ServiceContainer = Depends(get_services)
+):
+    try:
+        input_data = await input_image.read()
+        mask_data = await mask_image.read()
+
+        # Inpainting stays in-process on its own threads so the single resident pipeline is shared
+        image_bytes = await execution_layer.run_inference_inprocess(
+            process_inpaint,
+            mask_bytes=mask_data,
+            input_bytes=input_data,
+            mode=mode,
+            engine=engine,
+            profile=profile,
+            filename=input_image.filename,
+            inpaint_obj=services.inpaint
+        )
 
         return StreamingResponse(io.BytesIO(image_bytes), media_type="image/png")
 
+    except QueueFullError:
+        raise
     except CustomException as e:
         return {"error": str(e)}
     except Exception as e:
@@ -120,16 +466,84 @@ async def inpaint_image(
 
 
 
+@app.post("/inpaint/jobs", status_code=202, summary="Queue an inpainting job and return its id", dependencies=[requires("inpaint")])
+async def submit_inpaint_job(
+    input_image: UploadFile = File(...),
+    mask_image: UploadFile = File(...),
+    mode: str = Form(None),
+    engine: str = Form(None),
+    profile: str = Form(None),
+    priority: int = Form(0),
+    services: ServiceContainer = Depends(get_services)
+):
+    input_data = await input_image.read()
+    mask_data = await mask_image.read()
+    job_id = inpaint_job_queue.submit(
+        execution_layer.call_inference_inprocess,
+        process_inpaint,
+        mask_bytes=mask_data,
+        input_bytes=input_data,
+        mode=mode,
+        engine=engine,
+        profile=profile,
+        filename=input_image.filename,
+        inpaint_obj=services.inpaint,
+        priority=priority
+    )
+    return JSONResponse(status_code=202, content=inpaint_job_queue.get(job_id))
+
+
+@app.get("/inpaint/jobs/{job_id}", summary="Status and progress of an inpainting job", dependencies=[requires("inpaint")])
+def inpaint_job_status(job_id: str):
+    record = inpaint_job_queue.get(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job '{job_id}'")
+    return JSONResponse(content=record)
+
+
+@app.get("/inpaint/jobs/{job_id}/result", summary="PNG result of a finished inpainting job", dependencies=[requires("inpaint")])
+def inpaint_job_result(job_id: str):
+    record = inpaint_job_queue.get(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job '{job_id}'")
+    if record["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {record['status']}")
+    image_bytes = inpaint_job_queue.result(job_id)
+    if image_bytes is None:
+        raise HTTPException(status_code=404, detail=f"Result of job '{job_id}' has expired")
+    return StreamingResponse(io.BytesIO(image_bytes), media_type="image/png")
+
+
+@app.delete("/inpaint/jobs/{job_id}", summary="Cancel a queued or running inpainting job", dependencies=[requires("inpaint")])
+def cancel_inpaint_job(job_id: str):
+    record = inpaint_job_queue.cancel(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job '{job_id}'")
+    return JSONResponse(content=record)
+
+
 # Input model
 class TopicInput(BaseModel):
     topic_name: str
+    mode: Optional[str] = None
+
+
+def _server_timing(timings: dict) -> str:
+    """Render stage timings (seconds) as a Server-Timing header value in milliseconds."""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
 
 # --- Routes ---
 
-@app.post("/generate-meme", summary="Generate meme and return PNG")
-def generate_meme_api(input: TopicInput):
+@app.post("/generate-meme", summary="Generate meme and return PNG", dependencies=[requires("meme")])
+async def generate_meme_api(input: TopicInput, services: ServiceContainer = Depends(get_services)):
     try:
-        result = run_pipeline(input.topic_name)
+        result = await run_pipeline_async(
+            input.topic_name,
+            topic_ingestion=services.topic_ingestion,
+            emotion_analyzer=services.emotion_analyzer,
+            memes_generator=services.memes_generator,
+            mode=input.mode
+        )
         image_bytes = result["image_bytes"]
         emotion = result["emotion"]
 
@@ -138,16 +552,26 @@ def generate_meme_api(input: TopicInput):
         return StreamingResponse(
             image_bytes,
             media_type="image/png",
-            headers={"X-Emotion": emotion}
+            headers={
+                "X-Emotion": emotion,
+                "X-Generation": result["generation"],
+                "Server-Timing": _server_timing(result["timings"])
+            }
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/generate-meme-base64", summary="Generate meme and return as base64")
-def generate_meme_base64_api(input: TopicInput):
+@app.post("/generate-meme-base64", summary="Generate meme and return as base64", dependencies=[requires("meme")])
+async def generate_meme_base64_api(input: TopicInput, services: ServiceContainer = Depends(get_services)):
     try:
-        result = run_pipeline(input.topic_name)
+        result = await run_pipeline_async(
+            input.topic_name,
+            topic_ingestion=services.topic_ingestion,
+            emotion_analyzer=services.emotion_analyzer,
+            memes_generator=services.memes_generator,
+            mode=input.mode
+        )
         image_bytes = result["image_bytes"]
         emotion = result["emotion"]
 
@@ -157,16 +581,46 @@ def generate_meme_base64_api(input: TopicInput):
         return {
             "status": "success",
             "emotion": emotion,
+            "generation": result["generation"],
+            "timings": result["timings"],
             "image_base64": f"data:image/png;base64,{base64_str}"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/fetch-templates", summary="Fetch image templates from Supabase")
-def fetch_templates_api():
+@app.get("/llm-cache/stats", summary="Hit rates of the Gemini result cache", dependencies=[requires("meme")])
+def llm_cache_stats_api():
+    from src.utils.llm_cache import llm_cache
+
+    return JSONResponse(content=llm_cache.stats())
+
+
+@app.get("/llm-client/stats", summary="Calls, retries, hedges and latency percentiles of the LLM client", dependencies=[requires("meme")])
+def llm_client_stats_api(services: ServiceContainer = Depends(get_services)):
+    return JSONResponse(content=services.memes_generator.llm_client.stats())
+
+
+@app.get("/templates/stats", summary="Template index, prefetch progress and render cache stats", dependencies=[requires("meme")])
+def template_stats_api():
+    from src.utils.template_index import template_index
+    from src.utils.template_store import template_prefetcher, template_store
+    from src.utils.template_image_cache import template_image_cache
+    from src.utils.font_manager import font_manager
+
+    return JSONResponse(content={
+        "index": template_index.stats(),
+        "store": template_store.stats(),
+        "prefetch": template_prefetcher.stats(),
+        "images": template_image_cache.stats(),
+        "fonts": font_manager.stats(),
+    })
+
+
+@app.get("/fetch-templates", summary="Fetch image templates from Supabase", dependencies=[requires("meme")])
+def fetch_templates_api(services: ServiceContainer = Depends(get_services)):
     try:
-        result = fetch_image_templates()
+        result = fetch_image_templates(services.meme_templates)
         return JSONResponse(content={"status": "success", "templates": result})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
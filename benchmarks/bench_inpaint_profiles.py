@@ -0,0 +1,62 @@
+"""
+Benchmark the diffusion inpainting speed profiles (fast / balanced / quality).
+
+Each profile runs in a fresh process so its peak RSS is not inflated by the
+others. The first call (model load, LoRA load, graph warmup) is reported
+separately from the steady-state seconds per image.
+
+    python -m benchmarks.bench_inpaint_profiles photo.png mask.png --repeats 2
+    python -m benchmarks.bench_inpaint_profiles photo.png mask.png --profiles fast balanced --mode full
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+
+
+def _run_profile(image_path, mask_path, profile, mode, repeats):
+    from PIL import Image
+
+    from src.components.inpaint import Inpaint
+
+    inpaint_obj = Inpaint()
+    image = Image.open(image_path).convert("RGB")
+    mask = Image.open(mask_path).convert("L")
+
+    start = time.perf_counter()
+    inpaint_obj.initiate_inpaint(mask, image, mode=mode, engine="diffusion", profile=profile)
+    first_call = time.perf_counter() - start
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        inpaint_obj.initiate_inpaint(mask, image, mode=mode, engine="diffusion", profile=profile)
+        timings.append(time.perf_counter() - start)
+
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    return first_call, min(timings) if timings else first_call, peak_rss_mb
+
+
+def main():
+    from src.constants import INPAINT_PROFILES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image", help="Input image")
+    parser.add_argument("mask", help="Mask image (white = area to fill)")
+    parser.add_argument("--profiles", nargs="+", default=list(INPAINT_PROFILES), choices=list(INPAINT_PROFILES))
+    parser.add_argument("--mode", default="region", choices=["region", "full"])
+    parser.add_argument("--repeats", type=int, default=2)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'profile':>10} {'first call':>12} {'s / image':>12} {'peak RSS':>12}")
+    for profile in args.profiles:
+        with context.Pool(1) as pool:
+            first_call, per_image, peak_rss_mb = pool.apply(
+                _run_profile, (args.image, args.mask, profile, args.mode, args.repeats)
+            )
+        print(f"{profile:>10} {first_call:11.2f}s {per_image:11.2f}s {peak_rss_mb:9.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark the async LLM client offline against the fake backend.
+
+Runs the same load (requests issued with bounded concurrency against a backend
+with a slow tail) with hedging off and on, and reports latency percentiles and
+how many backend requests each setting cost. Then checks the process-wide
+concurrency limit: two threads, each running its own event loop, issue calls
+through one client, and the peak number of backend requests in flight must
+stay within `max_concurrency`.
+
+    python -m benchmarks.bench_llm_client
+    python -m benchmarks.bench_llm_client --requests 400 --latency 0.2 --tail-latency 2 --tail-probability 0.05
+"""
+import argparse
+import asyncio
+import threading
+import time
+import types
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def _run(client, requests: int, concurrency: int):
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def _one(i):
+        async with limit:
+            start = time.perf_counter()
+            await client.generate(f"Categorize topic {i}. Return ONLY the emotion as a single word.")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(_one(i) for i in range(requests)))
+    return latencies
+
+
+def _check_cross_loop_limit(base_config: dict, calls_per_loop: int, loops: int = 2):
+    from src.utils.llm_client import AsyncLLMClient, FakeBackend
+
+    class CountingBackend(FakeBackend):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._count_lock = threading.Lock()
+            self.in_flight = self.peak = 0
+
+        async def generate(self, prompt: str, **kwargs) -> str:
+            with self._count_lock:
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+            try:
+                return await super().generate(prompt, **kwargs)
+            finally:
+                with self._count_lock:
+                    self.in_flight -= 1
+
+    config = types.SimpleNamespace(**{**base_config, "hedge_enabled": False})
+    backend = CountingBackend(0.02, 0.02, 0.0, seed=0)
+    client = AsyncLLMClient(backend, llm_client_config=config)
+
+    async def _loop_calls(offset):
+        await asyncio.gather(*(client.generate(f"prompt {offset + i}") for i in range(calls_per_loop)))
+
+    threads = [threading.Thread(target=asyncio.run, args=(_loop_calls(n * calls_per_loop),)) for n in range(loops)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(
+        f"cross-loop limit: {loops} loops x {calls_per_loop} calls, peak in flight {backend.peak} "
+        f"(max_concurrency {config.max_concurrency}), {backend.calls} backend calls"
+    )
+    assert backend.peak <= config.max_concurrency, "concurrency limit exceeded across event loops"
+    assert client.stats()["in_flight"] == 0, "limiter slots leaked"
+
+
+def main():
+    from src.entity.config_entity import ConfigEntity, LLMClientConfigEntity
+    from src.utils.llm_client import AsyncLLMClient, FakeBackend
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--tail-latency", type=float, default=1.5)
+    parser.add_argument("--tail-probability", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    base_config = vars(LLMClientConfigEntity(config_entity=ConfigEntity()))
+    print(f"{'hedging':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'backend calls':>14}")
+    for hedge_enabled in (False, True):
+        config = types.SimpleNamespace(**{**base_config, "hedge_enabled": hedge_enabled, "hedge_initial_delay": 0.3})
+        backend = FakeBackend(args.latency, args.tail_latency, args.tail_probability, args.failure_rate, seed=0)
+        client = AsyncLLMClient(backend, llm_client_config=config)
+        latencies = asyncio.run(_run(client, args.requests, args.concurrency))
+        print(
+            f"{'on' if hedge_enabled else 'off':>8} "
+            f"{_percentile(latencies, 0.5):7.3f}s {_percentile(latencies, 0.95):7.3f}s "
+            f"{_percentile(latencies, 0.99):7.3f}s {max(latencies):7.3f}s {backend.calls:>14}"
+        )
+    _check_cross_loop_limit(base_config, calls_per_loop=max(args.requests // 4, 10))
+
+
+if __name__ == "__main__":
+    main()
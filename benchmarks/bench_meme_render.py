@@ -0,0 +1,106 @@
+"""
+Benchmark meme rendering (`MemesGenerator.add_text_to_image`) offline.
+
+Generates JPEG templates in a temporary directory and renders memes that pick
+templates at random, first with no caches, then with the template image cache,
+then with the image and font caches. Reports the time to get a drawable template
+(decode vs. copy of the cached image), full render latency percentiles and hit
+rates. PNG encoding and glyph rendering dominate the full render, so the load
+column shows the image cache's effect. First checks that font size quantization
+never grows a caption and shrinks it by at most FONT_SIZE_TOLERANCE, including
+sizes far above the preloaded ones.
+
+    python -m benchmarks.bench_meme_render
+    python -m benchmarks.bench_meme_render --renders 500 --templates 50 --size 1200
+"""
+import argparse
+import random
+import tempfile
+import time
+import types
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _make_templates(directory: str, count: int, size: int):
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        # Smooth gradients plus noise compress and decode like real photos
+        gradient = np.linspace(0, 255, size, dtype=np.float32)
+        base = (gradient[None, :, None] + gradient[:, None, None] * 0.5) % 256
+        noise = rng.normal(0, 20, (size, size, 3))
+        array = np.clip(base + noise + i * 7, 0, 255).astype(np.uint8)
+        path = f"{directory}/template_{i}.jpg"
+        Image.fromarray(array).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def _check_font_quantization(font_manager, tolerance: float):
+    for size in (0, 1, 8, 12, 16, 17, 48, 96, 97, 128, 150, 240, 400):
+        quantized = font_manager.quantize(size)
+        assert quantized <= size, f"size {size} grew to {quantized}"
+        assert size <= font_manager.exact_below and quantized == size or quantized >= size * (1 - tolerance), (
+            f"size {size} shrank to {quantized}"
+        )
+    print(f"font quantization: 96 -> {font_manager.quantize(96)}, 150 -> {font_manager.quantize(150)}, "
+          f"400 -> {font_manager.quantize(400)}, 8 -> {font_manager.quantize(8)}")
+
+
+def main():
+    from src.entity.config_entity import ConfigEntity, FontConfigEntity, MemeTemplatesEntity
+    from src.components.memes_generator import MemesGenerator
+    from src.utils.font_manager import FontManager
+    from src.utils.template_image_cache import TemplateImageCache
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=200)
+    parser.add_argument("--templates", type=int, default=20)
+    parser.add_argument("--size", type=int, default=800, help="Template width and height in pixels")
+    args = parser.parse_args()
+
+    base_config = vars(MemeTemplatesEntity(config_entity=ConfigEntity()))
+    base_font_config = vars(FontConfigEntity(config_entity=ConfigEntity()))
+    _check_font_quantization(FontManager(FontConfigEntity(config_entity=ConfigEntity())), base_font_config["size_tolerance"])
+    with tempfile.TemporaryDirectory() as directory:
+        paths = _make_templates(directory, args.templates, args.size)
+        print(
+            f"{'caches':>14} {'load p50':>9} {'render p50':>11} {'render p95':>11} "
+            f"{'image hits':>11} {'font hits':>10} {'memory MB':>10}"
+        )
+        for label, image_cached, font_cached in (("none", False, False), ("image", True, False), ("image + font", True, True)):
+            image_cache = TemplateImageCache(types.SimpleNamespace(
+                **{**base_config, "image_cache_max_bytes": base_config["image_cache_max_bytes"] if image_cached else 0}
+            ))
+            font_manager = FontManager(types.SimpleNamespace(
+                **{**base_font_config, "cache_entries": base_font_config["cache_entries"] if font_cached else 0}
+            ))
+            generator = MemesGenerator(model=object(), image_cache=image_cache, font_manager=font_manager)
+            rng = random.Random(0)
+            loads, latencies = [], []
+            for i in range(args.renders):
+                path = rng.choice(paths)
+                start = time.perf_counter()
+                image_cache.open(path)
+                loads.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                generator.add_text_to_image(path, f"Upper caption number {i}", f"And the lower punchline {i * 7}")
+                latencies.append(time.perf_counter() - start)
+            stats, font_stats = image_cache.stats(), font_manager.stats()
+            print(
+                f"{label:>14} {_percentile(loads, 0.5) * 1000:7.2f}ms "
+                f"{_percentile(latencies, 0.5) * 1000:9.1f}ms {_percentile(latencies, 0.95) * 1000:9.1f}ms "
+                f"{stats['hit_rate'] or 0:11.2f} {font_stats['hit_rate'] or 0:10.2f} "
+                f"{stats['memory_bytes'] / 1024 / 1024:10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark batched segmentation against the single-image rembg path.
+
+Loads the configured model (or --model-name) through the session registry, which
+rebuilds fixed-batch exports with a dynamic batch dimension, and reports the
+batch size `predict_masks` will really use. Then times `session.predict` once per
+image against `predict_masks` at batch size 1 and at --batch-size on the same
+synthetic photos, checks the masks match the single-image path and prints the
+per-image time of each. Run it on the deployment hardware: on a single CPU core a
+convolutional graph is compute bound and batching gives no per-image gain, the
+gain comes from cores or a GPU that one 320x320 input leaves idle.
+
+    python -m benchmarks.bench_remove_bg_batch
+    python -m benchmarks.bench_remove_bg_batch --count 64 --batch-size 16 --model-name u2net
+"""
+import argparse
+import time
+
+import numpy as np
+from PIL import Image
+
+
+def _synthetic_photos(count: int, size: int):
+    rng = np.random.default_rng(0)
+    photos = []
+    for i in range(count):
+        array = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+        # A bright blob on a noisy background gives the model something to segment
+        yy, xx = np.mgrid[:size, :size]
+        blob = (xx - size / 2 - i) ** 2 + (yy - size / 2) ** 2 < (size / 4) ** 2
+        array[blob] = 220
+        photos.append(Image.fromarray(array))
+    return photos
+
+
+def main():
+    from src.entity.config import BgConfig, RemoveBgConfig
+    from src.utils.rembg_sessions import rembg_session_registry
+    from src.utils.segmentation import effective_batch_size, predict_masks
+
+    config = RemoveBgConfig(bg_config=BgConfig())
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=32)
+    parser.add_argument("--size", type=int, default=640, help="Photo width and height in pixels")
+    parser.add_argument("--batch-size", type=int, default=config.batch_size)
+    parser.add_argument("--model-name", default=config.model_name)
+    args = parser.parse_args()
+
+    session = rembg_session_registry.get_session(args.model_name)
+    batch_size = effective_batch_size(session, args.batch_size)
+    print(f"model {args.model_name}: input {session.inner_session.get_inputs()[0].shape}, effective batch size {batch_size}")
+
+    photos = _synthetic_photos(args.count, args.size)
+    predict_masks(session, args.model_name, photos[:batch_size], batch_size=batch_size)  # graph optimization
+
+    start = time.perf_counter()
+    single = [session.predict(photo)[0] for photo in photos]
+    single_time = time.perf_counter() - start
+    print(f"{'strategy':>18} {'ms/image':>9} {'speedup':>8} {'max mask diff':>14}")
+    print(f"{'session.predict':>18} {single_time / args.count * 1000:9.1f} {1.0:7.2f}x {0:>14}")
+
+    for size in sorted({1, batch_size}):
+        start = time.perf_counter()
+        masks = predict_masks(session, args.model_name, photos, batch_size=size)
+        elapsed = time.perf_counter() - start
+        diff = max(
+            int(np.abs(np.asarray(a, dtype=np.int16) - np.asarray(b, dtype=np.int16)).max())
+            for a, b in zip(single, masks)
+        )
+        print(f"{f'predict_masks x{size}':>18} {elapsed / args.count * 1000:9.1f} {single_time / elapsed:7.2f}x {diff:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark the background removal quality tiers (raw / fast / full).
+
+Segmentation is timed once, then each tier's cutout step is timed on the same mask.
+
+    python -m benchmarks.bench_remove_bg_quality path/to/photo.jpg --repeats 3
+    python -m benchmarks.bench_remove_bg_quality photo.jpg --mask photo_mask.png   # skip the model
+"""
+import argparse
+import time
+
+from PIL import Image, ImageOps
+
+from src.components.remove_bg import RemoveBg
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image", help="Input photo")
+    parser.add_argument("--mask", help="Precomputed segmentation mask; when omitted the model predicts one")
+    parser.add_argument("--model-name", default=None)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    remove_bg_obj = RemoveBg()
+    image = ImageOps.exif_transpose(Image.open(args.image))
+    image.load()
+    print(f"image: {args.image} {image.size[0]}x{image.size[1]}")
+
+    if args.mask:
+        mask = Image.open(args.mask).convert("L").resize(image.size)
+    else:
+        from src.utils.rembg_sessions import rembg_session_registry
+
+        session = rembg_session_registry.get_session(args.model_name)
+        session.predict(image)  # first run pays for graph optimization
+        start = time.perf_counter()
+        mask = session.predict(image)[0]
+        print(f"{'segmentation':>12}: {time.perf_counter() - start:8.3f}s")
+
+    for quality in remove_bg_obj.remove_bg_config.quality_tiers:
+        timings = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            remove_bg_obj._cutout(image, mask, quality)
+            timings.append(time.perf_counter() - start)
+        print(f"{quality:>12}: {min(timings):8.3f}s (best of {args.repeats})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark app startup cost per capability set.
+
+Every configuration runs in a fresh interpreter with ENABLED_CAPABILITIES set,
+imports `app` and then loads the enabled capabilities, so the numbers show what
+a meme-only worker saves compared to a worker that also serves the models.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --sets meme add-bg remove-bg,add-bg,inpaint meme,remove-bg,add-bg,inpaint
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+_CHILD = """
+import json, time
+start = time.perf_counter()
+import app
+app_import = time.perf_counter() - start
+from src.utils.capabilities import capability_loader
+for name in capability_loader.enabled:
+    capability_loader.load(name)
+print(json.dumps({"app_import_seconds": app_import, "report": capability_loader.report()}))
+"""
+
+
+def _measure(capabilities: str) -> dict:
+    env = dict(os.environ, ENABLED_CAPABILITIES=capabilities)
+    output = subprocess.run(
+        [sys.executable, "-c", _CHILD], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    from src.constants import CAPABILITIES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--sets", nargs="+", default=[*CAPABILITIES, ",".join(CAPABILITIES)],
+        help="Comma separated capability sets, one fresh process each"
+    )
+    args = parser.parse_args()
+
+    print(f"{'capabilities':>26} {'import app':>11} {'load caps':>10} {'RSS':>9} {'peak RSS':>9}")
+    for capabilities in args.sets:
+        result = _measure(capabilities)
+        report = result["report"]
+        load_seconds = sum(entry.get("import_seconds", 0) for entry in report["capabilities"].values())
+        print(
+            f"{capabilities:>26} {result['app_import_seconds']:10.2f}s {load_seconds:9.2f}s "
+            f"{report['rss_mb']:6.0f} MB {report['peak_rss_mb']:6.0f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
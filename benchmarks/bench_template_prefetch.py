@@ -0,0 +1,114 @@
+"""
+Benchmark the template prefetcher against a local HTTP server.
+
+Serves generated "template" images from a ThreadingHTTPServer with a fixed
+per-request latency. Some paths answer 503 on their first request to exercise
+retries. Compares one `requests.get` per template (the old request-time download)
+with the prefetcher at concurrency 1 and at the configured concurrency, each
+into a fresh temporary store.
+
+    python -m benchmarks.bench_template_prefetch
+    python -m benchmarks.bench_template_prefetch --templates 500 --latency 0.05 --flaky-every 10
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _serve(latency: float, flaky_every: int):
+    seen = set()
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so pooled connections are reused
+        disable_nagle_algorithm = True  # headers and body are separate writes; avoid delayed-ACK stalls
+
+        def do_GET(self):
+            time.sleep(latency)
+            name = os.path.splitext(os.path.basename(self.path))[0]
+            if not name.isdigit():
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            index = int(name)
+            with lock:
+                first = self.path not in seen
+                seen.add(self.path)
+            if flaky_every and index % flaky_every == 0 and first:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = (f"template {index} ".encode() * 2048)[:16384]
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    import requests
+    from src.entity.config_entity import ConfigEntity, MemeTemplatesEntity
+    from src.utils.template_store import TemplatePrefetcher, TemplateStore
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds the server takes per request")
+    parser.add_argument("--flaky-every", type=int, default=10, help="Every Nth template fails once with 503 (0 = never)")
+    args = parser.parse_args()
+
+    base_config = vars(MemeTemplatesEntity(config_entity=ConfigEntity()))
+    print(f"{'strategy':>22} {'seconds':>8} {'templates/s':>12} {'stored':>7} {'retries':>8} {'failed':>7}")
+    for concurrency in (None, 1, base_config["prefetch_concurrency"]):
+        server = _serve(args.latency, args.flaky_every)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        urls = [f"{base_url}/templates/{i}.jpg" for i in range(args.templates)]
+        with tempfile.TemporaryDirectory() as store_dir, tempfile.TemporaryDirectory() as legacy_dir:
+            start = time.perf_counter()
+            if concurrency is None:
+                # One plain request per template, no pooling, concurrency or retries
+                stored = 0
+                for url in urls:
+                    response = requests.get(url, timeout=10)
+                    if response.ok:
+                        with open(os.path.join(legacy_dir, os.path.basename(url)), "wb") as f:
+                            f.write(response.content)
+                        stored += 1
+                stats = {"retries": 0, "failed": len(urls) - stored}
+                label = "sequential requests.get"
+            else:
+                config = types.SimpleNamespace(**{
+                    **base_config, "prefetch_concurrency": concurrency, "prefetch_backoff": 0.05, "template_dir": legacy_dir
+                })
+                store = TemplateStore(store_dir)
+                prefetcher = TemplatePrefetcher(store, meme_templates_config=config)
+                prefetcher.schedule(urls)
+                prefetcher.wait()
+                prefetcher.shutdown()
+                stored = sum(1 for url in urls if store.path_for(url) and os.path.exists(store.path_for(url)))
+                stats = prefetcher.stats()
+                label = f"prefetcher x{concurrency}"
+            elapsed = time.perf_counter() - start
+        server.shutdown()
+        print(
+            f"{label:>22} {elapsed:8.2f} {len(urls) / elapsed:12.1f} {stored:>7} "
+            f"{stats['retries']:>8} {stats['failed']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,28 @@ from src.exceptions import CustomException
 from src.logger import logging
 from src.entity.config import BgConfig, ChangeBgConfig
 from src.entity.artifact import ChangeBgArtifact
-from src.utils import generate_unique_filename
 
 import sys
+from dataclasses import dataclass
+from collections import defaultdict
 from PIL import Image
-import os
-import shutil
+
+# Fractional position of the anchor point on both the foreground and the canvas
+ANCHORS = {
+    "top-left": (0.0, 0.0), "top": (0.5, 0.0), "top-right": (1.0, 0.0),
+    "left": (0.0, 0.5), "center": (0.5, 0.5), "right": (1.0, 0.5),
+    "bottom-left": (0.0, 1.0), "bottom": (0.5, 1.0), "bottom-right": (1.0, 1.0),
+}
+
+
+@dataclass
+class Placement:
+    """Where a foreground goes on the shared background canvas."""
+    offset_x: int = 0
+    offset_y: int = 0
+    scale: float = 1.0
+    anchor: str = "top-left"
+
 
 class AddBg:
     def __init__(self):
@@ -16,47 +32,131 @@ class AddBg:
         except Exception as e:
             raise CustomException(e, sys)
 
-    def change_bg(self, img_path: str, bg_img_path: str) -> ChangeBgArtifact:
+    def change_bg(self, foreground: Image.Image, background: Image.Image) -> ChangeBgArtifact:
         try:
             logging.info("Changing background of the image.")
 
-            # Load foreground and background
-            foreground = Image.open(img_path).convert("RGBA")
-            background = Image.open(bg_img_path).convert("RGBA")
-            background = background.resize(foreground.size)
+            # Bring foreground and background to a common mode and size
+            # (backgrounds from the registry already arrive as RGBA at the right size)
+            if foreground.mode != "RGBA":
+                foreground = foreground.convert("RGBA")
+            if background.mode != "RGBA":
+                background = background.convert("RGBA")
+            if background.size != foreground.size:
+                background = background.resize(foreground.size)
 
             # Composite images
             combined = Image.alpha_composite(background, foreground)
 
-            # Ensure output folders exist
-            os.makedirs(self.change_bg_config.img_path_folder, exist_ok=True)
-            os.makedirs(self.change_bg_config.uploaded_path_folder, exist_ok=True)  # ✅ Ensure uploaded folder exists
+            logging.info("Background changed.")
+            return ChangeBgArtifact(ch_bg_img=combined)
 
-            # Save the combined image
-            output_image_path = generate_unique_filename(
-                img_path,
-                self.change_bg_config.img_path_folder
-            )
-            combined.save(output_image_path)
+        except Exception as e:
+            logging.error(f"Failed to change background: {e}")
+            raise CustomException(e, sys)
 
-            # ✅ Save the uploaded background for reference
-            uploaded_bg_path = generate_unique_filename(
-                bg_img_path,
-                self.change_bg_config.uploaded_path_folder
+    def _place(self, foreground: Image.Image, canvas_size, placement: Placement):
+        """Scale the foreground and return it with its top-left position on the canvas."""
+        if placement.anchor not in ANCHORS:
+            raise ValueError(f"Unsupported anchor '{placement.anchor}'. Supported anchors: {list(ANCHORS)}")
+        if placement.scale <= 0:
+            raise ValueError("Placement scale must be positive")
+        if placement.scale != 1.0:
+            foreground = foreground.resize(
+                (max(1, round(foreground.width * placement.scale)), max(1, round(foreground.height * placement.scale))),
+                Image.Resampling.LANCZOS
             )
-            shutil.copy(bg_img_path, uploaded_bg_path)
+        anchor_x, anchor_y = ANCHORS[placement.anchor]
+        left = round((canvas_size[0] - foreground.width) * anchor_x) + placement.offset_x
+        top = round((canvas_size[1] - foreground.height) * anchor_y) + placement.offset_y
+        return foreground, (left, top)
 
-            logging.info(f"Background changed and saved to: {output_image_path}")
-            logging.info(f"Uploaded background saved to: {uploaded_bg_path}")
+    def change_bg_shared(self, foregrounds, background, placements=None, canvas_size=None):
+        """
+        Composite many foregrounds onto one shared background, one
+        `Image.alpha_composite` per item.
 
-            return ChangeBgArtifact(ch_bg_img_path=output_image_path)
+        `background` is an image or a callable returning the background for a
+        (width, height) size. Without placements every foreground gets the
+        background at its own size, exactly like `change_bg`. With placements the
+        background is one canvas and each foreground is scaled, anchored and offset
+        on it; the canvas is `canvas_size` or the background's own size. The
+        background is prepared once per canvas size and items sharing a size and
+        position share one cropped background region.
+
+        Blending a stacked NumPy array of foregrounds in one vectorized step was
+        measured and rejected: with PIL's exact integer arithmetic it is over 10x
+        slower per core than this loop, so chunking it across threads cannot win
+        it back (see benchmarks/bench_composite_batch.py).
+        """
+        try:
+            logging.info(f"Compositing {len(foregrounds)} foregrounds onto a shared background.")
+
+            def _background_at(size):
+                if callable(background):
+                    return background(size)
+                base = background if background.mode == "RGBA" else background.convert("RGBA")
+                return base if base.size == tuple(size) else base.resize(size)
+
+            # Group items that blend against the same background region
+            groups = defaultdict(list)
+            prepared = []
+            canvas = None
+            if placements is not None:
+                if len(placements) != len(foregrounds):
+                    raise ValueError("Provide exactly one placement per foreground")
+                if canvas_size is None and callable(background):
+                    raise ValueError("canvas_size is required when placing onto a background provider")
+                canvas = _background_at(tuple(canvas_size or background.size))
+            for index, foreground in enumerate(foregrounds):
+                if foreground.mode != "RGBA":
+                    foreground = foreground.convert("RGBA")
+                if placements is None:
+                    canvas_size, position = foreground.size, (0, 0)
+                else:
+                    canvas_size = canvas.size
+                    foreground, position = self._place(foreground, canvas_size, placements[index])
+                prepared.append(foreground)
+                groups[(canvas_size, position, foreground.size)].append(index)
+
+            results = [None] * len(foregrounds)
+            backgrounds = {}
+            for (canvas_size, (left, top), (width, height)), indices in groups.items():
+                if canvas_size not in backgrounds:
+                    backgrounds[canvas_size] = canvas if placements is not None else _background_at(canvas_size)
+                base = backgrounds[canvas_size]
+                # Clip the foreground box to the canvas
+                box = (max(left, 0), max(top, 0), min(left + width, canvas_size[0]), min(top + height, canvas_size[1]))
+                if box[0] >= box[2] or box[1] >= box[3]:
+                    for index in indices:
+                        results[index] = base.copy()
+                    continue
+                full_frame = box == (0, 0, canvas_size[0], canvas_size[1])
+                region = base if full_frame else base.crop(box)
+                crop = (box[0] - left, box[1] - top, box[2] - left, box[3] - top)
+                for index in indices:
+                    foreground = prepared[index]
+                    if foreground.size != region.size:
+                        foreground = foreground.crop(crop)
+                    blended = Image.alpha_composite(region, foreground)
+                    if full_frame:
+                        results[index] = blended
+                    else:
+                        out = base.copy()
+                        out.paste(blended, box[:2])
+                        results[index] = out
+
+            logging.info(f"Batch compositing finished with {len(backgrounds)} prepared backgrounds.")
+            return [ChangeBgArtifact(ch_bg_img=image) for image in results]
 
         except Exception as e:
-            logging.error(f"Failed to change background: {e}")
+            logging.error(f"Failed to composite batch: {e}")
             raise CustomException(e, sys)
+
+
 if __name__ == "__main__":
     add_bg_obj = AddBg()
     add_bg_obj.change_bg(
-        img_path=r"C:\Users\Vamshi\Desktop\Projects\litzchill\remove_bg\artifacts\removed_bg_images\sky2_rmbg_1748686518.png",
-        bg_img_path=r"C:\Users\Vamshi\Desktop\Projects\litzchill\remove_bg\data\bg1.jpg"
+        foreground=Image.open(r"C:\Users\Vamshi\Desktop\Projects\litzchill\remove_bg\artifacts\removed_bg_images\sky2_rmbg_1748686518.png"),
+        background=Image.open(r"C:\Users\Vamshi\Desktop\Projects\litzchill\remove_bg\data\bg1.jpg")
     )
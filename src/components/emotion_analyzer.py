@@ -1,26 +1,41 @@
 import os
 import sys
-import google.generativeai as genai
+import asyncio
 
 from src.exceptions import CustomException
 from src.logger import logging
 from src.entity.config_entity import ConfigEntity, EmotionAnalyzerConfigEntity
 from src.entity.artifact_entity import EmotionAnalyzerArtifact
+from src.utils.gemini import get_gemini_model
+from src.utils.llm_cache import llm_cache
+from src.utils.llm_client import get_llm_client
 
 
 class EmotionAnalyzer:
-    def __init__(self):
+    def __init__(self, model=None, cache=None, llm_client=None):
         try:
             self.emotion_analyzer_config = EmotionAnalyzerConfigEntity(config_entity=ConfigEntity())
-            genai.configure(api_key=self.emotion_analyzer_config.gemini_api_key)
-            self.model = genai.GenerativeModel(self.emotion_analyzer_config.gemini_model_name)
+            self.cache = cache or llm_cache
+            self.model = model or get_gemini_model(
+                self.emotion_analyzer_config.gemini_model_name, self.emotion_analyzer_config.gemini_api_key
+            )
+            self.llm_client = llm_client or get_llm_client(self.model)
         except Exception as e:
             raise CustomException(e, sys)
 
     def analyze_emotion(self, text: str) -> EmotionAnalyzerArtifact:
+        """Blocking `analyze_emotion_async` for callers without an event loop."""
+        return asyncio.run(self.analyze_emotion_async(text))
+
+    async def analyze_emotion_async(self, text: str) -> EmotionAnalyzerArtifact:
         try:
             logging.info("Analyzing emotion in text...")
 
+            emotion = await self.cache.get_emotion_async(text)
+            if emotion is not None:
+                logging.info(f"Emotion served from cache: {emotion}")
+                return EmotionAnalyzerArtifact(emotion_name=emotion)
+
             prompt = (
                 "Categorize the emotional tone of the following text into one of the following categories:\n"
                 "happy, sad, angry, surprise, neutral, sarcastic.\n"
@@ -28,13 +43,14 @@ class EmotionAnalyzer:
                 "Return ONLY the emotion as a single word."
             )
 
-            response = self.model.generate_content(prompt)
-            emotion = getattr(response, "text", "").strip().lower()
+            emotion = (await self.llm_client.generate(prompt)).strip().lower()
 
             if not emotion:
                 raise ValueError("Gemini returned an empty response.")
 
-            if emotion not in self.emotion_analyzer_config.emotion_templates:
+            if emotion in self.emotion_analyzer_config.emotion_templates:
+                await self.cache.put_emotion_async(text, emotion)
+            else:
                 emotion = "neutral"
 
             logging.info(f"Emotion analyzed: {emotion}")
@@ -1,106 +1,397 @@
 import os
 import sys
-from diffusers import AutoPipelineForInpainting
+import time
+import functools
+import threading
+import numpy as np
+from diffusers import AutoPipelineForInpainting, LCMScheduler, DPMSolverMultistepScheduler
 from diffusers.utils import load_image
 import torch
+from PIL import Image
 
 from src.exceptions import CustomException
 from src.logger import logging
 from src.entity.config import BgConfig, InpaintConfig
 from src.entity.artifact import InpaintArtifact
-from src.utils import generate_unique_filename  # Utility for unique file naming
+from src.utils.model_manager import ModelManager
+from src.utils.micro_batcher import MicroBatcher
+from src.utils.inpaint_region import binarize_mask, context_window, aspect_bucket, feather_mask
+from src.utils.classical_inpaint import classical_inpaint
 
 # Optimize PyTorch memory behavior
 os.environ["PYTORCH_CUDA_ALLOC_CONF"] = "expandable_segments:True"
 
-class Inpaint:
-    def __init__(self):
-        try:
-            logging.info("Initializing InpaintConfig and background configuration.")
-            self.inpaint_config = InpaintConfig(bg_config=BgConfig())
 
-            logging.info("Detecting device for inference.")
-            self.device = "cuda" if torch.cuda.is_available() else "cpu"
-            logging.info(f"Using device: {self.device}")
+def _get_device() -> str:
+    return "cuda" if torch.cuda.is_available() else "cpu"
 
-            logging.info("Loading inpainting pipeline model.")
-            self.pipe = AutoPipelineForInpainting.from_pretrained(
-                "diffusers/stable-diffusion-xl-1.0-inpainting-0.1",
-                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-                variant="fp16" if self.device == "cuda" else None
-            ).to(self.device)
 
-            # Memory optimizations
-            self.pipe.enable_vae_slicing()
-            self.pipe.enable_attention_slicing()
-            if self.device == "cuda":
-                self.pipe.enable_model_cpu_offload()
+def _load_inpaint_pipeline(model_id: str = None):
+    """Load the inpainting pipeline onto the available device with memory optimizations."""
+    inpaint_config = InpaintConfig(bg_config=BgConfig())
+    model_id = model_id or inpaint_config.model_id
+    device = _get_device()
+    logging.info(f"Loading inpainting pipeline '{model_id}' on device: {device}")
 
-            logging.info("Pipeline model loaded and memory-optimized.")
+    pipe = AutoPipelineForInpainting.from_pretrained(
+        model_id,
+        torch_dtype=torch.float16 if device == "cuda" else getattr(torch, inpaint_config.cpu_dtype),
+        variant="fp16" if device == "cuda" else None
+    ).to(device)
 
-        except Exception as e:
-            logging.error("Error occurred during Inpaint class initialization.", exc_info=True)
-            raise CustomException(e, sys) from e
+    # Memory optimizations
+    pipe.enable_vae_slicing()
+    pipe.enable_attention_slicing()
+    if device == "cuda":
+        pipe.enable_model_cpu_offload()
 
-    def initiate_inpaint(self, mask_img_path: str, input_img_path: str) -> InpaintArtifact:
+    # Profiles swap schedulers and LoRA adapters on this pipeline; remember what it started with
+    _pipeline_state[model_id] = {"default_scheduler": pipe.scheduler, "schedulers": {}, "adapters": {}}
+
+    logging.info("Pipeline model loaded and memory-optimized.")
+    return pipe
+
+
+def _release_device_memory():
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+_pipeline_state = {}
+_inpaint_config = InpaintConfig(bg_config=BgConfig())
+
+# Shared by every Inpaint instance so the weights are loaded once per process
+inpaint_model_manager = ModelManager(
+    name="sdxl-inpainting",
+    loader=_load_inpaint_pipeline,
+    idle_timeout=_inpaint_config.idle_timeout,
+    unloader=_release_device_memory,
+)
+_inpaint_model_managers = {_inpaint_config.model_id: inpaint_model_manager}
+_inpaint_model_managers_lock = threading.Lock()
+
+
+def get_inpaint_model_manager(model_id: str) -> ModelManager:
+    """Model manager for `model_id`; profiles that use another checkpoint get their own lazily loaded pipeline."""
+    with _inpaint_model_managers_lock:
+        if model_id not in _inpaint_model_managers:
+            _inpaint_model_managers[model_id] = ModelManager(
+                name=model_id,
+                loader=functools.partial(_load_inpaint_pipeline, model_id),
+                idle_timeout=_inpaint_config.idle_timeout,
+                unloader=_release_device_memory,
+            )
+        return _inpaint_model_managers[model_id]
+
+
+def unload_inpaint_models():
+    for manager in list(_inpaint_model_managers.values()):
+        manager.unload()
+
+
+_SCHEDULERS = {
+    "lcm": lambda config: LCMScheduler.from_config(config),
+    "dpm++": lambda config: DPMSolverMultistepScheduler.from_config(config, use_karras_sigmas=True),
+}
+
+
+def _load_lora(pipe, model_id: str, lora_id: str):
+    """Adapter name of `lora_id` on the pipeline, loading it on first use; None if it cannot be loaded."""
+    state = _pipeline_state[model_id]
+    if lora_id not in state["adapters"]:
+        adapter_name = f"adapter_{len(state['adapters'])}"
+        logging.info(f"Loading LoRA '{lora_id}' into '{model_id}'")
         try:
-            logging.info("Starting inpainting process.")
+            pipe.load_lora_weights(lora_id, adapter_name=adapter_name)
+        except (ImportError, ValueError, OSError) as e:
+            # diffusers' adapter API needs peft; remember the failure so it is not retried per request
+            logging.error(f"Could not load LoRA '{lora_id}', falling back to the non-LoRA profile: {e}")
+            adapter_name = None
+        state["adapters"][lora_id] = adapter_name
+    return state["adapters"][lora_id]
+
+
+def _apply_profile(pipe, model_id: str, profile: dict) -> dict:
+    """
+    Put the profile's scheduler and LoRA adapter on the pipeline and return the
+    profile to run with; callers hold the model lock. A profile whose LoRA cannot
+    be loaded runs with the scheduler, steps and guidance of the LoRA fallback
+    profile instead.
+    """
+    state = _pipeline_state[model_id]
+
+    adapter_name = _load_lora(pipe, model_id, profile["lora_id"]) if profile["lora_id"] else None
+    if profile["lora_id"] and adapter_name is None:
+        profile = {**_inpaint_config.profiles[_inpaint_config.lora_fallback_profile], "model_id": model_id}
+
+    scheduler_name = profile["scheduler"]
+    if scheduler_name is None:
+        pipe.scheduler = state["default_scheduler"]
+    else:
+        if scheduler_name not in state["schedulers"]:
+            state["schedulers"][scheduler_name] = _SCHEDULERS[scheduler_name](state["default_scheduler"].config)
+        pipe.scheduler = state["schedulers"][scheduler_name]
+
+    if adapter_name is not None:
+        pipe.enable_lora()
+        pipe.set_adapters([adapter_name])
+    elif any(state["adapters"].values()):
+        pipe.disable_lora()
+    return profile
+
+
+def _run_inpaint_batch(key, items):
+    """Run one pipeline call over `items` of (image, mask, progress_callback) that share `key`."""
+    device, profile_name, (width, height) = key
+    profile = _inpaint_config.profiles[profile_name]
+    prompt = "natural seamless fill"
+    num_inference_steps = profile["num_inference_steps"]
+    logging.info(f"Using prompt: {prompt}")
+
+    callbacks = [callback for _, _, callback in items]
+    errors = [None] * len(items)
+
+    def _on_step_end(pipeline, step, timestep, tensors):
+        # strength < 1 skips the first timesteps, so ask the pipeline how many it runs
+        total = getattr(pipeline, "num_timesteps", num_inference_steps)
+        for index, callback in enumerate(callbacks):
+            if callback is None or errors[index] is not None:
+                continue
+            try:
+                callback(step + 1, total)
+            except Exception as e:
+                # A cancelled caller drops out of the results; the rest of the batch keeps going
+                errors[index] = e
+        if all(error is not None for error in errors):
+            raise errors[0]
+        return tensors
+
+    # One seeded generator per image keeps each result independent of its batch mates
+    generators = [torch.Generator(device=device).manual_seed(0) for _ in items]
+
+    logging.info(f"Running inpainting model on {len(items)} image(s) with the '{profile_name}' profile...")
+    with get_inpaint_model_manager(profile["model_id"]).acquire() as pipe, torch.inference_mode():
+        profile = _apply_profile(pipe, profile["model_id"], profile)
+        num_inference_steps = profile["num_inference_steps"]
+        images = pipe(
+            prompt=[prompt] * len(items),
+            image=[image for image, _, _ in items],
+            mask_image=[mask_image for _, mask_image, _ in items],
+            width=width,
+            height=height,
+            callback_on_step_end=_on_step_end if any(callbacks) else None,
+            guidance_scale=profile["guidance_scale"],
+            num_inference_steps=num_inference_steps,
+            strength=profile["strength"],
+            generator=generators,
+        ).images
+    return [error if error is not None else image for error, image in zip(errors, images)]
 
-            # Ensure required folders exist
-            os.makedirs(self.inpaint_config.uploaded_path_folder, exist_ok=True)
-            os.makedirs(self.inpaint_config.img_path_folder, exist_ok=True)
-            os.makedirs(self.inpaint_config.inpaint_output_dir, exist_ok=True)
 
-            target_size = (768, 768)
+inpaint_batcher = MicroBatcher(
+    name="sdxl-inpainting",
+    run_batch=_run_inpaint_batch,
+    max_batch_size=_inpaint_config.max_batch_size,
+    max_wait=_inpaint_config.batch_max_wait,
+)
 
-            logging.info(f"Loading and resizing input image from: {input_img_path}")
-            image = load_image(input_img_path).resize(target_size)
 
-            logging.info(f"Loading and resizing mask image from: {mask_img_path}")
-            mask_image = load_image(mask_img_path).resize(target_size)
+class InpaintEngine:
+    """
+    Inpainting backend. `inpaint` fills the white area of `mask` in `image` and
+    returns the result; `mode` is "region" or "full" and engines without a
+    fixed working resolution may ignore it. `progress_callback(step, total)`,
+    when given, is called as work advances.
+    """
+    name = None
 
-            prompt = "natural seamless fill"
-            logging.info(f"Using prompt: {prompt}")
+    def __init__(self, inpaint_config: InpaintConfig, device: str, profile: str = None):
+        self.inpaint_config = inpaint_config
+        self.device = device
+        self.profile = profile or inpaint_config.default_profile
 
-            generator = torch.Generator(device=self.device).manual_seed(0)
+    def inpaint(self, image: Image.Image, mask: Image.Image, mode: str, progress_callback=None) -> Image.Image:
+        raise NotImplementedError
 
-            logging.info("Running inpainting model...")
-            with torch.inference_mode():
-                output_image = self.pipe(
-                    prompt=prompt,
-                    image=image,
-                    mask_image=mask_image,
-                    guidance_scale=8.0,
-                    num_inference_steps=20,
-                    strength=0.99,
-                    generator=generator,
-                ).images[0]
 
-            output_img_path = generate_unique_filename(
-                input_image_path=input_img_path,
-                output_folder=self.inpaint_config.inpaint_output_dir
+class DiffusionInpaintEngine(InpaintEngine):
+    """SDXL inpainting pipeline shared through the model managers, run with the given speed profile."""
+    name = "diffusion"
+
+    def _run_pipe(self, image: Image.Image, mask_image: Image.Image, progress_callback=None) -> Image.Image:
+        # Concurrent calls with the same bucket share one batched pipeline call
+        key = (self.device, self.profile, image.size)
+        return inpaint_batcher.submit(key, (image, mask_image, progress_callback))
+
+    def _inpaint_full_frame(self, mask_image: Image.Image, input_image: Image.Image, progress_callback=None) -> Image.Image:
+        config = self.inpaint_config
+        target_size = aspect_bucket(input_image.size, config.pixel_budget, config.bucket_multiple)
+
+        logging.info(f"Resizing {input_image.size[0]}x{input_image.size[1]} input image and mask to {target_size}")
+        image = load_image(input_image).resize(target_size, Image.Resampling.LANCZOS)
+        mask_image = load_image(mask_image).resize(target_size, Image.Resampling.NEAREST)
+        output = self._run_pipe(image, mask_image, progress_callback=progress_callback)
+        return output.resize(input_image.size, Image.Resampling.LANCZOS)
+
+    def _inpaint_region(self, mask_image: Image.Image, input_image: Image.Image, progress_callback=None) -> Image.Image:
+        """Inpaint a padded crop around the mask and feather-blend it back into the full-resolution input."""
+        config = self.inpaint_config
+        image = input_image.convert("RGB")
+        mask = binarize_mask(mask_image, image.size)
+
+        bbox = mask.getbbox()
+        if bbox is None:
+            logging.info("Mask is empty, returning the input unchanged.")
+            return image
+
+        box = context_window(bbox, image.size, config.context_margin, config.min_context)
+        crop_size = (box[2] - box[0], box[3] - box[1])
+        # Small crops get a small bucket (never below min_context^2 pixels), large ones the full budget
+        step = config.bucket_multiple ** 2
+        budget = max(config.min_context ** 2, min(crop_size[0] * crop_size[1], config.pixel_budget)) // step * step
+        size = aspect_bucket(crop_size, budget, config.bucket_multiple)
+        logging.info(
+            f"Inpainting region {box} of {image.size[0]}x{image.size[1]} image "
+            f"(mask box {bbox}) at {size[0]}x{size[1]}"
+        )
+
+        crop_mask = mask.crop(box)
+        patch = self._run_pipe(
+            image.crop(box).resize(size, Image.Resampling.LANCZOS),
+            crop_mask.resize(size, Image.Resampling.NEAREST),
+            progress_callback=progress_callback,
+        )
+        if patch.size != crop_size:
+            patch = patch.resize(crop_size, Image.Resampling.LANCZOS)
+
+        output = image.copy()
+        output.paste(patch.convert("RGB"), box[:2], feather_mask(crop_mask, config.feather_radius))
+        return output
+
+    def inpaint(self, image: Image.Image, mask: Image.Image, mode: str, progress_callback=None) -> Image.Image:
+        if mode == "region":
+            return self._inpaint_region(mask, image, progress_callback=progress_callback)
+        return self._inpaint_full_frame(mask, image, progress_callback=progress_callback)
+
+
+class ClassicalInpaintEngine(InpaintEngine):
+    """
+    Model-free fill for scratches, small objects and watermarks: boundary-inwards
+    propagation plus harmonic smoothing on a tight crop around the mask. Runs on
+    CPU in well under a second for small masks and always keeps full resolution.
+    """
+    name = "classical"
+
+    def inpaint(self, image: Image.Image, mask: Image.Image, mode: str, progress_callback=None) -> Image.Image:
+        config = self.inpaint_config
+        image = image.convert("RGB")
+        mask = binarize_mask(mask, image.size)
+
+        bbox = mask.getbbox()
+        if bbox is None:
+            logging.info("Mask is empty, returning the input unchanged.")
+            return image
+
+        margin = config.classical_margin
+        box = (
+            max(bbox[0] - margin, 0), max(bbox[1] - margin, 0),
+            min(bbox[2] + margin, image.width), min(bbox[3] + margin, image.height)
+        )
+        logging.info(f"Classical inpainting of region {box} in {image.size[0]}x{image.size[1]} image")
+
+        filled = classical_inpaint(
+            np.asarray(image.crop(box)),
+            np.asarray(mask.crop(box)) > 0,
+            smoothing_iterations=config.classical_smoothing_iterations
+        )
+        output = image.copy()
+        output.paste(Image.fromarray(filled), box[:2])
+        if progress_callback is not None:
+            progress_callback(1, 1)
+        return output
+
+
+# Backends selectable per request by name; add an InpaintEngine subclass here to plug in another one
+INPAINT_ENGINES = {engine.name: engine for engine in (DiffusionInpaintEngine, ClassicalInpaintEngine)}
+
+
+class Inpaint:
+    def __init__(self):
+        try:
+            logging.info("Initializing InpaintConfig and background configuration.")
+            self.inpaint_config = InpaintConfig(bg_config=BgConfig())
+
+            self.device = _get_device()
+            logging.info(f"Using device: {self.device}")
+
+        except Exception as e:
+            logging.error("Error occurred during Inpaint class initialization.", exc_info=True)
+            raise CustomException(e, sys) from e
+
+    def _resolve_engine(self, engine: str, mask_image: Image.Image) -> str:
+        engine = engine or self.inpaint_config.default_engine
+        if engine not in self.inpaint_config.supported_engines:
+            raise ValueError(
+                f"Unsupported inpaint engine '{engine}'. Supported engines: {self.inpaint_config.supported_engines}"
             )
+        if engine != "auto":
+            return engine
 
-            logging.info(f"Saving output image to: {output_img_path}")
-            output_image.save(output_img_path)
+        # Small masks are scratches / blemishes / watermarks the classical fill handles well
+        histogram = mask_image.convert("L").histogram()
+        area = sum(histogram[128:]) / (mask_image.width * mask_image.height)
+        engine = "classical" if area <= self.inpaint_config.auto_classical_max_area else "diffusion"
+        logging.info(f"Auto engine picked '{engine}' for mask area {area:.2%}")
+        return engine
 
-            logging.info("Inpainting process completed successfully.")
+    def initiate_inpaint(
+        self,
+        mask_image: Image.Image,
+        input_image: Image.Image,
+        mode: str = None,
+        engine: str = None,
+        profile: str = None,
+        progress_callback=None
+    ) -> InpaintArtifact:
+        """
+        Fill the masked area of `input_image`.
 
-            return InpaintArtifact(
-                mask_img_path=mask_img_path,
-                input_img_path=input_img_path,
-                output_img_path=output_img_path
+        `mode` "region" (default) keeps the original resolution and only runs the
+        model on a crop around the mask, resized to an aspect bucket sized to the
+        crop; "full" resizes the whole frame to the bucket of `pixel_budget` pixels
+        whose aspect ratio is closest to the input's, then back to the input size.
+        `engine` is "diffusion", "classical" or "auto", which picks by mask area.
+        `profile` ("fast", "balanced", "quality") sets the diffusion scheduler,
+        step count, guidance and checkpoint.
+        `progress_callback(step, total)` receives the diffusion step counter.
+        """
+        try:
+            mode = mode or self.inpaint_config.default_mode
+            if mode not in self.inpaint_config.modes:
+                raise ValueError(f"Unsupported inpaint mode '{mode}'. Supported modes: {self.inpaint_config.modes}")
+            profile = profile or self.inpaint_config.default_profile
+            if profile not in self.inpaint_config.profiles:
+                raise ValueError(
+                    f"Unsupported inpaint profile '{profile}'. Supported profiles: {list(self.inpaint_config.profiles)}"
+                )
+            engine = self._resolve_engine(engine, mask_image)
+            logging.info(f"Starting inpainting process ({engine} engine, {mode} mode, {profile} profile).")
+
+            start = time.perf_counter()
+            output_image = INPAINT_ENGINES[engine](self.inpaint_config, self.device, profile).inpaint(
+                input_image, mask_image, mode, progress_callback=progress_callback
             )
 
+            logging.info(f"Inpainting process completed successfully in {time.perf_counter() - start:.2f}s.")
+
+            return InpaintArtifact(output_img=output_image)
+
         except Exception as e:
             logging.error("Error occurred during inpainting.", exc_info=True)
             raise CustomException(e, sys) from e
 
         finally:
-            del image, mask_image
-            if 'output_image' in locals():
-                del output_image
-            torch.cuda.empty_cache()
+            _release_device_memory()
 
 
 # if __name__ == "__main__":
@@ -109,8 +400,8 @@ class Inpaint:
 #         # Example usage
 #         mask_path = r"/home/litzchill/vamshi/BG_addAndRemove/data/overture-creations-5sI6fQgYIuo_mask.png"
 #         input_path = r"/home/litzchill/vamshi/BG_addAndRemove/data/overture-creations-5sI6fQgYIuo.png"
-#         artifact = inpaint_instance.initiate_inpaint(mask_img_path=mask_path, input_img_path=input_path)
-#         print(f"Inpainting completed. Output saved at: {artifact.output_img_path}")
+#         artifact = inpaint_instance.initiate_inpaint(mask_image=Image.open(mask_path), input_image=Image.open(input_path))
+#         artifact.output_img.save("inpainted.png")
 #     except CustomException as e:
 #         logging.error(f"An error occurred: {e}")
 1
\ No newline at end of file
@@ -1,37 +1,67 @@
 from src.exceptions import CustomException
 from src.logger import logging
 
-import os, io, sys, json, random, requests
-import google.generativeai as genai
+import os, io, sys, json, asyncio
 
 from PIL import Image, ImageDraw, ImageFont
 import textwrap
-from urllib.parse import urlparse
 
-from src.entity.config_entity import ConfigEntity, EmotionAnalyzerConfigEntity, MemeTemplatesEntity
+from src.entity.config_entity import (
+    ConfigEntity, EmotionAnalyzerConfigEntity, MemeTemplatesEntity, MemeGenerationConfigEntity
+)
 from src.utils import generate_unique_filename
+from src.utils.gemini import get_gemini_model
+from src.utils.llm_cache import llm_cache
+from src.utils.llm_client import get_llm_client
+from src.utils.template_index import template_index
+from src.utils.template_store import template_prefetcher
+from src.utils.template_image_cache import template_image_cache
+from src.utils.font_manager import font_manager as default_font_manager
 
 from io import BytesIO
 
+_COMBINED_RESPONSE_KEYS = {"emotion", "upper", "lower"}
+
+
+class MemeResponseError(ValueError):
+    """Raised when the combined emotion + dialogues response does not pass validation."""
+
 
 class MemesGenerator:
-    def __init__(self):
+    def __init__(self, model=None, cache=None, llm_client=None, index=None, prefetcher=None, image_cache=None, font_manager=None):
         try:
             logging.info("Initializing MemesGenerator...")
+            self.cache = cache or llm_cache
+            self.template_index = index or template_index
+            self.prefetcher = prefetcher or template_prefetcher
+            self.image_cache = image_cache or template_image_cache
+            self.font_manager = font_manager or default_font_manager
             self.emotion_analyzer_config = EmotionAnalyzerConfigEntity(config_entity=ConfigEntity())
             self.meme_templates_config = MemeTemplatesEntity(config_entity=ConfigEntity())
+            self.meme_generation_config = MemeGenerationConfigEntity(config_entity=ConfigEntity())
 
-            genai.configure(api_key=self.emotion_analyzer_config.gemini_api_key)
-            self.model = genai.GenerativeModel(self.emotion_analyzer_config.gemini_model_name)
+            self.model = model or get_gemini_model(
+                self.emotion_analyzer_config.gemini_model_name, self.emotion_analyzer_config.gemini_api_key
+            )
+            self.llm_client = llm_client or get_llm_client(self.model)
             logging.info("MemesGenerator initialized successfully.")
         except Exception as e:
             logging.error("Error initializing MemesGenerator", exc_info=True)
             raise CustomException(e, sys)
 
     def generate_meme_dialogues(self, topic, emotion):
+        """Blocking `generate_meme_dialogues_async` for callers without an event loop."""
+        return asyncio.run(self.generate_meme_dialogues_async(topic, emotion))
+
+    async def generate_meme_dialogues_async(self, topic, emotion):
         """Generate two dialogues for the upper and lower parts of a Tenglish meme."""
         try:
             logging.info(f"Generating meme dialogues for topic='{topic}', emotion='{emotion}'")
+            dialogues = await self.cache.next_dialogues_async(topic, emotion)
+            if dialogues is not None:
+                logging.info("Meme dialogues served from cache.")
+                return dialogues
+
             prompt = f"""
             Create two funny Tenglish (Telugu-English mix) dialogues for a meme about: "{topic}"
             The emotion/tone should be: {emotion}
@@ -46,12 +76,12 @@ class MemesGenerator:
                 
             DO NOT format as JSON or include any formatting, just provide the two dialogues separated by a newline.
             """
-            response = self.model.generate_content(prompt)
-            text = response.text.strip()
+            text = (await self.llm_client.generate(prompt)).strip()
             lines = [line.strip() for line in text.split("\n") if line.strip()]
 
             if len(lines) >= 2:
                 logging.info("Successfully generated two dialogues.")
+                await self.cache.add_dialogues_async(topic, emotion, (lines[0], lines[1]))
                 return lines[0], lines[1]
             elif len(lines) == 1:
                 logging.warning("Only one dialogue received. Using fallback for second line.")
@@ -64,37 +94,100 @@ class MemesGenerator:
             logging.error("Error generating meme dialogues", exc_info=True)
             raise CustomException(e, sys)
 
+    def parse_combined_response(self, text: str):
+        """
+        Validate a combined response and return (emotion, upper, lower).
+
+        The response must be a single JSON object with exactly the keys emotion, upper
+        and lower; the emotion must be one of the emotion templates and both lines must be
+        non-empty single lines of at most `dialogue_max_chars` characters.
+        """
+        try:
+            data = json.loads(text)
+        except (TypeError, json.JSONDecodeError) as e:
+            raise MemeResponseError(f"Response is not valid JSON: {e}") from e
+        if not isinstance(data, dict) or set(data) != _COMBINED_RESPONSE_KEYS:
+            raise MemeResponseError(f"Expected an object with keys {sorted(_COMBINED_RESPONSE_KEYS)}, got {data!r}")
+        if not all(isinstance(data[key], str) for key in _COMBINED_RESPONSE_KEYS):
+            raise MemeResponseError("emotion, upper and lower must be strings")
+
+        emotion = data["emotion"].strip().lower()
+        if emotion not in self.meme_generation_config.emotion_templates:
+            raise MemeResponseError(f"Unknown emotion '{emotion}'")
+
+        lines = []
+        for key in ("upper", "lower"):
+            line = data[key].strip()
+            if not line or "\n" in line:
+                raise MemeResponseError(f"'{key}' must be a single non-empty line")
+            if len(line) > self.meme_generation_config.dialogue_max_chars:
+                raise MemeResponseError(f"'{key}' is longer than {self.meme_generation_config.dialogue_max_chars} characters")
+            lines.append(line)
+        return emotion, lines[0], lines[1]
+
+    def generate_emotion_and_dialogues(self, topic):
+        """Blocking `generate_emotion_and_dialogues_async` for callers without an event loop."""
+        return asyncio.run(self.generate_emotion_and_dialogues_async(topic))
+
+    async def generate_emotion_and_dialogues_async(self, topic):
+        """
+        Classify the emotion of `topic` and write both meme dialogues in one Gemini call.
+
+        Returns (emotion, upper, lower). Raises MemeResponseError when the response does
+        not pass `parse_combined_response`, so the caller can fall back to the two-call path.
+        A cached emotion is always kept: its dialogues come from the cache pool, or from a
+        dialogue-only call in that emotion while the pool is still filling.
+        """
+        try:
+            cached_emotion = await self.cache.get_emotion_async(topic)
+            if cached_emotion is not None:
+                logging.info(f"Emotion '{cached_emotion}' served from cache.")
+                return (cached_emotion, *await self.generate_meme_dialogues_async(topic, cached_emotion))
+
+            logging.info(f"Generating emotion and meme dialogues in one call for topic='{topic}'")
+            emotions = ", ".join(self.meme_generation_config.emotion_templates)
+            prompt = f"""
+            You write Tenglish (Telugu-English mix) memes. Topic: "{topic}"
+
+            1. Categorize the emotional tone of the topic into exactly one of: {emotions}.
+            2. Create two funny Tenglish dialogues in that tone: the first for the upper part of
+               the meme, the second a punchline or response for the lower part. Keep each under
+               100 characters and write Telugu words in English script.
+
+            Respond with ONLY a JSON object of the form
+            {{"emotion": "<one of: {emotions}>", "upper": "<first dialogue>", "lower": "<second dialogue>"}}
+            """
+            text = await self.llm_client.generate(
+                prompt, generation_config={"response_mime_type": "application/json"}
+            )
+        except Exception as e:
+            logging.error("Error generating emotion and meme dialogues", exc_info=True)
+            raise CustomException(e, sys)
+
+        emotion, upper_text, lower_text = self.parse_combined_response(text)
+        await self.cache.put_emotion_async(topic, emotion)
+        await self.cache.add_dialogues_async(topic, emotion, (upper_text, lower_text))
+        logging.info(f"Combined generation returned emotion '{emotion}' and two dialogues.")
+        return emotion, upper_text, lower_text
+
     def select_template(self, emotion):
-        """Select a template image for the given emotion using a JSON mapping of emotion -> image URLs."""
+        """Select an already downloaded template image for the given emotion; never downloads in the request."""
         try:
-            template_dir = self.meme_templates_config.template_dir
-            json_path = os.path.join(self.meme_templates_config.output_dir, self.meme_templates_config.json_file)
-            os.makedirs(template_dir, exist_ok=True)
+            template_dir = self.template_index.template_dir
             logging.info(f"Selecting template for emotion='{emotion}'")
 
-            with open(json_path, 'r') as f:
-                emotion_url_map = json.load(f)
-
-            if emotion in emotion_url_map and emotion_url_map[emotion]:
-                image_url = random.choice(emotion_url_map[emotion])
-                image_filename = os.path.basename(urlparse(image_url).path)
-                template_path = os.path.join(template_dir, image_filename)
-
-                if not os.path.exists(template_path):
-                    logging.info(f"Downloading template image from: {image_url}")
-                    try:
-                        response = requests.get(image_url, timeout=10)
-                        response.raise_for_status()
-                        with open(template_path, 'wb') as f:
-                            f.write(response.content)
-                        logging.info(f"Template image saved to {template_path}")
-                    except Exception as e:
-                        logging.warning(f"Failed to download image: {e}")
-                        return self._create_default_template(template_dir)
+            template_path = self.template_index.choose(emotion)
+            if template_path is not None:
                 return template_path
+
+            urls = self.template_index.templates(emotion)
+            if urls:
+                # Not downloaded yet: queue them for the background prefetcher and serve the default for now
+                self.prefetcher.schedule(urls)
+                logging.warning(f"No template for emotion '{emotion}' is on disk yet. Using default template.")
             else:
                 logging.warning(f"No image URLs found for emotion '{emotion}'. Using default template.")
-                return self._create_default_template(template_dir)
+            return self._create_default_template(template_dir)
         except Exception as e:
             logging.error("Error selecting meme template", exc_info=True)
             raise CustomException(e, sys)
@@ -118,15 +211,17 @@ class MemesGenerator:
         """Add the given text to the upper and lower parts of the meme template."""
         try:
             logging.info(f"Adding text to image: {image_path}")
-            img = Image.open(image_path)
+            # Draw on a copy of the cached decoded template instead of decoding the file again
+            img = self.image_cache.open(image_path)
             width, height = img.size
             draw = ImageDraw.Draw(img)
 
             try:
-                upper_font_size = min(int(height * 0.06), int(1000 / max(len(upper_text) / 2, 1)))
-                lower_font_size = min(int(height * 0.06), int(1000 / max(len(lower_text) / 2, 1)))
-                upper_font = ImageFont.truetype(self.meme_templates_config.font_path, size=upper_font_size)
-                lower_font = ImageFont.truetype(self.meme_templates_config.font_path, size=lower_font_size)
+                # Sizes are quantized so captions share a few cached FreeTypeFont objects
+                upper_font_size = self.font_manager.quantize(min(int(height * 0.06), int(1000 / max(len(upper_text) / 2, 1))))
+                lower_font_size = self.font_manager.quantize(min(int(height * 0.06), int(1000 / max(len(lower_text) / 2, 1))))
+                upper_font = self.font_manager.get(upper_font_size)
+                lower_font = self.font_manager.get(lower_font_size)
             except:
                 logging.warning("Custom font not found, using default font.")
                 upper_font = ImageFont.load_default()
@@ -201,12 +296,13 @@ class MemesGenerator:
         
 
 
-    def initiate_meme_generator(self, topic_name, emotion) -> BytesIO:
+    def initiate_meme_generator(self, topic_name, emotion, dialogues=None) -> BytesIO:
+        """Render a meme; pass `dialogues` (upper, lower) when they were already generated."""
         try:
             os.makedirs(self.meme_templates_config.memes_dir, exist_ok=True)
 
             # Generate meme dialogues
-            upper_text, lower_text = self.generate_meme_dialogues(topic_name, emotion)
+            upper_text, lower_text = dialogues or self.generate_meme_dialogues(topic_name, emotion)
 
             # Select meme template image path
             image_path = self.select_template(emotion)
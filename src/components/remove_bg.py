@@ -4,11 +4,12 @@ from src.logger import logging
 
 from src.entity.config import BgConfig, RemoveBgConfig
 from src.entity.artifact import RemoveBgArtifact
-from src.utils import generate_unique_filename
+from src.utils.rembg_sessions import rembg_session_registry
+from src.utils.segmentation import predict_masks, effective_batch_size
+from src.utils.matting import fast_refine_alpha
 
-from rembg import remove, new_session
-from PIL import Image
-import os
+from rembg.bg import alpha_matting_cutout, naive_cutout
+from PIL import Image, ImageOps
 
 class RemoveBg:
     def __init__(self):
@@ -17,41 +18,91 @@ class RemoveBg:
         except Exception as e:
             raise CustomException(e, sys)
 
-    def remove_bg(self, input_image_path: str) -> RemoveBgArtifact:
+    def _resolve_quality(self, quality: str = None) -> str:
+        quality = quality or self.remove_bg_config.default_quality
+        if quality not in self.remove_bg_config.quality_tiers:
+            raise ValueError(f"Unsupported quality '{quality}'. Supported tiers: {self.remove_bg_config.quality_tiers}")
+        return quality
+
+    def remove_bg(self, input_image: Image.Image, model_name: str = None, quality: str = None) -> RemoveBgArtifact:
         try:
-            logging.info(f"Removing background from image: {input_image_path}")
-            input_image = Image.open(input_image_path)
-
-            # Create session with specific model
-            session = new_session(model_name='u2net_human_seg')
-
-            output_image = remove(
-                input_image,
-                session=session,
-                alpha_matting=True,
-                alpha_matting_foreground_threshold=240,
-                alpha_matting_background_threshold=10,
-                alpha_matting_erode_size=5
-            )
+            quality = self._resolve_quality(quality)
+            logging.info(f"Removing background from {input_image.size[0]}x{input_image.size[1]} image (quality={quality})")
+            input_image = ImageOps.exif_transpose(input_image)
+
+            # Reuse the process-wide session for the requested model
+            session = rembg_session_registry.get_session(model_name or self.remove_bg_config.model_name)
+            mask = session.predict(input_image)[0]
+
+            output_image = self._cutout(input_image, mask, quality)
+            logging.info("Background removed.")
 
-            # Ensure specific folder exists
-            os.makedirs(self.remove_bg_config.img_path_folder, exist_ok=True)
+            return RemoveBgArtifact(rmbg_img=output_image)
+
+        except Exception as e:
+            logging.error(f"Error in removing background: {e}")
+            raise CustomException(e, sys) from e
 
-            # Generate unique filename
-            output_image_path = generate_unique_filename(
-                input_image_path,
-                self.remove_bg_config.img_path_folder
+    def _cutout(self, image: Image.Image, mask: Image.Image, quality: str) -> Image.Image:
+        """
+        Cut the foreground out of `image` using the predicted `mask`.
+
+        raw  - the segmentation mask is used as alpha directly
+        fast - the mask is refined with a guided filter on a downscaled copy
+        full - closed-form alpha matting at full resolution (slowest)
+        """
+        config = self.remove_bg_config
+        if quality == "raw":
+            return naive_cutout(image, mask)
+
+        if quality == "fast":
+            alpha = fast_refine_alpha(
+                image,
+                mask,
+                foreground_threshold=config.foreground_threshold,
+                background_threshold=config.background_threshold,
+                erode_size=config.erode_size,
+                work_size=config.fast_matting_work_size,
+                radius=config.fast_matting_radius,
+                eps=config.fast_matting_eps,
             )
+            cutout = image.convert("RGB")
+            cutout.putalpha(alpha)
+            return cutout
 
-            # Save final output image
-            output_image.save(output_image_path)
+        try:
+            return alpha_matting_cutout(
+                image,
+                mask,
+                config.foreground_threshold,
+                config.background_threshold,
+                config.erode_size,
+            )
+        except ValueError:
+            return naive_cutout(image, mask)
 
-            logging.info(f"Background removed and saved to: {output_image_path}")
+    def remove_bg_batch(self, input_images, model_name: str = None, quality: str = None, batch_size: int = None):
+        """Remove the background from many images, running segmentation on batches of inputs."""
+        try:
+            quality = self._resolve_quality(quality)
+            model_name = model_name or self.remove_bg_config.model_name
+            batch_size = batch_size or self.remove_bg_config.batch_size
+
+            session = rembg_session_registry.get_session(model_name)
+            model_batch_size = effective_batch_size(session, batch_size)
+            logging.info(f"Removing background from {len(input_images)} images in batches of {model_batch_size}")
+            images = [ImageOps.exif_transpose(image) for image in input_images]
+            masks = predict_masks(session, model_name, images, batch_size=batch_size)
+            artifacts = [
+                RemoveBgArtifact(rmbg_img=self._cutout(image, mask, quality), batch_size=model_batch_size)
+                for image, mask in zip(images, masks)
+            ]
 
-            return RemoveBgArtifact(rmbg_img_path=output_image_path)
+            logging.info(f"Batch background removal finished for {len(artifacts)} images")
+            return artifacts
 
         except Exception as e:
-            logging.error(f"Error in removing background: {e}")
+            logging.error(f"Error in batch background removal: {e}")
             raise CustomException(e, sys) from e
 
 
@@ -16,11 +16,122 @@ CH_BG_IMG_NAME = "changed_bg.png"
 # Default path folder (can be anything general)
 IMG_PATH_FOLDER = ARTIFACTS_DIR
 
+# Results are processed in memory; set PERSIST_ARTIFACTS=true to also save them under artifacts/
+PERSIST_ARTIFACTS = os.getenv("PERSIST_ARTIFACTS", "false").lower() in ("1", "true", "yes")
+
+"""constants for the capabilities a worker serves"""
+CAPABILITIES = ["meme", "remove-bg", "add-bg", "inpaint"]
+# Comma separated subset of CAPABILITIES; the libraries of the others are never imported,
+# e.g. ENABLED_CAPABILITIES=meme for a cheap meme worker without torch / rembg
+ENABLED_CAPABILITIES = [
+    name.strip() for name in os.getenv("ENABLED_CAPABILITIES", ",".join(CAPABILITIES)).split(",") if name.strip()
+]
+# Import and build the enabled capabilities at startup; false defers each one to its first request
+PRELOAD_CAPABILITIES = os.getenv("PRELOAD_CAPABILITIES", "true").lower() in ("1", "true", "yes")
+
 """constants for image inpainting"""
 MASK_IMG_NAME = "mask.png"
 INPUT_IMG_NAME = "input_image.png"
 INPAINT_OUTPUT_DIR = os.path.join(ARTIFACTS_DIR, "inpainted_images")
 INPAINT_OUTPUT_IMG_NAME = "output_image.png"
+INPAINT_MODEL_ID = "diffusers/stable-diffusion-xl-1.0-inpainting-0.1"
+# Seconds without requests before the inpainting pipeline is unloaded (0 keeps it resident)
+INPAINT_IDLE_TIMEOUT_SECONDS = float(os.getenv("INPAINT_IDLE_TIMEOUT_SECONDS", "900"))
+# "region" inpaints a padded crop around the mask and blends it back at full resolution,
+# "full" runs the whole frame at its aspect-ratio bucket and resizes the result back
+INPAINT_MODES = ["region", "full"]
+INPAINT_DEFAULT_MODE = os.getenv("INPAINT_MODE", "region")
+# Model inputs are snapped to buckets of multiples of INPAINT_BUCKET_MULTIPLE that keep the aspect
+# ratio and use at most INPAINT_PIXEL_BUDGET pixels (1024x1024 is native SDXL)
+INPAINT_PIXEL_BUDGET = int(os.getenv("INPAINT_PIXEL_BUDGET", str(1024 * 1024)))
+INPAINT_BUCKET_MULTIPLE = 64
+INPAINT_CONTEXT_MARGIN = 0.5  # context added around the mask box, as a fraction of the box size
+INPAINT_MIN_CONTEXT = 512  # smallest crop side in source pixels, so tiny masks still see their surroundings
+INPAINT_FEATHER_RADIUS = 8
+# "diffusion" runs SDXL, "classical" a model-free fill, "auto" picks classical for masks up to
+# INPAINT_AUTO_CLASSICAL_MAX_AREA of the image
+INPAINT_SUPPORTED_ENGINES = ["diffusion", "classical", "auto"]
+INPAINT_DEFAULT_ENGINE = os.getenv("INPAINT_ENGINE", "diffusion")
+INPAINT_AUTO_CLASSICAL_MAX_AREA = float(os.getenv("INPAINT_AUTO_CLASSICAL_MAX_AREA", "0.02"))
+INPAINT_CLASSICAL_MARGIN = 4
+INPAINT_CLASSICAL_SMOOTHING_ITERATIONS = 30
+# Concurrent diffusion calls with the same resolution are grouped into one batched call
+INPAINT_MAX_BATCH_SIZE = int(os.getenv("INPAINT_MAX_BATCH_SIZE", "4"))
+INPAINT_BATCH_MAX_WAIT_SECONDS = float(os.getenv("INPAINT_BATCH_MAX_WAIT_MS", "25")) / 1000
+# Speed profiles for the diffusion engine. guidance_scale <= 1 turns classifier-free guidance off
+# (one UNet pass per step instead of two); "lcm" needs the matching LCM LoRA for the checkpoint.
+# Set INPAINT_FAST_MODEL_ID to a smaller inpainting checkpoint together with its LoRA.
+INPAINT_PROFILES = {
+    "quality": {
+        "model_id": INPAINT_MODEL_ID, "scheduler": None, "lora_id": None,
+        "num_inference_steps": 20, "guidance_scale": 8.0, "strength": 0.99,
+    },
+    "balanced": {
+        "model_id": INPAINT_MODEL_ID, "scheduler": "dpm++", "lora_id": None,
+        "num_inference_steps": 12, "guidance_scale": 6.0, "strength": 0.99,
+    },
+    "fast": {
+        "model_id": os.getenv("INPAINT_FAST_MODEL_ID", INPAINT_MODEL_ID),
+        "scheduler": "lcm",
+        "lora_id": os.getenv("INPAINT_FAST_LORA_ID", "latent-consistency/lcm-lora-sdxl"),
+        "num_inference_steps": 4, "guidance_scale": 1.0, "strength": 0.99,
+    },
+}
+INPAINT_DEFAULT_PROFILE = os.getenv("INPAINT_PROFILE", "quality")
+# Profile whose scheduler / steps / guidance are used when a profile's LoRA cannot be loaded
+# (peft missing, weights unavailable); LCM settings without the LoRA give unusable results
+INPAINT_LORA_FALLBACK_PROFILE = "balanced"
+# Weights dtype on CPU: "float32" or "bfloat16" (half the memory, faster on CPUs with bf16 support)
+INPAINT_CPU_DTYPE = os.getenv("INPAINT_CPU_DTYPE", "float32")
+
+"""constants for the asynchronous inpainting job queue"""
+INPAINT_JOB_DIR = os.path.join(ARTIFACTS_DIR, "inpaint_jobs")
+INPAINT_JOB_WORKERS = int(os.getenv("INPAINT_JOB_WORKERS", "1"))
+INPAINT_JOB_MAX_QUEUED = int(os.getenv("INPAINT_JOB_MAX_QUEUED", "64"))
+# Seconds a finished job and its result are kept before they are deleted
+INPAINT_JOB_TTL_SECONDS = float(os.getenv("INPAINT_JOB_TTL_SECONDS", "3600"))
+
+"""constants for the execution layer that keeps blocking work off the event loop"""
+# "process" runs model inference in a process pool, "thread" in a thread pool
+INFERENCE_POOL_KIND = os.getenv("INFERENCE_POOL_KIND", "process")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "4"))
+MAX_PENDING_TASKS = int(os.getenv("MAX_PENDING_TASKS", "32"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS", "30"))
+# Inpainting runs in-process on its own threads so they share the resident pipeline; concurrent
+# calls are what the micro-batcher groups, so keep this at least INPAINT_MAX_BATCH_SIZE
+INPAINT_WORKERS = int(os.getenv("INPAINT_WORKERS", str(INPAINT_MAX_BATCH_SIZE)))
+INPAINT_MAX_PENDING = int(os.getenv("INPAINT_MAX_PENDING", "16"))
+
+"""constants for the content-hash result cache"""
+RESULT_CACHE_DIR = os.path.join(ARTIFACTS_DIR, "result_cache")
+RESULT_CACHE_MEMORY_BYTES = int(os.getenv("RESULT_CACHE_MEMORY_MB", "256")) * 1024 * 1024
+RESULT_CACHE_DISK_BYTES = int(os.getenv("RESULT_CACHE_DISK_MB", "2048")) * 1024 * 1024
+
+"""constants for the reusable background library"""
+BACKGROUND_REGISTRY_DIR = os.path.join(ARTIFACTS_DIR, "backgrounds")
+# Longest-side sizes stored next to the original for each registered background
+BACKGROUND_PYRAMID_SIZES = [512, 1024, 2048]
+BACKGROUND_CACHE_MEMORY_BYTES = int(os.getenv("BACKGROUND_CACHE_MEMORY_MB", "256")) * 1024 * 1024
+
+"""constants for background removal models"""
+REMBG_MODEL_NAME = "u2net_human_seg"
+REMBG_SUPPORTED_MODELS = ["u2net", "u2net_human_seg", "isnet-general-use", "silueta"]
+REMBG_BATCH_SIZE = int(os.getenv("REMBG_BATCH_SIZE", "8"))
+
+# Edge quality tiers: raw mask, guided-filter refinement on a downscaled copy, closed-form alpha matting
+REMOVE_BG_QUALITY_TIERS = ["raw", "fast", "full"]
+REMOVE_BG_DEFAULT_QUALITY = os.getenv("REMOVE_BG_DEFAULT_QUALITY", "full")
+ALPHA_MATTING_FOREGROUND_THRESHOLD = 240
+ALPHA_MATTING_BACKGROUND_THRESHOLD = 10
+ALPHA_MATTING_ERODE_SIZE = 5
+FAST_MATTING_WORK_SIZE = 512
+FAST_MATTING_RADIUS = 8
+FAST_MATTING_EPS = 1e-3
+# Comma separated list of models loaded and warmed when the app starts
+REMBG_WARMUP_MODELS = [
+    name.strip() for name in os.getenv("REMBG_WARMUP_MODELS", REMBG_MODEL_NAME).split(",") if name.strip()
+]
 
 
 
@@ -34,6 +145,15 @@ load_dotenv()
 # Directory paths
 TEMPLATE_DIR = "meme_templates"
 FONT_PATH = "fonts/Noto_Sans_Telugu/NotoSansTelugu-Regular.ttf"
+FONTS_DIR = "fonts"
+# Caption font sizes up to FONT_SIZE_EXACT_BELOW are used as computed; larger sizes are rounded down to a
+# geometric ladder so a small set of FreeTypeFont objects serves every caption, shrinking it by at most
+# FONT_SIZE_TOLERANCE (never growing it)
+FONT_SIZE_EXACT_BELOW = 16
+FONT_SIZE_TOLERANCE = float(os.getenv("FONT_SIZE_TOLERANCE", "0.05"))
+FONT_CACHE_ENTRIES = int(os.getenv("FONT_CACHE_ENTRIES", "128"))
+# Sizes loaded for the default font at startup: the usual captions on 300-800px templates
+FONT_PRELOAD_SIZES = [int(size) for size in os.getenv("FONT_PRELOAD_SIZES", "18,20,22,24,28,32,36,40,44,48").split(",") if size.strip()]
 
 API_KEY = os.getenv("GEMINI_API_KEY")
 MODEL_NAME = os.getenv("MODEL_NAME")
@@ -42,6 +162,44 @@ MODEL_NAME = os.getenv("MODEL_NAME")
 # Emotion templates
 EMOTION_TEMPLATES =['happy', 'sad', 'angry', 'surprise', 'neutral', 'sarcastic']
 
+# "combined" asks Gemini once for emotion + both dialogues as JSON and falls back to the
+# "two-call" path (emotion, then dialogues) only when that response fails validation
+MEME_GENERATION_MODES = ["combined", "two-call"]
+MEME_GENERATION_MODE = os.getenv("MEME_GENERATION_MODE", "combined")
+# Dialogue lines longer than this are rejected by the combined response validation
+MEME_DIALOGUE_MAX_CHARS = int(os.getenv("MEME_DIALOGUE_MAX_CHARS", "150"))
+
+# Gemini results cached per normalized topic and prompt version: an in-memory LRU in front of a
+# SQLite file shared by every uvicorn worker. Bump a prompt version whenever its prompt changes.
+LLM_CACHE_DB_PATH = os.path.join("artifacts", "llm_cache.sqlite3")
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+EMOTION_PROMPT_VERSION = "v1"
+DIALOGUE_PROMPT_VERSION = "v1"
+LLM_CACHE_EMOTION_TTL_SECONDS = float(os.getenv("LLM_CACHE_EMOTION_TTL_SECONDS", str(30 * 24 * 3600)))
+LLM_CACHE_DIALOGUE_TTL_SECONDS = float(os.getenv("LLM_CACHE_DIALOGUE_TTL_SECONDS", str(24 * 3600)))
+# Dialogue variants kept per topic + emotion; requests rotate through them once the pool is full
+MEME_DIALOGUE_VARIANTS = int(os.getenv("MEME_DIALOGUE_VARIANTS", "3"))
+
+# Async LLM client: "gemini" or "fake" (a local backend with simulated latency for offline tests / benchmarks)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "20"))  # whole call including retries
+LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY_SECONDS = 0.25  # exponential backoff with full jitter
+LLM_RETRY_MAX_DELAY_SECONDS = 2.0
+# A second, hedged request is sent when the first is slower than the LLM_HEDGE_PERCENTILE of recent
+# latencies (LLM_HEDGE_INITIAL_DELAY_SECONDS until LLM_HEDGE_MIN_SAMPLES calls were observed)
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_HEDGE_PERCENTILE = 0.95
+LLM_HEDGE_MIN_SAMPLES = 20
+LLM_HEDGE_INITIAL_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_INITIAL_DELAY_SECONDS", "3"))
+LLM_LATENCY_WINDOW = 200
+LLM_FAKE_LATENCY_SECONDS = float(os.getenv("LLM_FAKE_LATENCY_SECONDS", "0.3"))
+LLM_FAKE_TAIL_LATENCY_SECONDS = float(os.getenv("LLM_FAKE_TAIL_LATENCY_SECONDS", "3"))
+LLM_FAKE_TAIL_PROBABILITY = float(os.getenv("LLM_FAKE_TAIL_PROBABILITY", "0.05"))
+LLM_FAKE_FAILURE_RATE = float(os.getenv("LLM_FAKE_FAILURE_RATE", "0"))
+
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
@@ -56,4 +214,19 @@ TOPIC_NAME = None
 OUTPUT_DIR = "artifacts"
 TEMPLATES_DIR = "template_dir"
 JSON_FILE = "emotion_image_urls.json"
+# Seconds between mtime checks of JSON_FILE by the in-memory template index
+TEMPLATE_INDEX_CHECK_INTERVAL_SECONDS = float(os.getenv("TEMPLATE_INDEX_CHECK_INTERVAL_SECONDS", "1"))
+# Templates are downloaded in the background into a content-addressed store; requests only use
+# templates that are already on disk
+TEMPLATE_STORE_DIR = os.path.join("artifacts", "template_store")
+TEMPLATE_PREFETCH_CONCURRENCY = int(os.getenv("TEMPLATE_PREFETCH_CONCURRENCY", "8"))
+TEMPLATE_PREFETCH_RETRIES = int(os.getenv("TEMPLATE_PREFETCH_RETRIES", "3"))
+TEMPLATE_PREFETCH_TIMEOUT_SECONDS = float(os.getenv("TEMPLATE_PREFETCH_TIMEOUT_SECONDS", "10"))
+TEMPLATE_PREFETCH_BACKOFF_SECONDS = 0.5
+# A URL that still fails after its retries is not queued again for this long, doubling per
+# failure up to TEMPLATE_PREFETCH_FAILURE_MAX_BACKOFF_SECONDS; /fetch-templates retries them at once
+TEMPLATE_PREFETCH_FAILURE_BACKOFF_SECONDS = float(os.getenv("TEMPLATE_PREFETCH_FAILURE_BACKOFF_SECONDS", "300"))
+TEMPLATE_PREFETCH_FAILURE_MAX_BACKOFF_SECONDS = 6 * 3600
+# Decoded template images kept in memory, bounded by total pixel bytes
+TEMPLATE_IMAGE_CACHE_MEMORY_BYTES = int(os.getenv("TEMPLATE_IMAGE_CACHE_MEMORY_MB", "128")) * 1024 * 1024
 MEMES = "memes"
\ No newline at end of file
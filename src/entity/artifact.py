@@ -1,15 +1,19 @@
 from dataclasses import dataclass
+from typing import Optional
+from PIL import Image
 
 @dataclass
 class RemoveBgArtifact:
-    rmbg_img_path:str
+    rmbg_img: Image.Image
+    rmbg_img_path: Optional[str] = None
+    batch_size: Optional[int] = None  # inputs per model run when produced by a batch
 
 @dataclass
 class ChangeBgArtifact:
-    ch_bg_img_path: str
+    ch_bg_img: Image.Image
+    ch_bg_img_path: Optional[str] = None
 
 @dataclass
 class InpaintArtifact:
-    mask_img_path: str
-    input_img_path: str
-    output_img_path: str
\ No newline at end of file
+    output_img: Image.Image
+    output_img_path: Optional[str] = None
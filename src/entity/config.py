@@ -11,6 +11,9 @@ class BgConfig:
         self.bg_img_name = BG_IMG_NAME
         self.ch_bg_img_name = CH_BG_IMG_NAME
         self.img_path_folder = IMG_PATH_FOLDER
+        self.persist_artifacts = PERSIST_ARTIFACTS
+        self.capabilities = CAPABILITIES
+        self.enabled_capabilities = ENABLED_CAPABILITIES
         self.removed_bg_dir = REMOVED_BG_DIR
         self.changed_bg_dir = CHANGED_BG_DIR
         self.uploaded_bg_dir = UPLOADED_BG_DIR
@@ -18,6 +21,55 @@ class BgConfig:
         self.input_img_name = INPUT_IMG_NAME
         self.inpaint_output_dir = INPAINT_OUTPUT_DIR
         self.inpaint_output_img_name = INPAINT_OUTPUT_IMG_NAME
+        self.inpaint_model_id = INPAINT_MODEL_ID
+        self.inpaint_idle_timeout = INPAINT_IDLE_TIMEOUT_SECONDS
+        self.inpaint_modes = INPAINT_MODES
+        self.inpaint_default_mode = INPAINT_DEFAULT_MODE
+        self.inpaint_pixel_budget = INPAINT_PIXEL_BUDGET
+        self.inpaint_bucket_multiple = INPAINT_BUCKET_MULTIPLE
+        self.inpaint_context_margin = INPAINT_CONTEXT_MARGIN
+        self.inpaint_min_context = INPAINT_MIN_CONTEXT
+        self.inpaint_feather_radius = INPAINT_FEATHER_RADIUS
+        self.inpaint_supported_engines = INPAINT_SUPPORTED_ENGINES
+        self.inpaint_default_engine = INPAINT_DEFAULT_ENGINE
+        self.inpaint_auto_classical_max_area = INPAINT_AUTO_CLASSICAL_MAX_AREA
+        self.inpaint_classical_margin = INPAINT_CLASSICAL_MARGIN
+        self.inpaint_classical_smoothing_iterations = INPAINT_CLASSICAL_SMOOTHING_ITERATIONS
+        self.inpaint_max_batch_size = INPAINT_MAX_BATCH_SIZE
+        self.inpaint_batch_max_wait = INPAINT_BATCH_MAX_WAIT_SECONDS
+        self.inpaint_profiles = INPAINT_PROFILES
+        self.inpaint_default_profile = INPAINT_DEFAULT_PROFILE
+        self.inpaint_lora_fallback_profile = INPAINT_LORA_FALLBACK_PROFILE
+        self.inpaint_cpu_dtype = INPAINT_CPU_DTYPE
+        self.inpaint_job_dir = INPAINT_JOB_DIR
+        self.inpaint_job_workers = INPAINT_JOB_WORKERS
+        self.inpaint_job_max_queued = INPAINT_JOB_MAX_QUEUED
+        self.inpaint_job_ttl = INPAINT_JOB_TTL_SECONDS
+        self.inference_pool_kind = INFERENCE_POOL_KIND
+        self.inference_workers = INFERENCE_WORKERS
+        self.io_workers = IO_WORKERS
+        self.inpaint_workers = INPAINT_WORKERS
+        self.inpaint_max_pending = INPAINT_MAX_PENDING
+        self.max_pending_tasks = MAX_PENDING_TASKS
+        self.queue_timeout = QUEUE_TIMEOUT_SECONDS
+        self.result_cache_dir = RESULT_CACHE_DIR
+        self.result_cache_memory_bytes = RESULT_CACHE_MEMORY_BYTES
+        self.result_cache_disk_bytes = RESULT_CACHE_DISK_BYTES
+        self.background_registry_dir = BACKGROUND_REGISTRY_DIR
+        self.background_pyramid_sizes = BACKGROUND_PYRAMID_SIZES
+        self.background_cache_memory_bytes = BACKGROUND_CACHE_MEMORY_BYTES
+        self.rembg_model_name = REMBG_MODEL_NAME
+        self.rembg_supported_models = REMBG_SUPPORTED_MODELS
+        self.rembg_warmup_models = REMBG_WARMUP_MODELS
+        self.rembg_batch_size = REMBG_BATCH_SIZE
+        self.quality_tiers = REMOVE_BG_QUALITY_TIERS
+        self.default_quality = REMOVE_BG_DEFAULT_QUALITY
+        self.alpha_matting_foreground_threshold = ALPHA_MATTING_FOREGROUND_THRESHOLD
+        self.alpha_matting_background_threshold = ALPHA_MATTING_BACKGROUND_THRESHOLD
+        self.alpha_matting_erode_size = ALPHA_MATTING_ERODE_SIZE
+        self.fast_matting_work_size = FAST_MATTING_WORK_SIZE
+        self.fast_matting_radius = FAST_MATTING_RADIUS
+        self.fast_matting_eps = FAST_MATTING_EPS
 
 
 class RemoveBgConfig:
@@ -25,6 +77,17 @@ class RemoveBgConfig:
         self.rmbg_img_name = bg_config.rmbg_img_name
         self.bg_img_name = bg_config.bg_img_name
         self.img_path_folder = bg_config.removed_bg_dir
+        self.model_name = bg_config.rembg_model_name
+        self.supported_models = bg_config.rembg_supported_models
+        self.batch_size = bg_config.rembg_batch_size
+        self.quality_tiers = bg_config.quality_tiers
+        self.default_quality = bg_config.default_quality
+        self.foreground_threshold = bg_config.alpha_matting_foreground_threshold
+        self.background_threshold = bg_config.alpha_matting_background_threshold
+        self.erode_size = bg_config.alpha_matting_erode_size
+        self.fast_matting_work_size = bg_config.fast_matting_work_size
+        self.fast_matting_radius = bg_config.fast_matting_radius
+        self.fast_matting_eps = bg_config.fast_matting_eps
 
 
 class ChangeBgConfig:
@@ -42,4 +105,64 @@ class InpaintConfig:
         self.uploaded_path_folder: str = bg_config.uploaded_bg_dir
         self.img_path_folder = bg_config.img_path_folder
         self.inpaint_output_dir = bg_config.inpaint_output_dir
-        self.inpaint_output_img_name = bg_config.inpaint_output_img_name
\ No newline at end of file
+        self.inpaint_output_img_name = bg_config.inpaint_output_img_name
+        self.model_id = bg_config.inpaint_model_id
+        self.idle_timeout = bg_config.inpaint_idle_timeout
+        self.modes = bg_config.inpaint_modes
+        self.default_mode = bg_config.inpaint_default_mode
+        self.pixel_budget = bg_config.inpaint_pixel_budget
+        self.bucket_multiple = bg_config.inpaint_bucket_multiple
+        self.context_margin = bg_config.inpaint_context_margin
+        self.min_context = bg_config.inpaint_min_context
+        self.feather_radius = bg_config.inpaint_feather_radius
+        self.supported_engines = bg_config.inpaint_supported_engines
+        self.default_engine = bg_config.inpaint_default_engine
+        self.auto_classical_max_area = bg_config.inpaint_auto_classical_max_area
+        self.classical_margin = bg_config.inpaint_classical_margin
+        self.classical_smoothing_iterations = bg_config.inpaint_classical_smoothing_iterations
+        self.max_batch_size = bg_config.inpaint_max_batch_size
+        self.batch_max_wait = bg_config.inpaint_batch_max_wait
+        self.profiles = bg_config.inpaint_profiles
+        self.default_profile = bg_config.inpaint_default_profile
+        self.lora_fallback_profile = bg_config.inpaint_lora_fallback_profile
+        self.cpu_dtype = bg_config.inpaint_cpu_dtype
+
+
+class ResultCacheConfig:
+    def __init__(self, bg_config: BgConfig):
+        self.cache_dir = bg_config.result_cache_dir
+        self.memory_max_bytes = bg_config.result_cache_memory_bytes
+        self.disk_max_bytes = bg_config.result_cache_disk_bytes
+
+
+class CapabilityConfig:
+    def __init__(self, bg_config: BgConfig):
+        self.capabilities = bg_config.capabilities
+        self.enabled = bg_config.enabled_capabilities
+
+
+class ExecutionConfig:
+    def __init__(self, bg_config: BgConfig):
+        self.inference_pool_kind = bg_config.inference_pool_kind
+        self.inference_workers = bg_config.inference_workers
+        self.io_workers = bg_config.io_workers
+        self.max_pending = bg_config.max_pending_tasks
+        self.inpaint_workers = bg_config.inpaint_workers
+        self.inpaint_max_pending = bg_config.inpaint_max_pending
+        self.queue_timeout = bg_config.queue_timeout
+        self.warmup_models = bg_config.rembg_warmup_models
+
+
+class BackgroundRegistryConfig:
+    def __init__(self, bg_config: BgConfig):
+        self.storage_dir = bg_config.background_registry_dir
+        self.pyramid_sizes = bg_config.background_pyramid_sizes
+        self.memory_max_bytes = bg_config.background_cache_memory_bytes
+
+
+class JobQueueConfig:
+    def __init__(self, bg_config: BgConfig):
+        self.storage_dir = bg_config.inpaint_job_dir
+        self.workers = bg_config.inpaint_job_workers
+        self.max_queued = bg_config.inpaint_job_max_queued
+        self.ttl = bg_config.inpaint_job_ttl
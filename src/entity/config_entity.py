@@ -8,10 +8,41 @@ class ConfigEntity:
     def __init__(self):
         self.template_dir = TEMPLATE_DIR
         self.font_path = FONT_PATH
+        self.fonts_dir = FONTS_DIR
+        self.font_size_exact_below = FONT_SIZE_EXACT_BELOW
+        self.font_size_tolerance = FONT_SIZE_TOLERANCE
+        self.font_cache_entries = FONT_CACHE_ENTRIES
+        self.font_preload_sizes = FONT_PRELOAD_SIZES
         self.gemini_api_key = API_KEY
         self.model_name = MODEL_NAME
         self.topic_name = TOPIC_NAME
         self.emotion_templates = EMOTION_TEMPLATES
+        self.meme_generation_modes = MEME_GENERATION_MODES
+        self.meme_generation_mode = MEME_GENERATION_MODE
+        self.meme_dialogue_max_chars = MEME_DIALOGUE_MAX_CHARS
+        self.llm_cache_db_path = LLM_CACHE_DB_PATH
+        self.llm_cache_memory_entries = LLM_CACHE_MEMORY_ENTRIES
+        self.emotion_prompt_version = EMOTION_PROMPT_VERSION
+        self.dialogue_prompt_version = DIALOGUE_PROMPT_VERSION
+        self.llm_cache_emotion_ttl = LLM_CACHE_EMOTION_TTL_SECONDS
+        self.llm_cache_dialogue_ttl = LLM_CACHE_DIALOGUE_TTL_SECONDS
+        self.meme_dialogue_variants = MEME_DIALOGUE_VARIANTS
+        self.llm_backend = LLM_BACKEND
+        self.llm_max_concurrency = LLM_MAX_CONCURRENCY
+        self.llm_deadline = LLM_DEADLINE_SECONDS
+        self.llm_attempt_timeout = LLM_ATTEMPT_TIMEOUT_SECONDS
+        self.llm_max_retries = LLM_MAX_RETRIES
+        self.llm_retry_base_delay = LLM_RETRY_BASE_DELAY_SECONDS
+        self.llm_retry_max_delay = LLM_RETRY_MAX_DELAY_SECONDS
+        self.llm_hedge_enabled = LLM_HEDGE_ENABLED
+        self.llm_hedge_percentile = LLM_HEDGE_PERCENTILE
+        self.llm_hedge_min_samples = LLM_HEDGE_MIN_SAMPLES
+        self.llm_hedge_initial_delay = LLM_HEDGE_INITIAL_DELAY_SECONDS
+        self.llm_latency_window = LLM_LATENCY_WINDOW
+        self.llm_fake_latency = LLM_FAKE_LATENCY_SECONDS
+        self.llm_fake_tail_latency = LLM_FAKE_TAIL_LATENCY_SECONDS
+        self.llm_fake_tail_probability = LLM_FAKE_TAIL_PROBABILITY
+        self.llm_fake_failure_rate = LLM_FAKE_FAILURE_RATE
         self.supabase_url = SUPABASE_URL
         self.supabase_key = SUPABASE_KEY
         self.bucket_path = BUCKET_PATH
@@ -19,6 +50,15 @@ class ConfigEntity:
         self.json_file = JSON_FILE
         self.output_dir = OUTPUT_DIR
         self.memes_dir = MEMES
+        self.template_index_check_interval = TEMPLATE_INDEX_CHECK_INTERVAL_SECONDS
+        self.template_store_dir = TEMPLATE_STORE_DIR
+        self.template_prefetch_concurrency = TEMPLATE_PREFETCH_CONCURRENCY
+        self.template_prefetch_retries = TEMPLATE_PREFETCH_RETRIES
+        self.template_prefetch_timeout = TEMPLATE_PREFETCH_TIMEOUT_SECONDS
+        self.template_prefetch_backoff = TEMPLATE_PREFETCH_BACKOFF_SECONDS
+        self.template_prefetch_failure_backoff = TEMPLATE_PREFETCH_FAILURE_BACKOFF_SECONDS
+        self.template_prefetch_failure_max_backoff = TEMPLATE_PREFETCH_FAILURE_MAX_BACKOFF_SECONDS
+        self.template_image_cache_max_bytes = TEMPLATE_IMAGE_CACHE_MEMORY_BYTES
 
 class TopicIngestionConfigEntity:
     def __init__(self, config_entity: ConfigEntity):  # ← FIXED: __init__
@@ -42,3 +82,58 @@ class MemeTemplatesEntity:
         self.json_file = config_entity.json_file
         self.output_dir = config_entity.output_dir
         self.memes_dir = config_entity.memes_dir
+        self.index_check_interval = config_entity.template_index_check_interval
+        self.store_dir = config_entity.template_store_dir
+        self.prefetch_concurrency = config_entity.template_prefetch_concurrency
+        self.prefetch_retries = config_entity.template_prefetch_retries
+        self.prefetch_timeout = config_entity.template_prefetch_timeout
+        self.prefetch_backoff = config_entity.template_prefetch_backoff
+        self.prefetch_failure_backoff = config_entity.template_prefetch_failure_backoff
+        self.prefetch_failure_max_backoff = config_entity.template_prefetch_failure_max_backoff
+        self.image_cache_max_bytes = config_entity.template_image_cache_max_bytes
+
+class MemeGenerationConfigEntity:
+    def __init__(self, config_entity: ConfigEntity):
+        self.generation_modes = config_entity.meme_generation_modes
+        self.generation_mode = config_entity.meme_generation_mode
+        self.dialogue_max_chars = config_entity.meme_dialogue_max_chars
+        self.emotion_templates = config_entity.emotion_templates
+
+class LLMCacheConfigEntity:
+    def __init__(self, config_entity: ConfigEntity):
+        self.db_path = config_entity.llm_cache_db_path
+        self.memory_max_entries = config_entity.llm_cache_memory_entries
+        self.emotion_prompt_version = config_entity.emotion_prompt_version
+        self.dialogue_prompt_version = config_entity.dialogue_prompt_version
+        self.emotion_ttl = config_entity.llm_cache_emotion_ttl
+        self.dialogue_ttl = config_entity.llm_cache_dialogue_ttl
+        self.dialogue_variants = config_entity.meme_dialogue_variants
+
+class LLMClientConfigEntity:
+    def __init__(self, config_entity: ConfigEntity):
+        self.backend = config_entity.llm_backend
+        self.max_concurrency = config_entity.llm_max_concurrency
+        self.deadline = config_entity.llm_deadline
+        self.attempt_timeout = config_entity.llm_attempt_timeout
+        self.max_retries = config_entity.llm_max_retries
+        self.retry_base_delay = config_entity.llm_retry_base_delay
+        self.retry_max_delay = config_entity.llm_retry_max_delay
+        self.hedge_enabled = config_entity.llm_hedge_enabled
+        self.hedge_percentile = config_entity.llm_hedge_percentile
+        self.hedge_min_samples = config_entity.llm_hedge_min_samples
+        self.hedge_initial_delay = config_entity.llm_hedge_initial_delay
+        self.latency_window = config_entity.llm_latency_window
+        self.fake_latency = config_entity.llm_fake_latency
+        self.fake_tail_latency = config_entity.llm_fake_tail_latency
+        self.fake_tail_probability = config_entity.llm_fake_tail_probability
+        self.fake_failure_rate = config_entity.llm_fake_failure_rate
+        self.emotion_templates = config_entity.emotion_templates
+
+class FontConfigEntity:
+    def __init__(self, config_entity: ConfigEntity):
+        self.font_path = config_entity.font_path
+        self.fonts_dir = config_entity.fonts_dir
+        self.size_exact_below = config_entity.font_size_exact_below
+        self.size_tolerance = config_entity.font_size_tolerance
+        self.cache_entries = config_entity.font_cache_entries
+        self.preload_sizes = config_entity.font_preload_sizes
@@ -15,4 +15,15 @@ class CustomException(Exception):
         self.error_message=error_message_detail(error_message,error_detail=error_detail)
    
     def __str__(self):
-        return self.error_message
\ No newline at end of file
+        return self.error_message
+
+    def __reduce__(self):
+        # Keep the formatted message when the exception crosses a process pool boundary
+        return (_restore_custom_exception, (self.error_message,))
+
+
+def _restore_custom_exception(error_message):
+    exception = CustomException.__new__(CustomException)
+    Exception.__init__(exception, error_message)
+    exception.error_message = error_message
+    return exception
@@ -1,40 +1,226 @@
-from src.components.add_bg import AddBg
-from src.components.remove_bg import RemoveBg
-from src.components.inpaint import Inpaint  
+from src.entity.config import BgConfig, RemoveBgConfig
+from src.utils.result_cache import result_cache
+from src.utils.background_registry import background_registry
+from src.utils.artifact_writer import artifact_writer
+from src.utils import load_image_bytes, image_to_png_bytes
 
 from src.exceptions import CustomException
 from src.logger import logging
 import sys
+import time
 
-def process_remove_bg(input_image_path: str) -> str:
-    """Removes background from the given image path and returns path to the saved image."""
+# Components are imported inside the functions: remove_bg pulls in rembg and inpaint pulls in
+# torch / diffusers, which a worker that only serves other capabilities should never load.
+
+
+def remove_bg_cache_key(image_bytes: bytes, model_name: str = None, quality: str = None) -> str:
+    """Cache key for a background removal result, with defaults resolved so equivalent requests share it."""
+    remove_bg_config = RemoveBgConfig(bg_config=BgConfig())
+    return result_cache.make_key(
+        "remove_bg",
+        image_bytes,
+        model_name=model_name or remove_bg_config.model_name,
+        quality=quality or remove_bg_config.default_quality,
+    )
+
+def add_bg_cache_key(foreground_bytes: bytes, background_id: str, fit: str = "stretch") -> str:
+    """Cache key for a compositing result; background ids are content hashes of the upload."""
+    return result_cache.make_key("add_bg", foreground_bytes, background_id=background_id, fit=fit)
+
+def replace_bg_cache_key(
+    image_bytes: bytes,
+    background_id: str,
+    fit: str = "stretch",
+    model_name: str = None,
+    quality: str = None
+) -> str:
+    """Cache key for a combined remove + replace result."""
+    remove_bg_config = RemoveBgConfig(bg_config=BgConfig())
+    return result_cache.make_key(
+        "replace_bg",
+        image_bytes,
+        background_id=background_id,
+        fit=fit,
+        model_name=model_name or remove_bg_config.model_name,
+        quality=quality or remove_bg_config.default_quality,
+    )
+
+def process_remove_bg(
+    image_bytes: bytes,
+    model_name: str = None,
+    quality: str = None,
+    filename: str = "image",
+    remove_bg_obj: "RemoveBg" = None
+) -> bytes:
+    """Removes background from the given encoded image and returns the result as PNG bytes."""
     try:
-        logging.info(f"Starting background removal for: {input_image_path}")
-        remove_bg_obj = RemoveBg()
-        artifact = remove_bg_obj.remove_bg(input_image_path)
-        return artifact.rmbg_img_path
+        logging.info(f"Starting background removal for: {filename}")
+        from src.components.remove_bg import RemoveBg
+
+        remove_bg_obj = remove_bg_obj or RemoveBg()
+        artifact = remove_bg_obj.remove_bg(load_image_bytes(image_bytes), model_name=model_name, quality=quality)
+        output_bytes = image_to_png_bytes(artifact.rmbg_img)
+        artifact_writer.persist(output_bytes, remove_bg_obj.remove_bg_config.img_path_folder, filename)
+        return output_bytes
     except Exception as e:
         logging.error(f"Error while removing background: {e}")
         raise CustomException(e, sys) from e
 
-def process_add_bg(foreground_img_path: str, new_bg_path: str) -> str:
-    """Adds new background to a transparent image and returns path to saved image."""
+def process_remove_bg_batch(images, model_name: str = None, quality: str = None, remove_bg_obj: "RemoveBg" = None) -> list:
+    """
+    Removes background from many (filename, encoded bytes) pairs with batched inference.
+    Returns the PNG bytes in order and the number of inputs per model run.
+    """
     try:
-        logging.info(f"Starting background addition with foreground: {foreground_img_path} and background: {new_bg_path}")
-        add_bg_obj = AddBg()
-        artifact = add_bg_obj.change_bg(foreground_img_path, new_bg_path)
-        return artifact.ch_bg_img_path
+        logging.info(f"Starting batch background removal for {len(images)} images")
+        start = time.perf_counter()
+        from src.components.remove_bg import RemoveBg
+
+        remove_bg_obj = remove_bg_obj or RemoveBg()
+        artifacts = remove_bg_obj.remove_bg_batch(
+            [load_image_bytes(image_bytes) for _, image_bytes in images],
+            model_name=model_name,
+            quality=quality
+        )
+        outputs = []
+        for (filename, _), artifact in zip(images, artifacts):
+            output_bytes = image_to_png_bytes(artifact.rmbg_img)
+            artifact_writer.persist(output_bytes, remove_bg_obj.remove_bg_config.img_path_folder, filename)
+            outputs.append(output_bytes)
+        elapsed = time.perf_counter() - start
+        logging.info(f"Batch background removal took {elapsed:.2f}s ({elapsed / max(len(outputs), 1):.2f}s per image)")
+        return outputs, artifacts[0].batch_size if artifacts else None
+    except Exception as e:
+        logging.error(f"Error while removing background in batch: {e}")
+        raise CustomException(e, sys) from e
+
+def process_add_bg(
+    foreground_bytes: bytes,
+    background_id: str,
+    fit: str = "stretch",
+    filename: str = "image",
+    add_bg_obj: "AddBg" = None
+) -> bytes:
+    """Adds a registered background to a transparent image and returns the result as PNG bytes."""
+    try:
+        logging.info(f"Starting background addition for: {filename} with background {background_id} ({fit})")
+        from src.components.add_bg import AddBg
+
+        add_bg_obj = add_bg_obj or AddBg()
+        foreground = load_image_bytes(foreground_bytes)
+        background = background_registry.get(background_id, foreground.size, fit=fit)
+        artifact = add_bg_obj.change_bg(foreground, background)
+        output_bytes = image_to_png_bytes(artifact.ch_bg_img)
+        artifact_writer.persist(output_bytes, add_bg_obj.change_bg_config.img_path_folder, filename)
+        return output_bytes
     except Exception as e:
         logging.error(f"Error while adding background: {e}")
         raise CustomException(e, sys) from e
 
-def process_inpaint(mask_img_path: str, input_img_path: str) -> str:
-    """Applies inpainting to the given image and mask and returns path to saved image."""
+def process_add_bg_batch(
+    foregrounds,
+    background_id: str,
+    fit: str = "stretch",
+    placements=None,
+    canvas_size=None,
+    add_bg_obj: "AddBg" = None
+) -> list:
+    """
+    Adds one registered background to many (filename, encoded bytes) foregrounds and returns PNG bytes in order.
+
+    `placements` is a list of dicts with offset_x / offset_y / scale / anchor, one per foreground.
+    """
+    try:
+        logging.info(f"Starting batch background addition for {len(foregrounds)} images with background {background_id}")
+        start = time.perf_counter()
+        from src.components.add_bg import AddBg, Placement
+
+        add_bg_obj = add_bg_obj or AddBg()
+        if placements is not None:
+            placements = [Placement(**placement) for placement in placements]
+            if canvas_size is None:
+                meta = background_registry.metadata(background_id)
+                canvas_size = (meta["width"], meta["height"])
+        artifacts = add_bg_obj.change_bg_shared(
+            [load_image_bytes(image_bytes) for _, image_bytes in foregrounds],
+            lambda size: background_registry.get(background_id, size, fit=fit),
+            placements=placements,
+            canvas_size=canvas_size
+        )
+        outputs = []
+        for (filename, _), artifact in zip(foregrounds, artifacts):
+            output_bytes = image_to_png_bytes(artifact.ch_bg_img)
+            artifact_writer.persist(output_bytes, add_bg_obj.change_bg_config.img_path_folder, filename)
+            outputs.append(output_bytes)
+        elapsed = time.perf_counter() - start
+        logging.info(f"Batch background addition took {elapsed:.2f}s ({elapsed / max(len(outputs), 1):.2f}s per image)")
+        return outputs
+    except Exception as e:
+        logging.error(f"Error while adding background in batch: {e}")
+        raise CustomException(e, sys) from e
+
+def process_replace_bg(
+    image_bytes: bytes,
+    background_id: str,
+    fit: str = "stretch",
+    model_name: str = None,
+    quality: str = None,
+    filename: str = "image",
+    remove_bg_obj: "RemoveBg" = None,
+    add_bg_obj: "AddBg" = None
+) -> bytes:
+    """Removes the background of a photo and composites the in-memory cutout onto a new background, returning PNG bytes."""
     try:
-        logging.info(f"Starting inpainting with input: {input_img_path} and mask: {mask_img_path}")
-        inpaint_obj = Inpaint()
-        artifact = inpaint_obj.initiate_inpaint(mask_img_path=mask_img_path, input_img_path=input_img_path)
-        return artifact.output_img_path
+        logging.info(f"Starting background replacement for: {filename}")
+        start = time.perf_counter()
+        from src.components.remove_bg import RemoveBg
+        from src.components.add_bg import AddBg
+
+        remove_bg_obj = remove_bg_obj or RemoveBg()
+        add_bg_obj = add_bg_obj or AddBg()
+
+        # The cutout and its alpha mask never leave memory between the two steps
+        cutout = remove_bg_obj.remove_bg(load_image_bytes(image_bytes), model_name=model_name, quality=quality).rmbg_img
+        background = background_registry.get(background_id, cutout.size, fit=fit)
+        artifact = add_bg_obj.change_bg(cutout, background)
+
+        output_bytes = image_to_png_bytes(artifact.ch_bg_img)
+        artifact_writer.persist(output_bytes, add_bg_obj.change_bg_config.img_path_folder, filename)
+        logging.info(f"Background replacement finished in {time.perf_counter() - start:.2f}s")
+        return output_bytes
+    except Exception as e:
+        logging.error(f"Error while replacing background: {e}")
+        raise CustomException(e, sys) from e
+
+def process_inpaint(
+    mask_bytes: bytes,
+    input_bytes: bytes,
+    mode: str = None,
+    engine: str = None,
+    profile: str = None,
+    filename: str = "image",
+    progress_callback=None,
+    inpaint_obj: "Inpaint" = None
+) -> bytes:
+    """Applies inpainting to the given encoded image and mask and returns the result as PNG bytes."""
+    try:
+        logging.info(f"Starting inpainting for: {filename}")
+        start = time.perf_counter()
+        from src.components.inpaint import Inpaint
+
+        inpaint_obj = inpaint_obj or Inpaint()
+        artifact = inpaint_obj.initiate_inpaint(
+            mask_image=load_image_bytes(mask_bytes),
+            input_image=load_image_bytes(input_bytes),
+            mode=mode,
+            engine=engine,
+            profile=profile,
+            progress_callback=progress_callback
+        )
+        output_bytes = image_to_png_bytes(artifact.output_img)
+        artifact_writer.persist(output_bytes, inpaint_obj.inpaint_config.inpaint_output_dir, filename)
+        logging.info(f"Inpainting request finished in {time.perf_counter() - start:.2f}s")
+        return output_bytes
     except Exception as e:
         logging.error(f"Error during inpainting: {e}")
         raise CustomException(e, sys) from e
@@ -46,19 +232,20 @@ def process_inpaint(mask_img_path: str, input_img_path: str) -> str:
 #         input_image = r"/home/litzchill/vamshi/BG_addAndRemove/data/overture-creations-5sI6fQgYIuo.png"
 #         mask_image = r"/home/litzchill/vamshi/BG_addAndRemove/data/overture-creations-5sI6fQgYIuo_mask.png"
 #         new_bg_image = r"/home/litzchill/vamshi/BG_addAndRemove/data/bg1.jpg"
+#         read = lambda path: open(path, "rb").read()
 
 #         # Step 1: Remove background
-#         rmbg_path = process_remove_bg(input_image)
+#         rmbg_bytes = process_remove_bg(read(input_image))
 
 #         # Step 2: Add new background
-#         final_bg_path = process_add_bg(rmbg_path, new_bg_image)
+#         final_bg_bytes = process_add_bg(rmbg_bytes, background_registry.register(read(new_bg_image)))
 
 #         # Step 3: Inpaint the original with a mask
-#         inpainted_path = process_inpaint(mask_img_path=mask_image, input_img_path=input_image)
+#         inpainted_bytes = process_inpaint(mask_bytes=read(mask_image), input_bytes=read(input_image))
 
-#         print(f"\nBackground removed: {rmbg_path}")
-#         print(f"New background added: {final_bg_path}")
-#         print(f"Inpainting done: {inpainted_path}")
+#         print(f"\nBackground removed: {len(rmbg_bytes)} bytes")
+#         print(f"New background added: {len(final_bg_bytes)} bytes")
+#         print(f"Inpainting done: {len(inpainted_bytes)} bytes")
 
 #     except CustomException as e:
 #         logging.error(f"Pipeline error: {e}")
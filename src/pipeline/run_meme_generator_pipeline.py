@@ -1,54 +1,151 @@
 from src.exceptions import CustomException
 from src.logger import logging
-from src.components.topic_ingestion import TopicIngestion
-from src.components.emotion_analyzer import EmotionAnalyzer
-from src.components.memes_generator import MemesGenerator
-from src.utils.image_templates import MemeTemplates
+from src.entity.config_entity import ConfigEntity, MemeGenerationConfigEntity
 from io import BytesIO
 
 import sys
+import time
+import asyncio
 
-def ingest_topic(topic_name: str):
+# Components are imported on first use so importing the pipeline does not load the
+# Gemini / Supabase clients on workers that never generate memes.
+
+
+def ingest_topic(topic_name: str, topic_ingestion: "TopicIngestion" = None):
     try:
-        topic_ingestion = TopicIngestion()
+        from src.components.topic_ingestion import TopicIngestion
+
+        topic_ingestion = topic_ingestion or TopicIngestion()
         artifact = topic_ingestion.initiate_topic_ingestion(topic_name)
         return artifact.topic_name
     except Exception as e:
         raise CustomException(e, sys)
 
-def analyze_emotion(text: str):
+def analyze_emotion(text: str, emotion_analyzer: "EmotionAnalyzer" = None):
     try:
-        emotion_analyzer = EmotionAnalyzer()
+        from src.components.emotion_analyzer import EmotionAnalyzer
+
+        emotion_analyzer = emotion_analyzer or EmotionAnalyzer()
         return emotion_analyzer.analyze_emotion(text)
     except Exception as e:
         raise CustomException(e, sys)
 
-def fetch_image_templates():
+def fetch_image_templates(meme_temp: "MemeTemplates" = None):
     try:
-        meme_temp = MemeTemplates()
+        from src.utils.image_templates import MemeTemplates
+
+        from src.utils.template_index import template_index
+        from src.utils.template_store import template_prefetcher
+
+        meme_temp = meme_temp or MemeTemplates()
         meme_temp.get_emotion_images()
-        return {"status": "success", "message": "Templates fetched successfully"}
+        # Pick up the new mapping right away instead of on the next mtime check
+        template_index.reload(force=True)
+        # Download the referenced images in the background; requests only use what is on disk.
+        # An explicit fetch re-reads the store and retries URLs that failed before.
+        queued = template_prefetcher.schedule(template_index.urls(), refresh=True)
+        return {
+            "status": "success",
+            "message": "Templates fetched successfully",
+            "index": template_index.stats(),
+            "prefetch": {**template_prefetcher.stats(), "queued": queued},
+        }
     except Exception as e:
         raise CustomException(e, sys)
 
-def generate_meme(topic_name: str, emotion: str) -> BytesIO:
+def generate_meme(
+    topic_name: str, emotion: str, memes_generator: "MemesGenerator" = None, dialogues=None
+) -> BytesIO:
     try:
-        memes_generator = MemesGenerator()
-        image_bytes = memes_generator.initiate_meme_generator(topic_name, emotion)
+        from src.components.memes_generator import MemesGenerator
+
+        memes_generator = memes_generator or MemesGenerator()
+        image_bytes = memes_generator.initiate_meme_generator(topic_name, emotion, dialogues=dialogues)
         return image_bytes
     except Exception as e:
         raise CustomException(e, sys)
 
 
-def run_pipeline(topic_name: str):
+def run_pipeline(
+    topic_name: str,
+    topic_ingestion: "TopicIngestion" = None,
+    emotion_analyzer: "EmotionAnalyzer" = None,
+    memes_generator: "MemesGenerator" = None,
+    mode: str = None
+):
+    """Blocking `run_pipeline_async` for scripts and callers without an event loop."""
+    return asyncio.run(run_pipeline_async(topic_name, topic_ingestion, emotion_analyzer, memes_generator, mode))
+
+
+async def run_pipeline_async(
+    topic_name: str,
+    topic_ingestion: "TopicIngestion" = None,
+    emotion_analyzer: "EmotionAnalyzer" = None,
+    memes_generator: "MemesGenerator" = None,
+    mode: str = None
+):
+    """
+    Run the meme pipeline; pass long-lived components (see ServiceContainer) to skip per-call setup.
+
+    In "combined" mode (MEME_GENERATION_MODE) one Gemini call returns the emotion and both
+    dialogues, and the two-call path (emotion, then dialogues) only runs when that response
+    fails validation. The result reports which path ran ("combined", "two-call" or
+    "fallback") and the seconds spent in each stage.
+
+    Gemini calls go through the components' async LLM client, so they do not hold a
+    thread while waiting; only rendering runs in a worker thread.
+    """
     try:
-        text = ingest_topic(topic_name)
-        emotion_artifact = analyze_emotion(text)
-        image_bytes = generate_meme(topic_name, emotion_artifact.emotion_name)
+        from src.components.emotion_analyzer import EmotionAnalyzer
+        from src.components.memes_generator import MemesGenerator, MemeResponseError
+
+        meme_generation_config = MemeGenerationConfigEntity(config_entity=ConfigEntity())
+        mode = mode or meme_generation_config.generation_mode
+        if mode not in meme_generation_config.generation_modes:
+            raise ValueError(f"Unknown generation mode '{mode}'; choose from {meme_generation_config.generation_modes}")
+        memes_generator = memes_generator or MemesGenerator()
+
+        timings = {}
+        start = stage_start = time.perf_counter()
+
+        def _stage(name):
+            nonlocal stage_start
+            now = time.perf_counter()
+            timings[name] = now - stage_start
+            stage_start = now
 
+        text = ingest_topic(topic_name, topic_ingestion)
+        _stage("ingest")
+
+        emotion, dialogues, generation = None, None, mode
+        if mode == "combined":
+            try:
+                emotion, upper_text, lower_text = await memes_generator.generate_emotion_and_dialogues_async(text)
+                dialogues = (upper_text, lower_text)
+            except MemeResponseError as e:
+                logging.warning(f"Combined response rejected, falling back to two calls: {e}")
+                generation = "fallback"
+            _stage("combined")
+
+        if emotion is None:
+            emotion_analyzer = emotion_analyzer or EmotionAnalyzer()
+            emotion = (await emotion_analyzer.analyze_emotion_async(text)).emotion_name
+            _stage("emotion")
+            # Keyed like the combined path (the ingested text) so both paths share cache entries
+            dialogues = await memes_generator.generate_meme_dialogues_async(text, emotion)
+            _stage("dialogues")
+
+        image_bytes = await asyncio.to_thread(generate_meme, topic_name, emotion, memes_generator, dialogues)
+        _stage("render")
+        timings["total"] = time.perf_counter() - start
+
+        timings = {name: round(seconds, 3) for name, seconds in timings.items()}
+        logging.info(f"Meme generated via {generation} path: {timings}")
         return {
             "image_bytes": image_bytes,
-            "emotion": emotion_artifact.emotion_name
+            "emotion": emotion,
+            "generation": generation,
+            "timings": timings
         }
     except Exception as e:
-        raise CustomException(e, sys)
\ No newline at end of file
+        raise CustomException(e, sys)
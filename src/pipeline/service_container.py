@@ -0,0 +1,151 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, EmotionAnalyzerConfigEntity
+from src.utils.capabilities import capability_loader
+from src.utils.executor import execution_layer
+from src.utils.job_queue import inpaint_job_queue
+from src.utils.artifact_writer import artifact_writer
+from src.constants import REMBG_WARMUP_MODELS, PRELOAD_CAPABILITIES
+
+import sys
+import time
+import threading
+
+# Component attribute -> (capability it belongs to, builder method)
+_COMPONENTS = {
+    "remove_bg": ("remove-bg", "_build_remove_bg"),
+    "add_bg": ("add-bg", "_build_add_bg"),
+    "inpaint": ("inpaint", "_build_inpaint"),
+    "topic_ingestion": ("meme", "_build_topic_ingestion"),
+    "emotion_analyzer": ("meme", "_build_emotion_analyzer"),
+    "memes_generator": ("meme", "_build_memes_generator"),
+    "meme_templates": ("meme", "_build_meme_templates"),
+}
+
+# Capabilities whose endpoints run their work through `execution_layer`
+_POOLED_CAPABILITIES = ("remove-bg", "add-bg", "inpaint")
+
+
+class ServiceContainer:
+    """
+    Components and shared infrastructure that live for the whole app.
+
+    Components are attributes (`services.remove_bg`, `services.inpaint`, ...)
+    built once on first access; the modules behind them are only imported then,
+    through `capability_loader`, so the app itself starts without torch, rembg
+    or the Gemini / Supabase clients. Accessing a component of a capability
+    this worker does not serve raises `CapabilityDisabledError`.
+
+    `start` preloads the enabled capabilities (unless PRELOAD_CAPABILITIES is
+    off), starts the worker pools they need and warms the models; `shutdown`
+    drains and releases them.
+    """
+
+    def __init__(self, loader=capability_loader, preload: bool = PRELOAD_CAPABILITIES):
+        self.loader = loader
+        self.preload = preload
+        self._components = {}
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        if name not in _COMPONENTS:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        return self.get(name)
+
+    def get(self, name: str):
+        """Return component `name`, importing its capability and building it on first use."""
+        capability, builder = _COMPONENTS[name]
+        self.loader.load(capability)
+        with self._lock:
+            if name not in self._components:
+                self._components[name] = getattr(self, builder)()
+            return self._components[name]
+
+    def _build_remove_bg(self):
+        from src.components.remove_bg import RemoveBg
+        return RemoveBg()
+
+    def _build_add_bg(self):
+        from src.components.add_bg import AddBg
+        return AddBg()
+
+    def _build_inpaint(self):
+        from src.components.inpaint import Inpaint
+        return Inpaint()
+
+    def _build_topic_ingestion(self):
+        from src.components.topic_ingestion import TopicIngestion
+        return TopicIngestion()
+
+    def _gemini_model(self):
+        # One model shared by the meme components; get_gemini_model is cached per name / key
+        from src.utils.gemini import get_gemini_model
+
+        emotion_analyzer_config = EmotionAnalyzerConfigEntity(config_entity=ConfigEntity())
+        return get_gemini_model(emotion_analyzer_config.gemini_model_name, emotion_analyzer_config.gemini_api_key)
+
+    def _build_emotion_analyzer(self):
+        from src.components.emotion_analyzer import EmotionAnalyzer
+        return EmotionAnalyzer(model=self._gemini_model())
+
+    def _build_memes_generator(self):
+        from src.components.memes_generator import MemesGenerator
+        return MemesGenerator(model=self._gemini_model())
+
+    def _build_meme_templates(self):
+        from src.utils.image_templates import MemeTemplates
+
+        try:
+            return MemeTemplates()
+        except Exception as e:
+            # Template refresh needs Supabase credentials; everything else works without them
+            logging.error(f"Meme templates client unavailable: {e}")
+            return None
+
+    def start(self):
+        try:
+            start = time.perf_counter()
+            if self.preload:
+                for name, (capability, _) in _COMPONENTS.items():
+                    if self.loader.is_enabled(capability):
+                        self.get(name)
+
+            if self.loader.is_enabled("inpaint"):
+                inpaint_job_queue.start()
+
+            # Download any template that is referenced but not on disk yet, off the request path
+            if self.loader.is_enabled("meme"):
+                from src.utils.template_index import template_index
+                from src.utils.template_store import template_prefetcher
+                template_prefetcher.schedule(template_index.urls())
+                if self.preload:
+                    from src.utils.font_manager import font_manager
+                    font_manager.preload()
+
+            # Every image capability runs its work on the execution pools; only background removal
+            # needs the inference pool. Load rembg sessions once so the first request does not pay
+            # for model loading. With a process pool every inference worker warms its own sessions instead.
+            if any(self.loader.is_enabled(capability) for capability in _POOLED_CAPABILITIES):
+                try:
+                    execution_layer.start(inference=self.loader.is_enabled("remove-bg"))
+                    if self.preload and self.loader.is_enabled("remove-bg") and not execution_layer.uses_process_pool:
+                        from src.utils.rembg_sessions import rembg_session_registry
+                        rembg_session_registry.warmup(REMBG_WARMUP_MODELS)
+                except Exception as e:
+                    logging.error(f"Model warmup failed: {e}")
+
+            logging.info(f"Services started in {time.perf_counter() - start:.2f}s: {self.loader.report()}")
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def shutdown(self):
+        inpaint_job_queue.shutdown()
+        execution_layer.shutdown()
+        artifact_writer.shutdown()
+        if self.loader.is_loaded("inpaint"):
+            from src.components.inpaint import unload_inpaint_models
+            unload_inpaint_models()
+        if "src.utils.template_store" in sys.modules:
+            from src.utils.template_store import template_prefetcher
+            template_prefetcher.shutdown()
+        logging.info("Services shut down.")
@@ -2,13 +2,15 @@
 import os
 from pathlib import Path
 import time,io
+import uuid
+from PIL import Image
 
 def generate_unique_filename(input_image_path: str, output_folder: str) -> str:
     """
     Generates a unique filename for the background removed image.
     
     Parameters:
-        input_image_path (str): The path of the original input image.
+        input_image_path (str): The path (or name) of the original input image.
         output_folder (str): The folder where the processed image will be saved.
     
     Returns:
@@ -16,5 +18,20 @@ def generate_unique_filename(input_image_path: str, output_folder: str) -> str:
     """
     input_stem = Path(input_image_path).stem  # Extracts the base filename without extension
     timestamp = int(time.time())  # Current time in seconds
-    unique_name = f"{input_stem}_rmbg_{timestamp}.png"
+    suffix = uuid.uuid4().hex[:8]  # Keeps names unique when requests land in the same second
+    unique_name = f"{input_stem}_rmbg_{timestamp}_{suffix}.png"
     return os.path.join(output_folder, unique_name)
+
+
+def load_image_bytes(image_bytes: bytes) -> Image.Image:
+    """Decodes encoded image bytes into a fully loaded PIL image."""
+    image = Image.open(io.BytesIO(image_bytes))
+    image.load()
+    return image
+
+
+def image_to_png_bytes(image: Image.Image) -> bytes:
+    """Encodes a PIL image as PNG bytes."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
@@ -0,0 +1,57 @@
+from src.logger import logging
+from src.entity.config import BgConfig
+from src.utils import generate_unique_filename
+
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ArtifactWriter:
+    """
+    Optionally persists encoded results under `artifacts/` on a background thread.
+
+    Requests never wait for the write; when persistence is disabled (the default)
+    `persist` is a no-op and returns None.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifact-writer")
+            return self._pool
+
+    def persist(self, data: bytes, output_folder: str, name: str):
+        """Schedule `data` to be written to a unique file in `output_folder` and return that path."""
+        if not self.enabled:
+            return None
+        output_path = generate_unique_filename(name, output_folder)
+        self._get_pool().submit(self._write, data, output_folder, output_path)
+        return output_path
+
+    @staticmethod
+    def _write(data: bytes, output_folder: str, output_path: str):
+        try:
+            os.makedirs(output_folder, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=output_folder, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, output_path)
+            logging.info(f"Artifact saved to: {output_path}")
+        except Exception as e:
+            logging.error(f"Failed to persist artifact {output_path}: {e}")
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+artifact_writer = ArtifactWriter(enabled=BgConfig().persist_artifacts)
@@ -0,0 +1,188 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config import BgConfig, BackgroundRegistryConfig
+from src.utils import load_image_bytes
+
+import os
+import sys
+import json
+import hashlib
+import shutil
+import tempfile
+import threading
+import numpy as np
+from collections import OrderedDict
+from PIL import Image
+
+BACKGROUND_FITS = ("stretch", "cover", "contain")
+
+
+class BackgroundRegistry:
+    """
+    Library of reusable backgrounds referenced by id.
+
+    A background is decoded once at upload time and stored as raw RGBA arrays at
+    the original size plus a few downscaled pyramid levels, so later requests
+    never decode an encoded file again. Fitted variants (level resized to the exact
+    foreground size with a stretch / cover / contain fit) are kept in an LRU bounded
+    by total pixel bytes. Returned images are shared and must be treated as read-only.
+    """
+
+    def __init__(self, registry_config: BackgroundRegistryConfig):
+        try:
+            self.registry_config = registry_config
+            self._cache = OrderedDict()
+            self._cache_bytes = 0
+            self._lock = threading.Lock()
+            self._write_lock = threading.Lock()
+            os.makedirs(self.registry_config.storage_dir, exist_ok=True)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _background_dir(self, background_id: str) -> str:
+        if not background_id or not all(c in "0123456789abcdef" for c in background_id):
+            raise ValueError(f"Invalid background id '{background_id}'")
+        return os.path.join(self.registry_config.storage_dir, background_id)
+
+    def exists(self, background_id: str) -> bool:
+        return os.path.exists(os.path.join(self._background_dir(background_id), "meta.json"))
+
+    def register(self, image_bytes: bytes) -> str:
+        """Decode an uploaded background once, store its pyramid and return its id."""
+        try:
+            background_id = hashlib.sha256(image_bytes).hexdigest()[:16]
+            if self.exists(background_id):
+                return background_id
+
+            with self._write_lock:
+                if self.exists(background_id):
+                    return background_id
+
+                image = load_image_bytes(image_bytes).convert("RGBA")
+                temp_dir = tempfile.mkdtemp(dir=self.registry_config.storage_dir)
+                levels = [max(image.size)]
+                np.save(os.path.join(temp_dir, f"{max(image.size)}.npy"), np.asarray(image))
+                for level in self.registry_config.pyramid_sizes:
+                    if level >= max(image.size):
+                        continue
+                    scale = level / max(image.size)
+                    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+                    np.save(os.path.join(temp_dir, f"{level}.npy"), np.asarray(image.resize(size, Image.Resampling.LANCZOS)))
+                    levels.append(level)
+
+                with open(os.path.join(temp_dir, "meta.json"), "w") as f:
+                    json.dump({"width": image.width, "height": image.height, "levels": sorted(levels)}, f)
+                try:
+                    os.replace(temp_dir, self._background_dir(background_id))
+                except OSError:
+                    # Another worker process registered the same background first
+                    shutil.rmtree(temp_dir, ignore_errors=True)
+
+            logging.info(f"Registered background {background_id} ({image.width}x{image.height})")
+            return background_id
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def metadata(self, background_id: str) -> dict:
+        with open(os.path.join(self._background_dir(background_id), "meta.json")) as f:
+            return {"background_id": background_id, **json.load(f)}
+
+    def list(self):
+        return [
+            self.metadata(entry.name)
+            for entry in os.scandir(self.registry_config.storage_dir)
+            if entry.is_dir() and os.path.exists(os.path.join(entry.path, "meta.json"))
+        ]
+
+    def delete(self, background_id: str):
+        try:
+            shutil.rmtree(self._background_dir(background_id), ignore_errors=True)
+            with self._lock:
+                for key in [key for key in self._cache if key[0] == background_id]:
+                    self._cache_bytes -= self._cache_bytes_of(self._cache.pop(key))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _cache_bytes_of(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    def _cache_get(self, key):
+        with self._lock:
+            image = self._cache.get(key)
+            if image is not None:
+                self._cache.move_to_end(key)
+            return image
+
+    def _cache_put(self, key, image: Image.Image):
+        size = self._cache_bytes_of(image)
+        if size > self.registry_config.memory_max_bytes:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = image
+            self._cache_bytes += size
+            while self._cache_bytes > self.registry_config.memory_max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= self._cache_bytes_of(evicted)
+
+    def _load_level(self, background_id: str, target_size) -> Image.Image:
+        """Return the smallest stored level that still covers `target_size`."""
+        meta = self.metadata(background_id)
+        width, height = meta["width"], meta["height"]
+        needed = max(target_size[0] / width, target_size[1] / height) * max(width, height)
+        level = next((level for level in meta["levels"] if level >= needed), meta["levels"][-1])
+
+        key = (background_id, "level", level)
+        image = self._cache_get(key)
+        if image is None:
+            array = np.load(os.path.join(self._background_dir(background_id), f"{level}.npy"))
+            image = Image.fromarray(array)
+            self._cache_put(key, image)
+        return image
+
+    def get(self, background_id: str, size, fit: str = "stretch") -> Image.Image:
+        """Return the background as an RGBA image of exactly `size`, fitted as requested."""
+        try:
+            if fit not in BACKGROUND_FITS:
+                raise ValueError(f"Unsupported fit '{fit}'. Supported fits: {BACKGROUND_FITS}")
+            size = tuple(size)
+            key = (background_id, fit, size)
+            image = self._cache_get(key)
+            if image is not None:
+                return image
+
+            if not self.exists(background_id):
+                raise KeyError(f"Unknown background id '{background_id}'")
+
+            source = self._load_level(background_id, size)
+            if fit == "stretch":
+                image = source.resize(size, Image.Resampling.LANCZOS)
+            elif fit == "cover":
+                scale = max(size[0] / source.width, size[1] / source.height)
+                scaled = source.resize(
+                    (max(size[0], round(source.width * scale)), max(size[1], round(source.height * scale))),
+                    Image.Resampling.LANCZOS
+                )
+                left = (scaled.width - size[0]) // 2
+                top = (scaled.height - size[1]) // 2
+                image = scaled.crop((left, top, left + size[0], top + size[1]))
+            else:
+                scale = min(size[0] / source.width, size[1] / source.height)
+                scaled = source.resize(
+                    (max(1, round(source.width * scale)), max(1, round(source.height * scale))),
+                    Image.Resampling.LANCZOS
+                )
+                image = Image.new("RGBA", size, (0, 0, 0, 0))
+                image.paste(scaled, ((size[0] - scaled.width) // 2, (size[1] - scaled.height) // 2))
+
+            self._cache_put(key, image)
+            return image
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+background_registry = BackgroundRegistry(registry_config=BackgroundRegistryConfig(bg_config=BgConfig()))
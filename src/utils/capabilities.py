@@ -0,0 +1,123 @@
+from src.logger import logging
+from src.entity.config import BgConfig, CapabilityConfig
+
+import os
+import sys
+import time
+import resource
+import importlib
+import threading
+
+# Modules that pull in each capability's heavy libraries (google-generativeai / supabase /
+# pandas for memes, onnxruntime via rembg for background removal, only PIL for adding
+# backgrounds, torch / diffusers for inpainting). Nothing else in the app imports them at
+# module level.
+CAPABILITY_MODULES = {
+    "meme": (
+        "src.components.topic_ingestion",
+        "src.components.emotion_analyzer",
+        "src.components.memes_generator",
+        "src.utils.image_templates",
+    ),
+    "remove-bg": (
+        "src.components.remove_bg",
+        "src.utils.rembg_sessions",
+    ),
+    "add-bg": (
+        "src.components.add_bg",
+    ),
+    "inpaint": (
+        "src.components.inpaint",
+    ),
+}
+
+
+class CapabilityDisabledError(Exception):
+    """Raised when a capability that this worker does not serve is requested."""
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+class CapabilityLoader:
+    """
+    Imports a capability's modules on first use and records what that cost.
+
+    Only capabilities listed in `enabled` can be loaded; `require` raises
+    `CapabilityDisabledError` for the others, so a worker configured with
+    ENABLED_CAPABILITIES=meme never imports torch or rembg.
+    """
+
+    def __init__(self, capability_config: CapabilityConfig):
+        unknown = set(capability_config.enabled) - set(capability_config.capabilities)
+        if unknown:
+            raise ValueError(
+                f"Unknown capabilities {sorted(unknown)}; choose from {capability_config.capabilities}"
+            )
+        self.enabled = [name for name in capability_config.capabilities if name in capability_config.enabled]
+        self._lock = threading.Lock()
+        self._loaded = {}
+        self._baseline_rss_mb = current_rss_mb()
+
+    def is_enabled(self, name: str) -> bool:
+        return name in self.enabled
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def require(self, name: str):
+        if not self.is_enabled(name):
+            raise CapabilityDisabledError(
+                f"Capability '{name}' is not served by this worker (enabled: {', '.join(self.enabled) or 'none'})"
+            )
+
+    def load(self, name: str):
+        """Import the modules of capability `name` once; later calls return immediately."""
+        self.require(name)
+        if name in self._loaded:
+            return
+        with self._lock:
+            if name in self._loaded:
+                return
+            rss_before = current_rss_mb()
+            start = time.perf_counter()
+            for module_name in CAPABILITY_MODULES[name]:
+                importlib.import_module(module_name)
+            import_seconds = time.perf_counter() - start
+            self._loaded[name] = {
+                "import_seconds": round(import_seconds, 3),
+                "rss_delta_mb": round(current_rss_mb() - rss_before, 1),
+            }
+            logging.info(
+                f"Loaded capability '{name}' in {import_seconds:.2f}s "
+                f"(+{self._loaded[name]['rss_delta_mb']:.0f} MB RSS)"
+            )
+
+    def report(self) -> dict:
+        """Import time and RSS growth per capability plus the current and peak RSS of the process."""
+        return {
+            "enabled": list(self.enabled),
+            "baseline_rss_mb": round(self._baseline_rss_mb, 1),
+            "rss_mb": round(current_rss_mb(), 1),
+            "peak_rss_mb": round(max(peak_rss_mb(), current_rss_mb()), 1),
+            "capabilities": {
+                name: {"enabled": self.is_enabled(name), "loaded": self.is_loaded(name), **self._loaded.get(name, {})}
+                for name in CAPABILITY_MODULES
+            },
+        }
+
+
+capability_loader = CapabilityLoader(capability_config=CapabilityConfig(bg_config=BgConfig()))
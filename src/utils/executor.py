@@ -0,0 +1,171 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config import BgConfig, ExecutionConfig
+
+import sys
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """Raised when no execution slot frees up within the configured queue timeout."""
+
+
+def _init_inference_worker(warmup_models):
+    # Each inference process keeps its own rembg sessions; load them before the first task arrives
+    from src.utils.rembg_sessions import rembg_session_registry
+
+    try:
+        rembg_session_registry.warmup(warmup_models)
+    except Exception as e:
+        logging.error(f"Inference worker warmup failed: {e}")
+
+
+def _noop():
+    return None
+
+
+class ExecutionLayer:
+    """
+    Runs blocking work off the asyncio event loop.
+
+    Model inference goes to a process pool (or a thread pool when
+    `inference_pool_kind` is "thread") so several images use several cores, and
+    PIL / file work goes to a thread pool. At most `max_pending` tasks are queued
+    or running at once; callers wait up to `queue_timeout` seconds for a slot and
+    get a QueueFullError after that.
+
+    Inference that must share one resident model (inpainting) runs on a third,
+    in-process thread pool of `inpaint_workers` with its own budget of
+    `inpaint_max_pending` slots, so long diffusion runs never hold the threads or
+    slots that cache lookups and compositing need.
+    """
+
+    def __init__(self, execution_config: ExecutionConfig):
+        try:
+            self.execution_config = execution_config
+            self._inference_pool = None
+            self._io_pool = None
+            self._inprocess_pool = None
+            self._slots = None
+            self._inprocess_slots = None
+            self._lock = threading.Lock()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @property
+    def uses_process_pool(self) -> bool:
+        return self.execution_config.inference_pool_kind == "process"
+
+    def _get_inference_pool(self):
+        with self._lock:
+            if self._inference_pool is None:
+                workers = self.execution_config.inference_workers
+                if self.uses_process_pool:
+                    self._inference_pool = ProcessPoolExecutor(
+                        max_workers=workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_inference_worker,
+                        initargs=(self.execution_config.warmup_models,),
+                    )
+                else:
+                    self._inference_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+                logging.info(f"Started {self.execution_config.inference_pool_kind} inference pool with {workers} workers")
+            return self._inference_pool
+
+    def _get_io_pool(self):
+        with self._lock:
+            if self._io_pool is None:
+                self._io_pool = ThreadPoolExecutor(
+                    max_workers=self.execution_config.io_workers, thread_name_prefix="image-io"
+                )
+            return self._io_pool
+
+    def _get_inprocess_pool(self):
+        with self._lock:
+            if self._inprocess_pool is None:
+                self._inprocess_pool = ThreadPoolExecutor(
+                    max_workers=self.execution_config.inpaint_workers, thread_name_prefix="inpaint"
+                )
+            return self._inprocess_pool
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.execution_config.max_pending)
+        return self._slots
+
+    def _get_inprocess_slots(self) -> asyncio.Semaphore:
+        if self._inprocess_slots is None:
+            self._inprocess_slots = asyncio.Semaphore(self.execution_config.inpaint_max_pending)
+        return self._inprocess_slots
+
+    async def _run(self, pool, slots: asyncio.Semaphore, limit: int, fn, *args, **kwargs):
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.execution_config.queue_timeout)
+        except asyncio.TimeoutError:
+            raise QueueFullError(f"Server busy: more than {limit} image tasks pending")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+        finally:
+            slots.release()
+
+    async def run_inference(self, fn, *args, **kwargs):
+        """Run a model inference call in the inference pool. `fn` and its arguments must be picklable."""
+        return await self._run(
+            self._get_inference_pool(), self._get_slots(), self.execution_config.max_pending, fn, *args, **kwargs
+        )
+
+    async def run_blocking(self, fn, *args, **kwargs):
+        """Run short blocking PIL / file work in the thread pool."""
+        return await self._run(
+            self._get_io_pool(), self._get_slots(), self.execution_config.max_pending, fn, *args, **kwargs
+        )
+
+    async def run_inference_inprocess(self, fn, *args, **kwargs):
+        """Run inference on a model resident in this process (inpainting) in its own thread pool."""
+        return await self._run(
+            self._get_inprocess_pool(), self._get_inprocess_slots(), self.execution_config.inpaint_max_pending,
+            fn, *args, **kwargs
+        )
+
+    def call_inference_inprocess(self, fn, *args, **kwargs):
+        """
+        Blocking form of `run_inference_inprocess` for worker threads such as the
+        inpaint job queue; their own queue bounds admission, so no slot is taken.
+        """
+        return self._get_inprocess_pool().submit(fn, *args, **kwargs).result()
+
+    def start(self, inference: bool = True):
+        """
+        Create the pools and spin up every inference worker so warmup happens before traffic.
+        With `inference` off only the thread pool is created; the inference pool still starts
+        on its first task.
+        """
+        try:
+            self._get_io_pool()
+            if not inference:
+                return
+            pool = self._get_inference_pool()
+            if self.uses_process_pool:
+                futures = [pool.submit(_noop) for _ in range(self.execution_config.inference_workers)]
+                for future in futures:
+                    future.result()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def shutdown(self):
+        with self._lock:
+            for pool in (self._inference_pool, self._io_pool, self._inprocess_pool):
+                if pool is not None:
+                    pool.shutdown(wait=True, cancel_futures=True)
+            self._inference_pool = None
+            self._io_pool = None
+            self._inprocess_pool = None
+        logging.info("Execution pools shut down.")
+
+
+execution_layer = ExecutionLayer(execution_config=ExecutionConfig(bg_config=BgConfig()))
@@ -0,0 +1,122 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, FontConfigEntity
+
+import os
+import sys
+import math
+import threading
+from collections import OrderedDict
+from PIL import ImageFont
+
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+
+
+class FontManager:
+    """
+    Registry of caption fonts with an LRU of loaded FreeTypeFont objects.
+
+    Every font file under `fonts_dir` is registered by its file name without the
+    extension, for example "NotoSansTelugu-Regular". `get` accepts such a name or
+    a path and defaults to `font_path`. Sizes up to `size_exact_below` are used
+    exactly. Larger sizes are rounded down to a geometric ladder with ratio
+    1 + `size_tolerance`, so a caption never grows past its computed size and
+    shrinks by at most that fraction. Loaded fonts are keyed by (path, size) and
+    shared between renders; they are only read, never modified.
+    """
+
+    def __init__(self, font_config: FontConfigEntity):
+        try:
+            self.font_config = font_config
+            self.default_path = font_config.font_path
+            self.exact_below = font_config.size_exact_below
+            self.ratio = 1 + font_config.size_tolerance
+            self.max_entries = font_config.cache_entries
+            self._fonts = {}  # name -> path
+            self._cache = OrderedDict()  # (path, size) -> FreeTypeFont
+            self._lock = threading.Lock()
+            self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+            self.discover(font_config.fonts_dir)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def discover(self, fonts_dir: str) -> int:
+        """Register every font file under `fonts_dir`; returns how many were found."""
+        found = 0
+        for root, _, files in os.walk(fonts_dir):
+            for file in sorted(files):
+                if file.lower().endswith(FONT_EXTENSIONS):
+                    self.register(os.path.splitext(file)[0], os.path.join(root, file))
+                    found += 1
+        return found
+
+    def register(self, name: str, path: str):
+        with self._lock:
+            self._fonts[name] = path
+
+    def fonts(self) -> dict:
+        with self._lock:
+            return dict(self._fonts)
+
+    def quantize(self, size: int) -> int:
+        """Largest ladder step that is not above `size`; sizes up to `exact_below` are returned unchanged."""
+        size = int(size)
+        if size <= self.exact_below or self.ratio <= 1:
+            return size
+        # The small epsilon keeps sizes that sit exactly on a step from dropping to the one below
+        k = math.floor(math.log(size / self.exact_below) / math.log(self.ratio) + 1e-9)
+        return min(size, math.ceil(self.exact_below * self.ratio ** k))
+
+    def _resolve(self, font: str = None) -> str:
+        if font is None:
+            return self.default_path
+        with self._lock:
+            return self._fonts.get(font, font)
+
+    def get(self, size: int, font: str = None) -> ImageFont.FreeTypeFont:
+        """Loaded `font` (a registered name or a path, default `font_path`) at the quantized `size`."""
+        key = (self._resolve(font), self.quantize(size))
+        with self._lock:
+            loaded = self._cache.get(key)
+            if loaded is not None:
+                self._cache.move_to_end(key)
+                self._stats["hits"] += 1
+                return loaded
+            self._stats["misses"] += 1
+
+        loaded = ImageFont.truetype(key[0], size=key[1])
+        with self._lock:
+            if self.max_entries > 0:
+                self._cache[key] = loaded
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return loaded
+
+    def preload(self, sizes=None, font: str = None) -> int:
+        """Load `font` at `sizes` (default: the configured preload sizes); returns how many loaded."""
+        loaded = 0
+        for size in sizes if sizes is not None else self.font_config.preload_sizes:
+            try:
+                self.get(size, font)
+                loaded += 1
+            except OSError as e:
+                logging.warning(f"Could not preload font {self._resolve(font)} at size {size}: {e}")
+                break
+        return loaded
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            entries, fonts = len(self._cache), len(self._fonts)
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "hit_rate": stats["hits"] / lookups if lookups else None,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "registered_fonts": fonts,
+        }
+
+
+font_manager = FontManager(font_config=FontConfigEntity(config_entity=ConfigEntity()))
@@ -0,0 +1,24 @@
+import functools
+import threading
+
+import google.generativeai as genai
+
+_configure_lock = threading.Lock()
+_NOT_CONFIGURED = object()
+_configured_key = _NOT_CONFIGURED
+
+
+@functools.lru_cache(maxsize=None)
+def get_gemini_model(model_name: str, api_key: str) -> "genai.GenerativeModel":
+    """
+    Shared GenerativeModel for `model_name`.
+
+    `genai.configure` sets process-wide state, so it runs once per API key here
+    instead of in every component constructor.
+    """
+    global _configured_key
+    with _configure_lock:
+        if _configured_key != api_key:
+            genai.configure(api_key=api_key)
+            _configured_key = api_key
+    return genai.GenerativeModel(model_name)
@@ -0,0 +1,67 @@
+import math
+import functools
+
+from PIL import Image, ImageFilter
+
+
+def binarize_mask(mask: Image.Image, size) -> Image.Image:
+    """Return the mask as an "L" image of `size` holding only 0 and 255."""
+    mask = mask.convert("L")
+    if mask.size != tuple(size):
+        mask = mask.resize(size, Image.Resampling.NEAREST)
+    return mask.point(lambda value: 255 if value > 127 else 0)
+
+
+def context_window(bbox, image_size, margin: float, min_context: int):
+    """
+    Expand the mask bounding box into the crop that is sent to the model.
+
+    The box grows by `margin` times its own size on every side and to at least
+    `min_context` pixels per side, stays centred on the mask where possible and is
+    shifted / clipped to lie inside the image.
+    """
+    left, top, right, bottom = bbox
+    image_width, image_height = image_size
+
+    def _span(start, end, limit):
+        length = end - start
+        target = min(limit, max(round(length * (1 + 2 * margin)), min_context))
+        start = round((start + end) / 2 - target / 2)
+        start = min(max(start, 0), limit - target)
+        return start, start + target
+
+    left, right = _span(left, right, image_width)
+    top, bottom = _span(top, bottom, image_height)
+    return left, top, right, bottom
+
+
+@functools.lru_cache(maxsize=64)
+def resolution_buckets(pixel_budget: int, multiple: int = 64, max_aspect: float = 4.0):
+    """
+    All (width, height) pairs of multiples of `multiple` that use as much of
+    `pixel_budget` as possible, for aspect ratios up to `max_aspect` either way.
+    """
+    buckets = []
+    width = multiple
+    while width * multiple <= pixel_budget:
+        height = (pixel_budget // width) // multiple * multiple
+        if 1 / max_aspect <= width / height <= max_aspect:
+            buckets.append((width, height))
+        width += multiple
+    return tuple(buckets) or ((multiple, multiple),)
+
+
+def aspect_bucket(size, pixel_budget: int, multiple: int = 64):
+    """Bucket from `resolution_buckets` whose aspect ratio is closest to `size`; larger buckets win ties."""
+    aspect = math.log(size[0] / size[1])
+    return min(
+        resolution_buckets(pixel_budget, multiple),
+        key=lambda bucket: (round(abs(math.log(bucket[0] / bucket[1]) - aspect), 6), -bucket[0] * bucket[1])
+    )
+
+
+def feather_mask(mask: Image.Image, radius: int) -> Image.Image:
+    """Grow a binary mask by `radius` and soften the edge so a pasted patch blends in without a seam."""
+    if radius <= 0:
+        return mask
+    return mask.filter(ImageFilter.MaxFilter(2 * radius + 1)).filter(ImageFilter.GaussianBlur(radius / 2))
@@ -0,0 +1,363 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config import BgConfig, JobQueueConfig
+from src.utils.executor import QueueFullError
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import queue
+import shutil
+import socket
+import tempfile
+import itertools
+import threading
+
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+SWEEP_INTERVAL_SECONDS = 60
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobCancelledError(Exception):
+    """Raised from a running job's progress callback once its cancellation was requested."""
+
+
+class FileJobStore:
+    """
+    Local job store: one directory per job under `storage_dir` holding `meta.json`,
+    once the job succeeded `result.bin`, and a `cancel` marker when another process
+    asked for cancellation. Writes go through a temp file and an atomic rename so a
+    crash never leaves a half-written record.
+    """
+
+    def __init__(self, storage_dir: str):
+        self.storage_dir = storage_dir
+        os.makedirs(self.storage_dir, exist_ok=True)
+
+    def _job_dir(self, job_id: str) -> str:
+        if not job_id or not all(c in "0123456789abcdef" for c in job_id):
+            raise ValueError(f"Invalid job id '{job_id}'")
+        return os.path.join(self.storage_dir, job_id)
+
+    def _write(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def save(self, record: dict):
+        self._write(os.path.join(self._job_dir(record["job_id"]), "meta.json"), json.dumps(record).encode())
+
+    def save_result(self, job_id: str, data: bytes):
+        self._write(os.path.join(self._job_dir(job_id), "result.bin"), data)
+
+    def load_result(self, job_id: str):
+        try:
+            with open(os.path.join(self._job_dir(job_id), "result.bin"), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def load(self, job_id: str):
+        try:
+            with open(os.path.join(self._job_dir(job_id), "meta.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def request_cancel(self, job_id: str):
+        self._write(os.path.join(self._job_dir(job_id), "cancel"), b"")
+
+    def cancel_requested(self, job_id: str) -> bool:
+        return os.path.exists(os.path.join(self._job_dir(job_id), "cancel"))
+
+    def load_all(self):
+        records = []
+        for entry in os.scandir(self.storage_dir):
+            try:
+                with open(os.path.join(entry.path, "meta.json")) as f:
+                    records.append(json.load(f))
+            except (NotADirectoryError, FileNotFoundError, json.JSONDecodeError):
+                continue
+        return records
+
+    def delete(self, job_id: str):
+        shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+
+
+class JobQueue:
+    """
+    Background job runner for long image tasks.
+
+    `submit` stores a job record and returns its id immediately; a fixed pool of
+    worker threads takes jobs in priority order (higher first, then FIFO). Jobs
+    report progress through a `progress_callback(step, total)` keyword argument,
+    which is also where running jobs notice cancellation. Finished jobs and their
+    results stay in the store for `ttl` seconds.
+
+    Several server processes can share one store. Every job records the host and
+    pid of the process that owns it, and only that process runs it. Status,
+    results and cancellation work from any process: jobs owned by another process
+    are read from the store, and cancelling one leaves a marker that its owner
+    checks at each progress report. `start` marks a stored unfinished job as
+    failed only when its owner on this host is gone.
+    """
+
+    def __init__(self, job_queue_config: JobQueueConfig, store=None):
+        try:
+            self.job_queue_config = job_queue_config
+            self.store = store or FileJobStore(job_queue_config.storage_dir)
+            self._jobs = {}
+            self._tasks = {}
+            self._cancel_requested = set()
+            self._queue = queue.PriorityQueue()
+            self._sequence = itertools.count()
+            self._lock = threading.Lock()
+            self._workers = []
+            self._owner = {"host": socket.gethostname(), "pid": os.getpid()}
+            self._next_sweep = 0.0
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _recover(self):
+        """
+        Fail stored unfinished jobs whose owner is gone: a process on this host that
+        no longer runs, or an earlier process with our pid (a restarted container).
+        Jobs of live processes and of other hosts are left alone.
+        """
+        recovered = 0
+        for record in self.store.load_all():
+            if record["status"] in FINISHED_STATES:
+                continue
+            owner = record.get("owner")
+            if owner is not None:
+                if owner["host"] != self._owner["host"]:
+                    continue
+                if owner["pid"] == self._owner["pid"]:
+                    with self._lock:
+                        if record["job_id"] in self._jobs:
+                            continue
+                elif _process_alive(owner["pid"]):
+                    continue
+            record.update(status="failed", error="Interrupted by a server restart", finished_at=time.time())
+            self.store.save(record)
+            recovered += 1
+        if recovered:
+            logging.warning(f"Marked {recovered} interrupted jobs as failed")
+
+    def start(self):
+        with self._lock:
+            if self._workers:
+                return
+        self._recover()
+        with self._lock:
+            if self._workers:
+                return
+            for index in range(self.job_queue_config.workers):
+                worker = threading.Thread(target=self._worker, name=f"job-worker-{index}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        logging.info(f"Job queue started with {self.job_queue_config.workers} workers")
+
+    def submit(self, fn, *args, priority: int = 0, **kwargs) -> str:
+        """Queue `fn(*args, progress_callback=..., **kwargs)`, which must return bytes, and return the job id."""
+        try:
+            with self._lock:
+                queued = sum(1 for record in self._jobs.values() if record["status"] == "queued")
+                if queued >= self.job_queue_config.max_queued:
+                    raise QueueFullError(f"Server busy: {queued} jobs already queued")
+
+                job_id = uuid.uuid4().hex
+                record = {
+                    "job_id": job_id,
+                    "status": "queued",
+                    "priority": priority,
+                    "sequence": next(self._sequence),
+                    "progress": {"step": 0, "total": None},
+                    "created_at": time.time(),
+                    "started_at": None,
+                    "finished_at": None,
+                    "error": None,
+                    "owner": self._owner,
+                }
+                self._jobs[job_id] = record
+                self._tasks[job_id] = (fn, args, kwargs)
+                self.store.save(record)
+                self._queue.put((-priority, record["sequence"], job_id))
+
+            logging.info(f"Queued job {job_id} with priority {priority}")
+            return job_id
+
+        except QueueFullError:
+            raise
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get(self, job_id: str):
+        """
+        Return a copy of the job record, or None if unknown / expired. Jobs of this
+        process also report their queue position while queued.
+        """
+        with self._lock:
+            record = self._jobs.get(job_id)
+        if record is None:
+            return self.store.load(job_id)
+        with self._lock:
+            record = dict(record, progress=dict(record["progress"]))
+            if record["status"] == "queued":
+                key = (-record["priority"], record["sequence"])
+                record["queue_position"] = sum(
+                    1 for other in self._jobs.values()
+                    if other["status"] == "queued" and (-other["priority"], other["sequence"]) < key
+                )
+            return record
+
+    def result(self, job_id: str):
+        with self._lock:
+            record = self._jobs.get(job_id)
+        if record is None:
+            record = self.store.load(job_id)
+        if record is None or record["status"] != "succeeded":
+            return None
+        return self.store.load_result(job_id)
+
+    def cancel(self, job_id: str):
+        """Cancel a queued job at once, or ask a running job to stop at its next progress report."""
+        with self._lock:
+            record = self._jobs.get(job_id)
+        if record is None:
+            # Owned by another process: leave a marker for it to pick up
+            record = self.store.load(job_id)
+            if record is None or record["status"] in FINISHED_STATES:
+                return record
+            self.store.request_cancel(job_id)
+            return dict(record, cancel_requested=True)
+        with self._lock:
+            if record["status"] == "queued":
+                record.update(status="cancelled", finished_at=time.time())
+                self._tasks.pop(job_id, None)
+                self.store.save(record)
+            elif record["status"] == "running":
+                self._cancel_requested.add(job_id)
+                record["cancel_requested"] = True
+            return dict(record)
+
+    def _progress_callback(self, job_id: str):
+        def _report(step: int, total: int):
+            cancelled_elsewhere = self.store.cancel_requested(job_id)
+            with self._lock:
+                if cancelled_elsewhere:
+                    self._cancel_requested.add(job_id)
+                if job_id in self._cancel_requested:
+                    raise JobCancelledError(f"Job {job_id} was cancelled")
+                self._jobs[job_id]["progress"] = {"step": step, "total": total}
+                # Persisted so other server processes can report progress too
+                self.store.save(self._jobs[job_id])
+        return _report
+
+    def _finish(self, job_id: str, **fields):
+        with self._lock:
+            record = self._jobs[job_id]
+            record.update(finished_at=time.time(), **fields)
+            record.pop("cancel_requested", None)
+            self._cancel_requested.discard(job_id)
+            self._tasks.pop(job_id, None)
+            self.store.save(record)
+
+    def _run(self, job_id: str):
+        cancelled_elsewhere = self.store.cancel_requested(job_id)
+        with self._lock:
+            record = self._jobs.get(job_id)
+            task = self._tasks.get(job_id)
+            if record is None or task is None or record["status"] != "queued":
+                return  # cancelled while waiting
+            if cancelled_elsewhere:
+                record.update(status="cancelled", finished_at=time.time())
+                self._tasks.pop(job_id, None)
+                self.store.save(record)
+                return
+            record.update(status="running", started_at=time.time())
+            self.store.save(record)
+
+        fn, args, kwargs = task
+        try:
+            output = fn(*args, progress_callback=self._progress_callback(job_id), **kwargs)
+            self.store.save_result(job_id, output)
+            self._finish(job_id, status="succeeded")
+            logging.info(f"Job {job_id} succeeded")
+        except Exception as e:
+            if job_id in self._cancel_requested:
+                self._finish(job_id, status="cancelled")
+                logging.info(f"Job {job_id} cancelled while running")
+            else:
+                self._finish(job_id, status="failed", error=str(e))
+                logging.error(f"Job {job_id} failed: {e}")
+
+    def _worker(self):
+        while True:
+            self._maybe_sweep()
+            try:
+                _, _, job_id = self._queue.get(timeout=30)
+            except queue.Empty:
+                continue
+            if job_id is None:
+                return
+            self._run(job_id)
+
+    def _maybe_sweep(self):
+        """Sweep from a worker thread at most every SWEEP_INTERVAL_SECONDS; requests never do cleanup."""
+        with self._lock:
+            if time.monotonic() < self._next_sweep:
+                return
+            self._next_sweep = time.monotonic() + SWEEP_INTERVAL_SECONDS
+        self._sweep()
+
+    def _sweep(self):
+        """Delete finished jobs older than the TTL (from any process) together with their stored results."""
+        cutoff = time.time() - self.job_queue_config.ttl
+        expired = {
+            record["job_id"] for record in self.store.load_all()
+            if record["status"] in FINISHED_STATES and record["finished_at"] < cutoff
+        }
+        with self._lock:
+            expired.update(
+                job_id for job_id, record in self._jobs.items()
+                if record["status"] in FINISHED_STATES and record["finished_at"] < cutoff
+            )
+            for job_id in expired:
+                self._jobs.pop(job_id, None)
+        for job_id in expired:
+            self.store.delete(job_id)
+        if expired:
+            logging.info(f"Removed {len(expired)} expired jobs")
+
+    def shutdown(self):
+        """Cancel queued and running jobs and stop the workers."""
+        with self._lock:
+            workers, self._workers = self._workers, []
+            for job_id, record in self._jobs.items():
+                if record["status"] == "running":
+                    self._cancel_requested.add(job_id)
+        for job_id in [job_id for job_id, record in list(self._jobs.items()) if record["status"] == "queued"]:
+            self.cancel(job_id)
+        for _ in workers:
+            self._queue.put((math.inf, next(self._sequence), None))
+        for worker in workers:
+            worker.join()
+        logging.info("Job queue shut down.")
+
+
+inpaint_job_queue = JobQueue(job_queue_config=JobQueueConfig(bg_config=BgConfig()))
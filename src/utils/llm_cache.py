@@ -0,0 +1,256 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, LLMCacheConfigEntity
+
+import os
+import sys
+import json
+import time
+import string
+import sqlite3
+import asyncio
+import hashlib
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, defaultdict
+
+
+def normalize_topic(topic: str) -> str:
+    """Case-fold, collapse whitespace and strip surrounding punctuation so trivial variants share a key."""
+    return " ".join(topic.casefold().split()).strip(string.punctuation + " ")
+
+
+class LLMCache:
+    """
+    Two-tier cache of Gemini results (JSON-serialisable values) with per-entry TTLs.
+
+    The memory tier is an LRU of at most `memory_max_entries` entries. The disk tier
+    is a SQLite database at `db_path` in WAL mode, so every uvicorn worker on the
+    host shares it. Keys carry their namespace and prompt version, so bumping a
+    prompt version retires the old entries.
+
+    Besides single values the cache keeps pools of variants under one key:
+    `next_variant` rotates through a full pool and returns None while the pool
+    still has room, telling the caller to generate a new variant and `add_variant` it.
+    """
+
+    def __init__(self, llm_cache_config: LLMCacheConfigEntity):
+        try:
+            self.llm_cache_config = llm_cache_config
+            self.db_path = llm_cache_config.db_path
+            self.memory_max_entries = llm_cache_config.memory_max_entries
+            self._memory = OrderedDict()
+            self._cursors = {}
+            self._lock = threading.Lock()
+            self._local = threading.local()
+            self._executor = None
+            self._stats = defaultdict(lambda: defaultdict(int))
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+            self.purge_expired()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that opened them
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(namespace: str, prompt_version: str, *parts) -> str:
+        digest = hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()[:32]
+        return f"{namespace}:{prompt_version}:{digest}"
+
+    def emotion_key(self, topic: str) -> str:
+        return self.make_key("emotion", self.llm_cache_config.emotion_prompt_version, normalize_topic(topic))
+
+    def dialogue_key(self, topic: str, emotion: str) -> str:
+        return self.make_key("dialogues", self.llm_cache_config.dialogue_prompt_version, normalize_topic(topic), emotion)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-cache")
+            return self._executor
+
+    async def _run(self, fn, *args):
+        """
+        Run a cache call on the cache's own thread. SQLite reads and the BEGIN IMMEDIATE
+        merge in `add_variant` can wait up to the busy timeout, which must not block the
+        event loop.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), functools.partial(fn, *args))
+
+    async def get_emotion_async(self, topic: str):
+        return await self._run(self.get_emotion, topic)
+
+    async def put_emotion_async(self, topic: str, emotion: str):
+        await self._run(self.put_emotion, topic, emotion)
+
+    async def next_dialogues_async(self, topic: str, emotion: str):
+        return await self._run(self.next_dialogues, topic, emotion)
+
+    async def add_dialogues_async(self, topic: str, emotion: str, dialogues):
+        await self._run(self.add_dialogues, topic, emotion, dialogues)
+
+    def get_emotion(self, topic: str):
+        return self.get(self.emotion_key(topic))
+
+    def put_emotion(self, topic: str, emotion: str):
+        self.put(self.emotion_key(topic), emotion, self.llm_cache_config.emotion_ttl)
+
+    def next_dialogues(self, topic: str, emotion: str):
+        """Cached (upper, lower) for the topic and emotion, or None while its variant pool is still filling."""
+        dialogues = self.next_variant(self.dialogue_key(topic, emotion), self.llm_cache_config.dialogue_variants)
+        return tuple(dialogues) if dialogues else None
+
+    def add_dialogues(self, topic: str, emotion: str, dialogues):
+        self.add_variant(
+            self.dialogue_key(topic, emotion),
+            list(dialogues),
+            self.llm_cache_config.dialogue_variants,
+            self.llm_cache_config.dialogue_ttl
+        )
+
+    def _count(self, key: str, event: str):
+        with self._lock:
+            self._stats[key.split(":", 1)[0]][event] += 1
+
+    def _put_memory(self, key: str, value, expires_at: float):
+        with self._lock:
+            self._memory[key] = (value, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_max_entries:
+                evicted, _ = self._memory.popitem(last=False)
+                self._cursors.pop(evicted, None)
+
+    def _lookup(self, key: str):
+        """Return (value, tier) for a live entry, or (None, None)."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    return entry[0], "memory"
+                del self._memory[key]
+
+        try:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"LLM cache read failed, treating as a miss: {e}")
+            return None, None
+        if row is None or row[1] <= now:
+            return None, None
+        value = json.loads(row[0])
+        self._put_memory(key, value, row[1])
+        return value, "disk"
+
+    def get(self, key: str):
+        """Return the cached value for `key`, or None on a miss or an expired entry."""
+        value, tier = self._lookup(key)
+        self._count(key, f"{tier}_hits" if tier else "misses")
+        return value
+
+    def put(self, key: str, value, ttl: float):
+        """Store `value` in both tiers for `ttl` seconds."""
+        expires_at = time.time() + ttl
+        self._put_memory(key, value, expires_at)
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+        except sqlite3.Error as e:
+            logging.warning(f"LLM cache write failed, kept in memory only: {e}")
+
+    def next_variant(self, key: str, pool_size: int):
+        """Next variant of a full pool in rotation, or None while the pool holds fewer than `pool_size`."""
+        pool, _ = self._lookup(key)
+        if not pool or len(pool) < pool_size:
+            self._count(key, "variant_fills")
+            return None
+        with self._lock:
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+        self._count(key, "variant_hits")
+        return pool[cursor % len(pool)]
+
+    @staticmethod
+    def _merge_variant(pool: list, value, pool_size: int) -> list:
+        """`pool` with `value` appended unless already present, trimmed to the newest `pool_size`."""
+        return pool if value in pool else (pool + [value])[-pool_size:]
+
+    def add_variant(self, key: str, value, pool_size: int, ttl: float):
+        """
+        Add `value` to the pool under `key`, keeping the newest `pool_size` variants.
+
+        The pool is merged inside a write transaction so concurrent workers filling the
+        same pool do not overwrite each other. The pool expires `ttl` seconds after its
+        first variant, after which it is filled with fresh variants again.
+        """
+        now = time.time()
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+                pool, expires_at = (json.loads(row[0]), row[1]) if row and row[1] > now else ([], now + ttl)
+                pool = self._merge_variant(pool, value, pool_size)
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(pool), expires_at)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logging.warning(f"LLM cache write failed, kept in memory only: {e}")
+            # Same merge against the memory tier, keeping the pool's original expiry
+            with self._lock:
+                entry = self._memory.get(key)
+            pool, expires_at = (entry[0], entry[1]) if entry is not None and entry[1] > now else ([], now + ttl)
+            pool = self._merge_variant(pool, value, pool_size)
+        self._put_memory(key, pool, expires_at)
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the disk tier and return how many were removed."""
+        try:
+            return self._connection().execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),)).rowcount
+        except sqlite3.Error as e:
+            logging.warning(f"LLM cache purge failed: {e}")
+            return 0
+
+    def stats(self) -> dict:
+        try:
+            disk_entries = self._connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        except sqlite3.Error:
+            disk_entries = None
+        with self._lock:
+            namespaces = {}
+            for namespace, counters in self._stats.items():
+                hits = counters["memory_hits"] + counters["disk_hits"] + counters["variant_hits"]
+                lookups = hits + counters["misses"] + counters["variant_fills"]
+                namespaces[namespace] = {**counters, "hit_rate": hits / lookups if lookups else 0.0}
+            return {
+                "namespaces": namespaces,
+                "memory_entries": len(self._memory),
+                "memory_max_entries": self.memory_max_entries,
+                "disk_entries": disk_entries,
+            }
+
+
+llm_cache = LLMCache(llm_cache_config=LLMCacheConfigEntity(config_entity=ConfigEntity()))
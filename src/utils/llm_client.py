@@ -0,0 +1,292 @@
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, LLMClientConfigEntity
+
+import json
+import time
+import random
+import asyncio
+import hashlib
+import functools
+import threading
+from collections import deque
+
+
+class LLMCallError(Exception):
+    """Raised when an LLM call still fails after all retries."""
+
+
+class LLMTimeoutError(LLMCallError, TimeoutError):
+    """Raised when an LLM call does not succeed before its deadline."""
+
+
+class ProcessLimiter:
+    """
+    Concurrency limit shared by every thread and event loop of the process.
+
+    `acquire` is awaited on any loop. A free slot is taken at once; otherwise the
+    caller parks on a future of its own loop and `release` hands the slot
+    straight to the oldest waiter through `call_soon_threadsafe`. No thread ever
+    blocks, and a waiter cancelled after being handed a slot passes it on.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._waiters = deque()  # (loop, future)
+
+    def locked(self) -> bool:
+        with self._lock:
+            return self._in_use >= self.limit
+
+    def in_use(self) -> int:
+        with self._lock:
+            return self._in_use
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._in_use < self.limit and not self._waiters:
+                self._in_use += 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # the slot arrived just as we were cancelled
+            else:
+                with self._lock:
+                    if (loop, future) in self._waiters:
+                        self._waiters.remove((loop, future))
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._grant, future)
+                    return
+                except RuntimeError:
+                    continue  # the waiter's loop is closed
+            self._in_use -= 1
+
+    def _grant(self, future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+class GeminiBackend:
+    """Calls a `genai.GenerativeModel`, natively async when the SDK supports it."""
+
+    def __init__(self, model):
+        self.model = model
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        if hasattr(self.model, "generate_content_async"):
+            response = await self.model.generate_content_async(prompt, **kwargs)
+        else:
+            response = await asyncio.to_thread(self.model.generate_content, prompt, **kwargs)
+        return getattr(response, "text", "")
+
+
+class FakeBackend:
+    """
+    Offline stand-in for Gemini with a simulated latency distribution.
+
+    Every call sleeps `latency` seconds (±20%), or `tail_latency` seconds with
+    probability `tail_probability`, and fails with probability `failure_rate`.
+    Responses are deterministic per prompt and valid for the emotion, dialogue and
+    combined JSON prompts of the meme components.
+    """
+
+    def __init__(self, latency: float, tail_latency: float, tail_probability: float,
+                 failure_rate: float = 0.0, emotions=("neutral",), seed: int = None):
+        self.latency = latency
+        self.tail_latency = tail_latency
+        self.tail_probability = tail_probability
+        self.failure_rate = failure_rate
+        self.emotions = list(emotions)
+        self._random = random.Random(seed)
+        self.calls = 0
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        self.calls += 1
+        slow = self._random.random() < self.tail_probability
+        await asyncio.sleep(self.tail_latency if slow else self.latency * self._random.uniform(0.8, 1.2))
+        if self._random.random() < self.failure_rate:
+            raise ConnectionError("Fake backend failure")
+
+        digest = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+        emotion = self.emotions[digest % len(self.emotions)]
+        upper, lower = f"Fake dialogue {digest % 1000}", f"Fake punchline {digest % 997}"
+        if kwargs.get("generation_config", {}).get("response_mime_type") == "application/json":
+            return json.dumps({"emotion": emotion, "upper": upper, "lower": lower})
+        if "Return ONLY the emotion" in prompt:
+            return emotion
+        return f"{upper}\n{lower}"
+
+
+class AsyncLLMClient:
+    """
+    Async front for an LLM backend with deadlines, retries, hedging and a concurrency limit.
+
+    `generate` gives up with LLMTimeoutError once `deadline` seconds have passed,
+    or with LLMCallError once every attempt failed.
+    Each attempt is capped at `attempt_timeout`. A failed or timed-out attempt is
+    retried up to `max_retries` times after an exponential backoff with full jitter.
+    When an attempt is slower than the `hedge_percentile` of recent latencies, a
+    second identical request is sent and whichever answers first wins. Hedges are
+    skipped while every concurrency slot is taken. At most `max_concurrency`
+    backend requests run at once in the whole process, across threads and
+    event loops (sync wrappers run their own loops).
+    """
+
+    def __init__(self, backend, llm_client_config: LLMClientConfigEntity):
+        self.backend = backend
+        self.llm_client_config = llm_client_config
+        self._latencies = deque(maxlen=llm_client_config.latency_window)
+        self._limiter = ProcessLimiter(llm_client_config.max_concurrency)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "timeouts": 0, "failures": 0}
+
+    def _count(self, event: str):
+        with self._lock:
+            self._stats[event] += 1
+
+    def _percentile(self, fraction: float):
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    def _hedge_delay(self):
+        if not self.llm_client_config.hedge_enabled:
+            return None
+        if len(self._latencies) < self.llm_client_config.hedge_min_samples:
+            return self.llm_client_config.hedge_initial_delay
+        return self._percentile(self.llm_client_config.hedge_percentile)
+
+    async def _request(self, prompt: str, kwargs: dict) -> str:
+        async with self._limiter:
+            start = time.perf_counter()
+            text = await self.backend.generate(prompt, **kwargs)
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+        return text
+
+    async def _attempt(self, prompt: str, kwargs: dict, timeout: float) -> str:
+        """One attempt: the primary request plus at most one hedge, bounded by `timeout`."""
+        loop = asyncio.get_running_loop()
+        end = loop.time() + timeout
+        primary = asyncio.ensure_future(self._request(prompt, kwargs))
+        pending = {primary}
+        error = None
+        try:
+            hedge_delay = self._hedge_delay()
+            if hedge_delay is not None and hedge_delay < timeout:
+                await asyncio.wait(pending, timeout=hedge_delay)
+                if not primary.done() and not self._limiter.locked():
+                    pending.add(asyncio.ensure_future(self._request(prompt, kwargs)))
+                    self._count("hedges")
+
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(end - loop.time(), 0), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def generate(self, prompt: str, deadline: float = None, **kwargs) -> str:
+        """Return the backend's text for `prompt`, retrying and hedging within `deadline` seconds."""
+        config = self.llm_client_config
+        loop = asyncio.get_running_loop()
+        end = loop.time() + (deadline or config.deadline)
+        self._count("calls")
+        last_error = None
+
+        for attempt in range(config.max_retries + 1):
+            remaining = end - loop.time()
+            if remaining <= 0:
+                break
+            self._count("attempts")
+            try:
+                return await self._attempt(prompt, kwargs, min(config.attempt_timeout, remaining))
+            except asyncio.TimeoutError as e:
+                self._count("timeouts")
+                last_error = e
+                logging.warning(f"LLM attempt {attempt + 1} timed out")
+            except Exception as e:
+                self._count("failures")
+                last_error = e
+                logging.warning(f"LLM attempt {attempt + 1} failed: {e}")
+
+            if attempt < config.max_retries:
+                backoff = random.uniform(0, min(config.retry_max_delay, config.retry_base_delay * 2 ** attempt))
+                if loop.time() + backoff >= end:
+                    break
+                self._count("retries")
+                await asyncio.sleep(backoff)
+
+        if last_error is None or isinstance(last_error, asyncio.TimeoutError) or loop.time() >= end:
+            raise LLMTimeoutError(f"LLM call did not succeed within {deadline or config.deadline:.1f}s")
+        raise LLMCallError(f"LLM call failed after {config.max_retries + 1} attempts: {last_error}") from last_error
+
+    def generate_sync(self, prompt: str, deadline: float = None, **kwargs) -> str:
+        """Blocking `generate` for callers without an event loop (scripts, worker threads)."""
+        return asyncio.run(self.generate(prompt, deadline=deadline, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            samples = len(self._latencies)
+        return {
+            **stats,
+            "in_flight": self._limiter.in_use(),
+            "latency_samples": samples,
+            "p50_seconds": self._percentile(0.5),
+            "p95_seconds": self._percentile(0.95),
+            "p99_seconds": self._percentile(0.99),
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm_client(model) -> AsyncLLMClient:
+    """
+    Shared AsyncLLMClient for a Gemini model, so every component using the model
+    shares one concurrency limit and one latency window. LLM_BACKEND=fake swaps in
+    FakeBackend.
+    """
+    llm_client_config = LLMClientConfigEntity(config_entity=ConfigEntity())
+    if llm_client_config.backend == "fake":
+        backend = FakeBackend(
+            latency=llm_client_config.fake_latency,
+            tail_latency=llm_client_config.fake_tail_latency,
+            tail_probability=llm_client_config.fake_tail_probability,
+            failure_rate=llm_client_config.fake_failure_rate,
+            emotions=llm_client_config.emotion_templates
+        )
+    else:
+        backend = GeminiBackend(model)
+    return AsyncLLMClient(backend, llm_client_config=llm_client_config)
@@ -0,0 +1,82 @@
+from src.exceptions import CustomException
+
+import sys
+import numpy as np
+from PIL import Image, ImageFilter
+
+
+def box_filter(x: np.ndarray, radius: int) -> np.ndarray:
+    """Mean over a (2r+1)x(2r+1) window, computed with cumulative sums and clipped at the borders."""
+    height, width = x.shape
+    padded = np.zeros((height + 1, width + 1), dtype=np.float64)
+    padded[1:, 1:] = np.cumsum(np.cumsum(x, axis=0), axis=1)
+
+    rows = np.arange(height)
+    cols = np.arange(width)
+    top = np.clip(rows - radius, 0, height)
+    bottom = np.clip(rows + radius + 1, 0, height)
+    left = np.clip(cols - radius, 0, width)
+    right = np.clip(cols + radius + 1, 0, width)
+
+    window_sum = (
+        padded[bottom][:, right] - padded[top][:, right]
+        - padded[bottom][:, left] + padded[top][:, left]
+    )
+    window_area = np.outer(bottom - top, right - left)
+    return window_sum / window_area
+
+
+def guided_filter(guide: np.ndarray, src: np.ndarray, radius: int, eps: float) -> np.ndarray:
+    """Edge-preserving smoothing of `src` steered by the grayscale `guide` (He et al.)."""
+    mean_guide = box_filter(guide, radius)
+    mean_src = box_filter(src, radius)
+    cov_guide_src = box_filter(guide * src, radius) - mean_guide * mean_src
+    var_guide = box_filter(guide * guide, radius) - mean_guide * mean_guide
+
+    a = cov_guide_src / (var_guide + eps)
+    b = mean_src - a * mean_guide
+    return box_filter(a, radius) * guide + box_filter(b, radius)
+
+
+def fast_refine_alpha(
+    image: Image.Image,
+    mask: Image.Image,
+    foreground_threshold: int,
+    background_threshold: int,
+    erode_size: int,
+    work_size: int = 512,
+    radius: int = 8,
+    eps: float = 1e-3,
+) -> Image.Image:
+    """
+    Refine a segmentation mask into an alpha matte with a guided filter.
+
+    The filter runs on a copy downscaled to `work_size` on the longest side and is
+    upsampled again; only the uncertain band of the trimap takes the refined value,
+    confident foreground and background stay fully opaque / transparent.
+    """
+    try:
+        # Trimap at full resolution, eroded like the closed-form matting path
+        kernel = erode_size if erode_size % 2 else erode_size + 1
+        is_foreground = mask.point(lambda v: 255 if v > foreground_threshold else 0)
+        is_background = mask.point(lambda v: 255 if v < background_threshold else 0)
+        if erode_size > 0:
+            is_foreground = is_foreground.filter(ImageFilter.MinFilter(kernel))
+            is_background = is_background.filter(ImageFilter.MinFilter(kernel))
+
+        scale = min(1.0, work_size / max(image.size))
+        small_size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        guide = np.asarray(image.convert("L").resize(small_size, Image.Resampling.BILINEAR), dtype=np.float64) / 255.0
+        src = np.asarray(mask.resize(small_size, Image.Resampling.BILINEAR), dtype=np.float64) / 255.0
+
+        radius = max(1, round(radius * scale))
+        refined = np.clip(guided_filter(guide, src, radius, eps), 0.0, 1.0)
+        refined = Image.fromarray((refined * 255).astype(np.uint8)).resize(image.size, Image.Resampling.BILINEAR)
+
+        alpha = np.asarray(refined).copy()
+        alpha[np.asarray(is_foreground) > 0] = 255
+        alpha[np.asarray(is_background) > 0] = 0
+        return Image.fromarray(alpha)
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -0,0 +1,74 @@
+from src.logger import logging
+
+import threading
+
+
+class _PendingBatch:
+    def __init__(self):
+        self.items = []
+        self.results = None
+        self.error = None
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Groups concurrent blocking calls with the same key into one batched call.
+
+    The first caller for a key becomes the batch leader: it waits up to
+    `max_wait` seconds (less if the batch fills up to `max_batch_size`), then
+    runs `run_batch(key, items)` and every caller gets its own element of the
+    returned list. An element that is an exception is raised to that caller
+    only. Batches run one at a time, and a batch keeps accepting items while
+    it waits for the previous one to finish, so batches grow under load.
+    """
+
+    def __init__(self, name: str, run_batch, max_batch_size: int, max_wait: float):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+
+    def _close(self, key, batch: _PendingBatch):
+        with self._lock:
+            if self._pending.get(key) is batch:
+                del self._pending[key]
+
+    def submit(self, key, item):
+        """Add `item` to the open batch for `key`, block until that batch has run and return this item's result."""
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = _PendingBatch()
+                self._pending[key] = batch
+            index = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self.max_batch_size:
+                del self._pending[key]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.max_wait)
+            with self._run_lock:
+                self._close(key, batch)
+                logging.info(f"{self.name}: running batch of {len(batch.items)}")
+                try:
+                    batch.results = self.run_batch(key, batch.items)
+                except Exception as e:
+                    batch.error = e
+                finally:
+                    batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        result = batch.results[index]
+        if isinstance(result, Exception):
+            raise result
+        return result
@@ -0,0 +1,111 @@
+from src.exceptions import CustomException
+from src.logger import logging
+
+import gc
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+
+class ModelManager:
+    """
+    Keeps a heavy model resident across requests.
+
+    The model is loaded lazily by `loader` on the first `acquire()`, access is
+    serialized through a lock, and the model is dropped again once it has been
+    idle for `idle_timeout` seconds (0 or None keeps it loaded forever).
+    """
+
+    def __init__(self, name: str, loader, idle_timeout: float = None, unloader=None):
+        try:
+            self.name = name
+            self.loader = loader
+            self.unloader = unloader
+            self.idle_timeout = idle_timeout
+            self._model = None
+            self._lock = threading.RLock()
+            self._last_used = None
+            self._unload_timer = None
+            self._served_first_request = False
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def _load(self):
+        logging.info(f"Loading model '{self.name}'...")
+        start = time.perf_counter()
+        self._model = self.loader()
+        logging.info(f"Model '{self.name}' loaded in {time.perf_counter() - start:.2f}s")
+
+    def load(self):
+        """Load the model now instead of on first use."""
+        try:
+            with self._lock:
+                if self._model is None:
+                    self._load()
+                self._schedule_unload()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @contextmanager
+    def acquire(self):
+        """Yield the loaded model while holding the lock, loading it first if needed."""
+        wait_start = time.perf_counter()
+        with self._lock:
+            self._cancel_unload()
+            try:
+                if self._model is None:
+                    self._load()
+                if not self._served_first_request:
+                    self._served_first_request = True
+                    logging.info(
+                        f"First request for model '{self.name}' acquired it after "
+                        f"{time.perf_counter() - wait_start:.2f}s"
+                    )
+                yield self._model
+            finally:
+                self._last_used = time.monotonic()
+                self._schedule_unload()
+
+    def _cancel_unload(self):
+        if self._unload_timer is not None:
+            self._unload_timer.cancel()
+            self._unload_timer = None
+
+    def _schedule_unload(self):
+        if not self.idle_timeout or self._model is None:
+            return
+        self._cancel_unload()
+        self._unload_timer = threading.Timer(self.idle_timeout, self._unload_if_idle)
+        self._unload_timer.daemon = True
+        self._unload_timer.start()
+
+    def _unload_if_idle(self):
+        with self._lock:
+            if self._model is None or self._last_used is None:
+                return
+            idle_for = time.monotonic() - self._last_used
+            if idle_for < self.idle_timeout:
+                return
+            logging.info(f"Model '{self.name}' idle for {idle_for:.0f}s, unloading.")
+            self.unload()
+
+    def unload(self):
+        """Drop the model and release its memory."""
+        try:
+            with self._lock:
+                self._cancel_unload()
+                if self._model is None:
+                    return
+                self._model = None
+                self._served_first_request = False
+                gc.collect()
+                if self.unloader is not None:
+                    self.unloader()
+                logging.info(f"Model '{self.name}' unloaded.")
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,122 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config import BgConfig, RemoveBgConfig
+
+import sys
+import time
+import threading
+import numpy as np
+import onnxruntime as ort
+from PIL import Image
+from rembg import new_session
+
+from src.utils.segmentation import supports_dynamic_batch
+
+
+def _make_batch_dynamic(session, model_name: str) -> bool:
+    """
+    Rebuild the session's ONNX graph with a symbolic batch dimension when it was
+    exported with a fixed batch of one, so `predict_masks` can run real batches.
+
+    Needs the optional `onnx` package. The rebuilt graph is checked with a batch of
+    two; on any failure the original session is kept and a warning is logged.
+    """
+    inner = session.inner_session
+    if supports_dynamic_batch(inner):
+        return True
+    try:
+        import onnx
+
+        model = onnx.load(inner._model_path)
+        for value in (*model.graph.input, *model.graph.output):
+            batch_dim = value.type.tensor_type.shape.dim[0]
+            batch_dim.ClearField("dim_value")
+            batch_dim.dim_param = "batch"
+        # Inferred intermediate shapes still pin the batch to one
+        del model.graph.value_info[:]
+        dynamic = ort.InferenceSession(
+            model.SerializeToString(), sess_options=inner.get_session_options(), providers=inner.get_providers()
+        )
+
+        model_input = dynamic.get_inputs()[0]
+        probe = np.zeros((2, *model_input.shape[1:]), dtype=np.float32)
+        if dynamic.run(None, {model_input.name: probe})[0].shape[0] != 2:
+            raise ValueError("output batch dimension does not follow the input")
+    except Exception as e:
+        logging.warning(
+            f"Model '{model_name}' is exported with a fixed batch size of 1 and could not be made dynamic "
+            f"({type(e).__name__}: {e}); batch requests will run its inputs one at a time."
+        )
+        return False
+    session.inner_session = dynamic
+    logging.info(f"Rebuilt rembg session '{model_name}' with a dynamic batch dimension")
+    return True
+
+
+class RembgSessionRegistry:
+    """
+    Process-wide registry of rembg sessions keyed by model name.
+
+    Each model is loaded (ONNX graph load + optimization) once and then shared by
+    every request. onnxruntime sessions are safe to run from several threads, so
+    only the loading step is guarded by a lock. Models exported with a fixed batch
+    size of one are rebuilt with a dynamic batch dimension where possible.
+    """
+
+    def __init__(self):
+        try:
+            self.remove_bg_config = RemoveBgConfig(bg_config=BgConfig())
+            self._sessions = {}
+            self._load_locks = {}
+            self._registry_lock = threading.Lock()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _get_load_lock(self, model_name: str) -> threading.Lock:
+        with self._registry_lock:
+            return self._load_locks.setdefault(model_name, threading.Lock())
+
+    def get_session(self, model_name: str = None):
+        """Return the shared session for the given model, loading it on first use."""
+        try:
+            model_name = model_name or self.remove_bg_config.model_name
+            session = self._sessions.get(model_name)
+            if session is not None:
+                return session
+
+            if model_name not in self.remove_bg_config.supported_models:
+                raise ValueError(
+                    f"Unsupported rembg model '{model_name}'. "
+                    f"Supported models: {self.remove_bg_config.supported_models}"
+                )
+
+            with self._get_load_lock(model_name):
+                session = self._sessions.get(model_name)
+                if session is None:
+                    start = time.perf_counter()
+                    session = new_session(model_name=model_name)
+                    _make_batch_dynamic(session, model_name)
+                    self._sessions[model_name] = session
+                    logging.info(f"Loaded rembg session '{model_name}' in {time.perf_counter() - start:.2f}s")
+            return session
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def warmup(self, model_names=None):
+        """Load the given models and run one dummy inference so the first request does not pay for it."""
+        try:
+            model_names = model_names or [self.remove_bg_config.model_name]
+            for model_name in model_names:
+                session = self.get_session(model_name)
+                start = time.perf_counter()
+                session.predict(Image.new("RGB", (64, 64)))
+                logging.info(f"Warmed rembg session '{model_name}' in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def loaded_models(self):
+        return list(self._sessions.keys())
+
+
+rembg_session_registry = RembgSessionRegistry()
@@ -0,0 +1,187 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config import BgConfig, ResultCacheConfig
+
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of encoded image results keyed by input content and parameters.
+
+    The memory tier is an LRU bounded by total bytes. The disk tier keeps one file
+    per key under `cache_dir` and evicts the least recently used files once the
+    directory grows past `disk_max_bytes`.
+
+    `get_memory` / `put_memory` never touch the disk and are safe to call on the
+    event loop. `get_disk` / `put_disk` do file I/O and belong on a worker thread.
+    `get` / `put` combine both tiers for synchronous callers.
+    """
+
+    def __init__(self, cache_dir: str, memory_max_bytes: int, disk_max_bytes: int):
+        try:
+            self.cache_dir = cache_dir
+            self.memory_max_bytes = memory_max_bytes
+            self.disk_max_bytes = disk_max_bytes
+            self._memory = OrderedDict()
+            self._memory_bytes = 0
+            self._lock = threading.Lock()
+            self._evicting = False
+            self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "memory_evictions": 0, "disk_evictions": 0}
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(self.cache_dir) if entry.is_file())
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def make_key(operation: str, *inputs: bytes, **params) -> str:
+        """Build a cache key from the operation name, the input contents and the operation parameters."""
+        digest = hashlib.sha256(operation.encode())
+        for data in inputs:
+            digest.update(hash_bytes(data).encode())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.bin")
+
+    def _put_memory(self, key: str, value: bytes):
+        if len(value) > self.memory_max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = value
+        self._memory_bytes += len(value)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._stats["memory_evictions"] += 1
+
+    def get_memory(self, key: str):
+        """Return the bytes for `key` from the memory tier, or None; never touches the disk."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+            return value
+
+    def get_disk(self, key: str):
+        """Return the bytes for `key` from the disk tier (promoting them to memory), or None on a miss."""
+        try:
+            path = self._disk_path(key)
+            try:
+                with open(path, "rb") as f:
+                    value = f.read()
+                os.utime(path)  # mark as recently used for disk eviction
+            except FileNotFoundError:
+                with self._lock:
+                    self._stats["misses"] += 1
+                return None
+
+            with self._lock:
+                self._stats["disk_hits"] += 1
+                self._put_memory(key, value)
+            return value
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get(self, key: str):
+        """Return the cached bytes for `key`, or None on a miss."""
+        value = self.get_memory(key)
+        return value if value is not None else self.get_disk(key)
+
+    def put_memory(self, key: str, value: bytes):
+        with self._lock:
+            self._put_memory(key, value)
+
+    def put_disk(self, key: str, value: bytes):
+        """Write `value` to the disk tier and trim the directory if it grew past its budget."""
+        try:
+            if len(value) > self.disk_max_bytes:
+                return
+
+            path = self._disk_path(key)
+            existed = os.path.exists(path)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(temp_path, path)
+
+            with self._lock:
+                if not existed:
+                    self._disk_bytes += len(value)
+                # One writer trims at a time; the directory scan runs without the lock
+                evict = self._disk_bytes > self.disk_max_bytes and not self._evicting
+                if evict:
+                    self._evicting = True
+            if evict:
+                try:
+                    self._evict_disk()
+                finally:
+                    with self._lock:
+                        self._evicting = False
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def put(self, key: str, value: bytes):
+        """Store `value` in both tiers."""
+        self.put_memory(key, value)
+        self.put_disk(key, value)
+
+    def _evict_disk(self):
+        entries = sorted(
+            (
+                (entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in os.scandir(self.cache_dir)
+                if entry.is_file() and entry.name.endswith(".bin")
+            ),
+        )
+        disk_bytes = sum(size for _, size, _ in entries)
+        evictions = 0
+        for _, size, path in entries:
+            if disk_bytes <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                disk_bytes -= size
+                evictions += 1
+            except FileNotFoundError:
+                continue
+        with self._lock:
+            self._disk_bytes = disk_bytes
+            self._stats["disk_evictions"] += evictions
+        logging.info(f"Result cache disk tier trimmed to {disk_bytes} bytes")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            return {
+                **self._stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_max_bytes": self.memory_max_bytes,
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes,
+            }
+
+
+_result_cache_config = ResultCacheConfig(bg_config=BgConfig())
+result_cache = ResultCache(
+    cache_dir=_result_cache_config.cache_dir,
+    memory_max_bytes=_result_cache_config.memory_max_bytes,
+    disk_max_bytes=_result_cache_config.disk_max_bytes,
+)
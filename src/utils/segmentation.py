@@ -0,0 +1,82 @@
+from src.exceptions import CustomException
+from src.logger import logging
+
+import sys
+import numpy as np
+from PIL import Image
+
+# Input normalization rembg applies for each supported model: (mean, std, input size)
+MODEL_INPUT_SPECS = {
+    "u2net": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "u2net_human_seg": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "silueta": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "isnet-general-use": ((0.5, 0.5, 0.5), (1.0, 1.0, 1.0), (1024, 1024)),
+}
+
+
+def _preprocess_batch(images, mean, std, size) -> np.ndarray:
+    """Resize images to the model input size and normalize them as one NCHW float32 tensor."""
+    batch = np.stack([
+        np.asarray(img.convert("RGB").resize(size, Image.Resampling.LANCZOS))
+        for img in images
+    ]).astype(np.float32)
+    batch /= np.maximum(batch.max(axis=(1, 2, 3), keepdims=True), 1e-6)
+    batch -= np.asarray(mean, dtype=np.float32)
+    batch /= np.asarray(std, dtype=np.float32)
+    return np.ascontiguousarray(batch.transpose(0, 3, 1, 2))
+
+
+def supports_dynamic_batch(inner_session) -> bool:
+    """Whether an onnxruntime session accepts more than one input per run."""
+    batch_dim = inner_session.get_inputs()[0].shape[0]
+    return not isinstance(batch_dim, int) or batch_dim != 1
+
+
+def effective_batch_size(session, batch_size: int) -> int:
+    """Inputs per model run `predict_masks` will use for `session`."""
+    return batch_size if supports_dynamic_batch(session.inner_session) else 1
+
+
+def predict_masks(session, model_name: str, images, batch_size: int = 8):
+    """
+    Predict one segmentation mask per image, running the model on batches of inputs.
+
+    Mirrors the pre/post-processing of the rembg session's own `predict`, so the
+    masks match the single image path. Models whose batch size stays fixed at one
+    (see `RembgSessionRegistry`) still get the vectorized preprocessing but are
+    run one input at a time, with a warning.
+    """
+    try:
+        if model_name not in MODEL_INPUT_SPECS:
+            raise ValueError(f"Batched inference is not supported for model '{model_name}'")
+
+        mean, std, size = MODEL_INPUT_SPECS[model_name]
+        input_name = session.inner_session.get_inputs()[0].name
+        dynamic_batch = supports_dynamic_batch(session.inner_session)
+        if not dynamic_batch:
+            logging.warning(
+                f"Model '{model_name}' has a fixed batch size of 1; running {len(images)} inputs one at a time."
+            )
+
+        masks = []
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            batch = _preprocess_batch(chunk, mean, std, size)
+
+            if dynamic_batch:
+                preds = session.inner_session.run(None, {input_name: batch})[0]
+            else:
+                preds = np.concatenate([
+                    session.inner_session.run(None, {input_name: batch[i:i + 1]})[0]
+                    for i in range(len(chunk))
+                ])
+
+            for img, pred in zip(chunk, preds[:, 0, :, :]):
+                pred = (pred - pred.min()) / max(pred.max() - pred.min(), 1e-6)
+                mask = Image.fromarray((pred * 255).astype("uint8"))
+                masks.append(mask.resize(img.size, Image.Resampling.LANCZOS))
+
+        return masks
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -0,0 +1,99 @@
+from src.exceptions import CustomException
+from src.entity.config_entity import ConfigEntity, MemeTemplatesEntity
+
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+
+class TemplateImageCache:
+    """
+    LRU of decoded template images, bounded by total pixel bytes.
+
+    Each template file is decoded once. `open` hands out a copy, which is a
+    plain memory copy, so a render can draw on it without touching the cached
+    original. Entries are keyed by path and checked against the file's mtime,
+    so a replaced file is decoded again. An image larger than the whole budget
+    is never cached.
+    """
+
+    def __init__(self, meme_templates_config: MemeTemplatesEntity):
+        self.max_bytes = meme_templates_config.image_cache_max_bytes
+        self._cache = OrderedDict()  # path -> (mtime_ns, image)
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "decode_seconds": 0.0}
+
+    @staticmethod
+    def _bytes_of(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    def _get(self, path: str, mtime_ns: int):
+        with self._lock:
+            entry = self._cache.get(path)
+            if entry is not None and entry[0] == mtime_ns:
+                self._cache.move_to_end(path)
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+            return None
+
+    def _put(self, path: str, mtime_ns: int, image: Image.Image):
+        size = self._bytes_of(image)
+        with self._lock:
+            previous = self._cache.pop(path, None)
+            if previous is not None:
+                self._cache_bytes -= self._bytes_of(previous[1])
+            if size > self.max_bytes:
+                return
+            self._cache[path] = (mtime_ns, image)
+            self._cache_bytes += size
+            while self._cache_bytes > self.max_bytes:
+                _, (_, evicted) = self._cache.popitem(last=False)
+                self._cache_bytes -= self._bytes_of(evicted)
+                self._stats["evictions"] += 1
+
+    def get(self, path: str) -> Image.Image:
+        """Decoded template at `path`; shared with other renders, so treat it as read-only."""
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            image = self._get(path, mtime_ns)
+            if image is None:
+                start = time.perf_counter()
+                with Image.open(path) as f:
+                    f.load()
+                    image = f.copy()
+                with self._lock:
+                    self._stats["decode_seconds"] += time.perf_counter() - start
+                self._put(path, mtime_ns, image)
+            return image
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def open(self, path: str) -> Image.Image:
+        """Private, writable copy of the decoded template at `path`."""
+        return self.get(path).copy()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            entries, cache_bytes = len(self._cache), self._cache_bytes
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "hit_rate": stats["hits"] / lookups if lookups else None,
+            "entries": entries,
+            "memory_bytes": cache_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+template_image_cache = TemplateImageCache(meme_templates_config=MemeTemplatesEntity(config_entity=ConfigEntity()))
@@ -0,0 +1,130 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, MemeTemplatesEntity
+from src.utils.template_store import TemplateStore, template_store
+
+import os
+import sys
+import json
+import time
+import random
+import threading
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class TemplateSnapshot:
+    """Immutable view of the emotion -> templates mapping; replaced as a whole on reload."""
+    mtime_ns: int = None
+    loaded_at: float = None
+    templates: dict = field(default_factory=dict)  # emotion -> tuple of template URLs
+
+
+class TemplateIndex:
+    """
+    In-memory index of the emotion -> template URL mapping in `emotion_image_urls.json`.
+
+    The file is parsed once into per-emotion tuples of URLs. Readers only dereference
+    the current snapshot and never take a lock. At most every `index_check_interval`
+    seconds a lookup stats the file, and a changed mtime triggers a reload. The
+    reload builds a new snapshot and swaps it in. A file that fails to parse keeps
+    the previous snapshot.
+
+    `choose` only returns templates that are already in `store`. The on-disk subset
+    of each emotion is cached until the snapshot or the store changes.
+    """
+
+    def __init__(self, meme_templates_config: MemeTemplatesEntity, store: TemplateStore):
+        try:
+            self.meme_templates_config = meme_templates_config
+            self.store = store
+            self.json_path = os.path.join(meme_templates_config.output_dir, meme_templates_config.json_file)
+            self.template_dir = meme_templates_config.template_dir
+            self.check_interval = meme_templates_config.index_check_interval
+            os.makedirs(self.template_dir, exist_ok=True)
+            self._snapshot = TemplateSnapshot()
+            self._reload_lock = threading.Lock()
+            self._next_check = 0.0
+            self._failed_mtime_ns = None
+            self._reloads = 0
+            self._available = {}  # emotion -> (snapshot, store version, tuple of local paths)
+            self.reload()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _file_mtime_ns(self):
+        try:
+            return os.stat(self.json_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def reload(self, force: bool = False) -> TemplateSnapshot:
+        """Re-read the JSON file if its mtime changed (or always with `force`) and return the current snapshot."""
+        with self._reload_lock:
+            self._next_check = time.monotonic() + self.check_interval
+            mtime_ns = self._file_mtime_ns()
+            if not force and mtime_ns in (self._snapshot.mtime_ns, self._failed_mtime_ns):
+                return self._snapshot
+            if mtime_ns is None:
+                self._snapshot = TemplateSnapshot()
+                return self._snapshot
+            try:
+                with open(self.json_path, "r", encoding="utf-8") as f:
+                    emotion_url_map = json.load(f)
+                templates = {
+                    emotion: tuple(dict.fromkeys(urls))
+                    for emotion, urls in emotion_url_map.items() if urls
+                }
+            except Exception as e:
+                # Remember the broken version so it is not re-parsed on every check
+                self._failed_mtime_ns = mtime_ns
+                logging.error(f"Could not load template index from {self.json_path}, keeping the previous one: {e}")
+                return self._snapshot
+            self._snapshot = TemplateSnapshot(mtime_ns=mtime_ns, loaded_at=time.time(), templates=templates)
+            self._reloads += 1
+            logging.info(
+                f"Template index loaded: {len(templates)} emotions, "
+                f"{sum(len(urls) for urls in templates.values())} templates"
+            )
+            return self._snapshot
+
+    def snapshot(self) -> TemplateSnapshot:
+        if time.monotonic() >= self._next_check and not self._reload_lock.locked():
+            return self.reload()
+        return self._snapshot
+
+    def templates(self, emotion: str) -> tuple:
+        return self.snapshot().templates.get(emotion, ())
+
+    def urls(self) -> list:
+        """Every template URL in the mapping, without duplicates."""
+        return list(dict.fromkeys(url for urls in self.snapshot().templates.values() for url in urls))
+
+    def available(self, emotion: str) -> tuple:
+        """Local paths of the templates for `emotion` that are already on disk."""
+        snapshot, version = self.snapshot(), self.store.version
+        cached = self._available.get(emotion)
+        if cached is not None and cached[0] is snapshot and cached[1] == version:
+            return cached[2]
+        paths = tuple(path for path in map(self.store.path_for, snapshot.templates.get(emotion, ())) if path)
+        self._available[emotion] = (snapshot, version, paths)
+        return paths
+
+    def choose(self, emotion: str):
+        """Local path of a random on-disk template for `emotion`, or None if none is downloaded yet."""
+        paths = self.available(emotion)
+        return random.choice(paths) if paths else None
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        urls = {url for urls in snapshot.templates.values() for url in urls}
+        return {
+            "emotions": len(snapshot.templates),
+            "templates": len(urls),
+            "on_disk": sum(1 for url in urls if self.store.path_for(url)),
+            "loaded_at": snapshot.loaded_at,
+            "reloads": self._reloads,
+        }
+
+
+template_index = TemplateIndex(meme_templates_config=MemeTemplatesEntity(config_entity=ConfigEntity()), store=template_store)
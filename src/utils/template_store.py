@@ -0,0 +1,257 @@
+from src.exceptions import CustomException
+from src.logger import logging
+from src.entity.config_entity import ConfigEntity, MemeTemplatesEntity
+
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def _atomic_write(path: str, data: bytes):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class TemplateStore:
+    """
+    Content-addressed store of downloaded template images.
+
+    Each image is saved once as `<store_dir>/<sha[:2]>/<sha><ext>` through a temp
+    file and an atomic rename. `manifest.json` maps source URLs to those files.
+    Lookups read an immutable dict that is replaced on every change, so they
+    never lock. Several processes can share the directory. Identical content
+    lands on the same path, and saving the manifest merges in entries written
+    by other processes.
+    """
+
+    def __init__(self, store_dir: str):
+        try:
+            self.store_dir = store_dir
+            self.manifest_path = os.path.join(store_dir, "manifest.json")
+            os.makedirs(store_dir, exist_ok=True)
+            self._paths = {}
+            self._lock = threading.Lock()
+            self.version = 0
+            self.refresh()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return {url: os.path.join(self.store_dir, name) for url, name in manifest.items()}
+
+    def refresh(self):
+        """Merge in manifest entries written by other processes whose files exist."""
+        on_disk = {url: path for url, path in self._read_manifest().items() if os.path.exists(path)}
+        with self._lock:
+            if on_disk.keys() - self._paths.keys():
+                self._paths = {**on_disk, **self._paths}
+                self.version += 1
+
+    def path_for(self, url: str):
+        """Local path of the template downloaded from `url`, or None if it is not stored yet."""
+        return self._paths.get(url)
+
+    def put(self, url: str, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        suffix = os.path.splitext(urlparse(url).path)[1].lower()
+        path = os.path.join(self.store_dir, digest[:2], digest + suffix)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _atomic_write(path, data)
+        with self._lock:
+            self._paths = {**self._paths, url: path}
+            self.version += 1
+        return path
+
+    def save_manifest(self):
+        with self._lock:
+            paths = {**self._read_manifest(), **self._paths}
+            manifest = {url: os.path.relpath(path, self.store_dir) for url, path in paths.items()}
+            _atomic_write(self.manifest_path, json.dumps(manifest, indent=0, ensure_ascii=False).encode("utf-8"))
+
+    def stats(self) -> dict:
+        return {"templates": len(self._paths), "version": self.version}
+
+
+class TemplatePrefetcher:
+    """
+    Downloads template images into a TemplateStore on a background thread.
+
+    `schedule` queues the URLs that are not stored yet and returns at once. One
+    runner thread drains the queue with `concurrency` download threads sharing a
+    pooled `requests.Session`. Connection errors, timeouts, 429 and 5xx responses
+    are retried `retries` times with jittered exponential backoff. Other HTTP errors
+    fail immediately. A URL that failed is skipped by `schedule` for
+    `failure_backoff` seconds, doubling per failure up to `failure_max_backoff`, so
+    request-path misses do not download it again and again. Templates already
+    downloaded into the legacy `legacy_dir` layout are adopted without a request.
+    The store is re-read from disk after each run and on `schedule(refresh=True)`,
+    never on a plain `schedule`.
+    """
+
+    def __init__(self, store: TemplateStore, meme_templates_config: MemeTemplatesEntity):
+        self.store = store
+        self.concurrency = meme_templates_config.prefetch_concurrency
+        self.retries = meme_templates_config.prefetch_retries
+        self.timeout = meme_templates_config.prefetch_timeout
+        self.backoff = meme_templates_config.prefetch_backoff
+        self.failure_backoff = meme_templates_config.prefetch_failure_backoff
+        self.failure_max_backoff = meme_templates_config.prefetch_failure_max_backoff
+        self.legacy_dir = meme_templates_config.template_dir
+        self._pending = set()
+        self._failed = {}  # url -> (consecutive failures, monotonic time before which it is not queued)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._session = None
+        self._stop = threading.Event()
+        self._stats = {"scheduled": 0, "downloaded": 0, "adopted": 0, "failed": 0, "retries": 0, "runs": 0}
+
+    def _get_session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.concurrency)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def _count(self, event: str, amount: int = 1):
+        with self._lock:
+            self._stats[event] += amount
+
+    def schedule(self, urls, refresh: bool = False) -> int:
+        """
+        Queue every URL that is not stored yet and not backing off after a failure;
+        returns how many were queued. `refresh` first re-reads the store from disk
+        and retries failed URLs right away.
+        """
+        if refresh:
+            self.store.refresh()
+        missing = {url for url in urls if self.store.path_for(url) is None}
+        now = time.monotonic()
+        with self._lock:
+            if refresh:
+                self._failed.clear()
+            missing = {url for url in missing - self._pending if self._failed.get(url, (0, now))[1] <= now}
+            self._pending |= missing
+            self._stats["scheduled"] += len(missing)
+            if self._pending and self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(target=self._run, name="template-prefetch", daemon=True)
+                self._thread.start()
+        return len(missing)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                batch = list(self._pending)
+                if not batch or self._stop.is_set():
+                    self._pending.clear()
+                    self._thread = None
+                    return
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="template-download") as pool:
+                list(pool.map(self._fetch, batch))
+            with self._lock:
+                self._pending.difference_update(batch)
+                self._stats["runs"] += 1
+            try:
+                self.store.save_manifest()
+                # Pick up templates other processes downloaded meanwhile
+                self.store.refresh()
+            except OSError as e:
+                logging.error(f"Could not save the template manifest: {e}")
+            logging.info(f"Prefetched {len(batch)} templates in {time.perf_counter() - start:.2f}s")
+
+    def _fetch(self, url: str):
+        if self.store.path_for(url) is not None:
+            return
+        legacy_path = os.path.join(self.legacy_dir, os.path.basename(urlparse(url).path))
+        if os.path.isfile(legacy_path):
+            with open(legacy_path, "rb") as f:
+                self.store.put(url, f.read())
+            self._count("adopted")
+            return
+
+        for attempt in range(self.retries + 1):
+            if self._stop.is_set():
+                return
+            try:
+                response = self._get_session().get(url, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = e
+            else:
+                if response.ok:
+                    self.store.put(url, response.content)
+                    with self._lock:
+                        self._stats["downloaded"] += 1
+                        self._failed.pop(url, None)
+                    return
+                error = f"HTTP {response.status_code}"
+                if response.status_code != 429 and response.status_code < 500:
+                    break
+            if attempt < self.retries:
+                self._count("retries")
+                self._stop.wait(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+        with self._lock:
+            failures = self._failed.get(url, (0, 0))[0] + 1
+            delay = min(self.failure_backoff * 2 ** (failures - 1), self.failure_max_backoff)
+            self._failed[url] = (failures, time.monotonic() + delay)
+            self._stats["failed"] += 1
+        logging.warning(f"Failed to prefetch template {url}: {error}; not retrying for {delay:.0f}s")
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the queue is drained; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                thread = self._thread
+            if thread is None:
+                return True
+            thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+            if deadline is not None and time.monotonic() >= deadline:
+                return self._thread is None
+
+    def shutdown(self):
+        self._stop.set()
+        self.wait(timeout=self.timeout)
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            backing_off = sum(1 for _, retry_at in self._failed.values() if retry_at > now)
+            return {
+                **self._stats, "pending": len(self._pending), "backing_off": backing_off,
+                "running": self._thread is not None,
+            }
+
+
+_meme_templates_config = MemeTemplatesEntity(config_entity=ConfigEntity())
+template_store = TemplateStore(store_dir=_meme_templates_config.store_dir)
+template_prefetcher = TemplatePrefetcher(template_store, meme_templates_config=_meme_templates_config)